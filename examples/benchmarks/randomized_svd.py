@@ -0,0 +1,60 @@
+"""Compares the runtime and accuracy of the 'randomized_svd' and 'svd'
+decomposition algorithms on synthetic spectrum images.
+
+The accuracy is measured as the sine of the largest principal angle
+between the subspaces spanned by the factors of both algorithms.
+
+"""
+
+import time
+
+import numpy as np
+
+from hyperspy.hspy import signals
+
+
+def synthetic_spectrum_image(shape, n_channels, n_components=5):
+    x = np.arange(n_channels)
+    centres = np.linspace(0.1, 0.9, n_components) * n_channels
+    factors = np.exp(-(x - centres[:, np.newaxis]) ** 2 /
+                     (2 * (n_channels / 50.) ** 2))
+    loadings = np.random.random(shape + (n_components,))
+    data = np.dot(loadings, factors) * 100
+    return signals.Spectrum(np.random.poisson(data).astype('float64'))
+
+
+def subspace_error(f1, f2):
+    q1 = np.linalg.qr(f1)[0]
+    q2 = np.linalg.qr(f2)[0]
+    cosines = np.linalg.svd(np.dot(q1.T, q2), compute_uv=False)
+    return np.sqrt(max(0, 1 - cosines.min() ** 2))
+
+
+def run(shape, n_channels, output_dimension=5, **kwargs):
+    s = synthetic_spectrum_image(shape, n_channels, output_dimension)
+    results = {}
+    for algorithm in ('svd', 'randomized_svd'):
+        t0 = time.time()
+        if algorithm == 'svd':
+            s.decomposition(algorithm=algorithm,
+                            output_dimension=output_dimension)
+        else:
+            s.decomposition(algorithm=algorithm,
+                            output_dimension=output_dimension, **kwargs)
+        results[algorithm] = (time.time() - t0,
+                              s.learning_results.factors.copy())
+    error = subspace_error(results['svd'][1],
+                           results['randomized_svd'][1])
+    print "%-12s %8i %12.3f %15.3f %15.2e" % (
+        "x".join(str(i) for i in shape), n_channels,
+        results['svd'][0], results['randomized_svd'][0], error)
+
+
+if __name__ == '__main__':
+    print "%-12s %8s %12s %15s %15s" % (
+        "navigation", "channels", "svd (s)", "randomized (s)",
+        "subspace error")
+    for shape, n_channels in (((32, 32), 512),
+                              ((64, 64), 1024),
+                              ((128, 128), 1024)):
+        run(shape, n_channels, power_iterations=2)
@@ -60,9 +60,10 @@ def __init__(self, A=1. , k=1. , x0=1., minimum_at_zero=False):
         self._position = self.x0
 
     def function(self,x):
-        A = self.A.value
-        k = self.k.value
-        x0 = self.x0.value
+        return self._function(x, self.A.value, self.k.value,
+                              self.x0.value)
+
+    def _function(self, x, A, k, x0):
         if self.minimum_at_zero:
             return A*(math.pi/2+np.arctan(k*(x-x0)))
         else:
@@ -41,9 +41,10 @@ def __init__(self):
     def function(self, x):
         """
         """
-        a = self.a.value
-        b = self.b.value
-        c = self.c.value
+        return self._function(x, self.a.value, self.b.value,
+                              self.c.value)
+
+    def _function(self, x, a, b, c):
         return (a+b*x)**(-1./c)
     
     def grad_a(self, x):
@@ -40,8 +40,11 @@ def __init__(self):
         
     def function(self, x):
         
-        return np.where(x < self.interfase, self.offset.value + x*0, 
-    self.offset.value + self.step.value + x*0)
+        return self._function(x, self.offset.value, self.step.value)
+
+    def _function(self, x, offset, step):
+        return np.where(x < self.interfase, offset + x*0, 
+    offset + step + x*0)
     def grad_offset(self, x):
         return np.ones((len(x)))
     def grad_step(self,x):
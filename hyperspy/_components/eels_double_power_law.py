@@ -49,12 +49,13 @@ def function(self, x):
         you want to evaluate the background model, returns the background
         model for the current parameters.
         """
-        a = self.A.value
-        b = self.ratio.value
-        s = self.shift.value
-        r = self.r.value
-        x0 = self.origin.value
-        return np.where(x > self.left_cutoff, a*(b/(-x0+x-s)**r+1/(x-x0)**r), 0)
+        return self._function(x, self.A.value, self.r.value,
+                              self.origin.value, self.shift.value,
+                              self.ratio.value)
+
+    def _function(self, x, A, r, origin, shift, ratio):
+        return np.where(x > self.left_cutoff, 
+            A*(ratio/(-origin+x-shift)**r+1/(x-origin)**r), 0)
     def grad_A(self, x):
         return self.function(x) / self.A.value
     def grad_ratio(self,x):
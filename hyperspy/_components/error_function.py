@@ -56,9 +56,10 @@ def __init__(self):
         self._position = self.origin
 
     def function(self, x):
-        A = self.A.value
-        sigma = self.sigma.value
-        origin = self.origin.value
+        return self._function(x, self.A.value, self.sigma.value,
+                              self.origin.value)
+
+    def _function(self, x, A, sigma, origin):
         return A*erf((x-origin)/math.sqrt(2)/sigma)/2
 
     def grad_A(self, x):
@@ -46,8 +46,9 @@ def __init__(self):
     def function( self, x ) :
         """
         """
-        A = self.A.value
-        tau = self.tau.value
+        return self._function(x, self.A.value, self.tau.value)
+
+    def _function(self, x, A, tau):
         return A*np.exp(-x/tau)
     
     def grad_A(self,x):
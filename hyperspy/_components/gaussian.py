@@ -69,9 +69,10 @@ def __init__(self, A=1., sigma=1.,centre = 0.):
         
 
     def function(self, x) :
-        A = self.A.value
-        sigma = self.sigma.value
-        centre = self.centre.value
+        return self._function(x, self.A.value, self.sigma.value,
+                              self.centre.value)
+
+    def _function(self, x, A, sigma, centre):
         return A * (1 / (sigma * sqrt2pi)) * np.exp(
                                             -(x - centre)**2 / (2 * sigma**2))
     
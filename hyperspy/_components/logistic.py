@@ -48,10 +48,10 @@ def __init__(self):
     def function(self, x):
         """
         """
-        a = self.a.value
-        b = self.b.value
-        c = self.c.value
-        origin = self.origin.value
+        return self._function(x, self.a.value, self.b.value,
+                              self.c.value, self.origin.value)
+
+    def _function(self, x, a, b, c, origin):
         return a/(1+b*np.exp(-c*(x-origin)))
     
     def grad_a(self, x):
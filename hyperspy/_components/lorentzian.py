@@ -67,10 +67,10 @@ def __repr__(self):
     def function( self, x ) :
         """
         """
-        A = self.A.value
-        gamma = self.gamma.value
-        centre = self.centre.value
-        
+        return self._function(x, self.A.value, self.gamma.value,
+                              self.centre.value)
+
+    def _function(self, x, A, gamma, centre):
         return A / np.pi * (gamma / ((x - centre)**2 + gamma**2))
     def grad_A(self, x):
         """
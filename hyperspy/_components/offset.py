@@ -47,7 +47,10 @@ def __init__( self, offset = 0. ):
         self.offset.grad = self.grad_offset
         
     def function(self, x):
-        return np.ones((len(x))) * self.offset.value
+        return self._function(x, self.offset.value)
+
+    def _function(self, x, offset):
+        return np.ones((len(x))) * offset
     def grad_offset(self, x):
         return np.ones((len(x)))
         
@@ -62,8 +62,12 @@ def __init__(self, A=10e5, r=3.,origin = 0.):
         self.convolved = False
 
     def function(self, x):
-        return np.where(x > self.left_cutoff, self.A.value * 
-        (x - self.origin.value)**(-self.r.value), 0)
+        return self._function(x, self.A.value, self.r.value,
+                              self.origin.value)
+
+    def _function(self, x, A, r, origin):
+        return np.where(x > self.left_cutoff, A * 
+        (x - origin)**(-r), 0)
     def grad_A(self, x):
         return self.function(x) / self.A.value
     def grad_r(self,x):
@@ -31,9 +31,10 @@ def __init__(self, V=1, V0= 0, tau=1.):
     def function( self, x ) :
         """
         """
-        Vmax = self.Vmax.value
-        V0 = self.V0.value
-        tau = self.tau.value
+        return self._function(x, self.Vmax.value, self.V0.value,
+                              self.tau.value)
+
+    def _function(self, x, Vmax, V0, tau):
         return V0 + Vmax*(1-np.exp(-x/tau))
     
 
@@ -63,9 +63,11 @@ def __init__(self):
         self.intensity.grad = self.grad_intensity
     
     def function(self, x):
-        plasmon_energy = self.plasmon_energy.value
-        plasmon_linewidth = self.plasmon_linewidth.value
-        intensity = self.intensity.value
+        return self._function(x, self.intensity.value,
+                              self.plasmon_energy.value,
+                              self.plasmon_linewidth.value)
+
+    def _function(self, x, intensity, plasmon_energy, plasmon_linewidth):
         return np.where(x > 0, 
             intensity*(plasmon_energy**2 * x * plasmon_linewidth) / (
             (x**2 - plasmon_energy**2)**2 + (x * plasmon_linewidth)**2),
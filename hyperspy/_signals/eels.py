@@ -17,6 +17,7 @@
 # along with  Hyperspy.  If not, see <http://www.gnu.org/licenses/>.
 
 import numpy as np
+import scipy.integrate
 import matplotlib.pyplot as plt
 import traits.api as t
 
@@ -29,7 +30,6 @@
 from hyperspy.gui.eels import TEMParametersUI
 from hyperspy.defaults_parser import preferences
 import hyperspy.gui.messages as messagesui
-from hyperspy.misc.progressbar import progressbar
 from hyperspy.components import PowerLaw
 from hyperspy.misc.utils import isiterable
 
@@ -209,27 +209,20 @@ def estimate_elastic_scattering_intensity(self,
             bk_threshold_navigate = (
                 threshold.axes_manager._get_axis_attribute_values('navigate'))
             threshold.axes_manager.set_signal_dimension(0)
-            I0 = self._get_navigation_signal()
-            bk_I0_navigate = (
-                I0.axes_manager._get_axis_attribute_values('navigate'))
-            I0.axes_manager.set_signal_dimension(0)
-            pbar = hyperspy.misc.progressbar.progressbar(
-                                    maxval=self.axes_manager.navigation_size)
-            for i, s in enumerate(self):
-                threshold_ = threshold[self.axes_manager.indices].data[0]
-                if np.isnan(threshold_):
-                    I0[self.axes_manager.indices] = np.nan
-                else:
-                    I0[self.axes_manager.indices].data[:] = (
-                        s[:threshold_].integrate_simpson(-1).data)
-                pbar.update(i)
-            pbar.finish()
-            threshold.axes_manager._set_axis_attribute_values(
-                    'navigate',
-                    bk_threshold_navigate)
-            I0.axes_manager._set_axis_attribute_values(
-                    'navigate',
-                    bk_I0_navigate)
+            axis = self.axes_manager.signal_axes[0]
+
+            def estimate_I0(data, threshold):
+                threshold = float(threshold)
+                if np.isnan(threshold):
+                    return np.nan
+                i = axis.value2index(threshold)
+                return scipy.integrate.simps(data[:i], x=axis.axis[:i])
+            try:
+                I0 = self.map(estimate_I0, threshold=threshold)
+            finally:
+                threshold.axes_manager._set_axis_attribute_values(
+                        'navigate',
+                        bk_threshold_navigate)
         I0.mapped_parameters.title = (
             self.mapped_parameters.title + ' elastic intensity')
         if self.tmp_parameters.has_item('filename'):
@@ -598,31 +591,17 @@ def richardson_lucy_deconvolution(self,  psf, iterations=15,
                 ds.tmp_parameters.filename += (
                     '_after_R-L_deconvolution_%iiter' % iterations)
         psf_size = psf.axes_manager.signal_axes[0].size
-        kernel = psf()
-        imax = kernel.argmax()
-        j = 0
-        maxval = self.axes_manager.navigation_size
-        if maxval > 0:
-            pbar = progressbar(maxval=maxval)
-        for D in self:
-            D = D.data.copy()
-            if psf.axes_manager.navigation_dimension != 0:
-                kernel = psf(axes_manager=self.axes_manager)
-                imax = kernel.argmax()
 
-            s = ds(axes_manager=self.axes_manager)
+        def deconvolve(D, kernel):
+            imax = kernel.argmax()
             mimax = psf_size -1 - imax
             O = D.copy()
             for i in xrange(iterations):
                 first = np.convolve(kernel, O)[imax: imax + psf_size]
                 O = O * (np.convolve(kernel[::-1], 
                          D / first)[mimax: mimax + psf_size])
-            s[:] = O
-            j += 1
-            if maxval > 0:
-                pbar.update(j)
-        if maxval > 0:
-            pbar.finish()
+            return O
+        ds.map(deconvolve, kernel=psf, inplace=True)
         
         return ds
 
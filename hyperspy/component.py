@@ -320,6 +320,37 @@ def fetch(self):
             self.value = self.map['values'][indices]
             self.std = self.map['std'][indices]
 
+    def _get_nd_value(self):
+        """Returns the value of the parameter at all the navigation 
+        positions.
+        
+        The values are read from `map`. As when iterating over the 
+        navigation positions and fetching the stored values, where the 
+        value has not been stored the value at the previous position 
+        (in C order) is used instead, or the current value before the 
+        first stored one. If the parameter has a twin, the twin function
+        is applied to the values of the twin.
+        
+        Returns
+        -------
+        numpy array with shape `map.shape` (plus an extra trailing 
+        dimension of length `_number_of_elements` if it is greater than 
+        one).
+        
+        """
+        if isinstance(self.twin, Parameter):
+            return self.twin_function(self.twin._get_nd_value())
+        is_set = self.map['is_set'].ravel()
+        # The index of the last stored value at every position, shifted
+        # by one to point to the current value where there is none
+        previous = np.maximum.accumulate(
+            np.where(is_set, np.arange(1, is_set.size + 1), 0))
+        values = self.map['values']
+        values = np.concatenate((
+            np.array(self.value, dtype=values.dtype)[np.newaxis],
+            values.reshape((is_set.size,) + values.shape[self.map.ndim:])))
+        return values[previous].reshape(self.map['values'].shape)
+
     def assign_current_value_to_all(self, mask=None):
         '''Assign the current value attribute to all the  indices
         
@@ -431,6 +462,12 @@ def export(self, folder=None, name=None, format=None,
                     
 class Component(object):
     __axes_manager = None
+    # The components whose function broadcasts over array parameter 
+    # values define it as `_function(x, **values)`, with a keyword 
+    # argument per parameter name, and `function` calls it with the 
+    # current values (see `function_nd`)
+    _function = None
+
     def __init__(self, parameter_name_list):
         self.connected_functions = list()
         self.parameters = []
@@ -632,6 +669,53 @@ def __tempcall__(self, p, x, onlyfree=True) :
         self.fetch_values_from_array(p , onlyfree=onlyfree)
         return self.function(x)
 
+    @property
+    def supports_function_nd(self):
+        """True if the component can be evaluated at all the navigation
+        positions at once with `function_nd`, i.e. if it defines 
+        `_function` and all its parameters are scalar.
+        
+        """
+        return self._function is not None and all(
+            [parameter._number_of_elements == 1 for parameter in 
+             self.parameters])
+
+    def function_nd(self, axis):
+        """Returns the component function evaluated at all the 
+        navigation positions in a single operation.
+        
+        The parameter values are read from their `map` attribute (see 
+        `Parameter._get_nd_value`) and broadcasted against `axis`. The 
+        parameters are not modified. It is only available when 
+        `supports_function_nd` is True.
+        
+        Parameters
+        ----------
+        axis : numpy array
+        
+        Returns
+        -------
+        numpy array with shape `map.shape + axis.shape` where `map` is 
+        the map of any of the component parameters.
+        
+        Raises
+        ------
+        NotImplementedError if `supports_function_nd` is False.
+        
+        """
+        if not self.supports_function_nd:
+            raise NotImplementedError(
+                "%s does not support vectorized evaluation" %
+                self._get_short_description())
+        values = dict((parameter.name, 
+                       parameter._get_nd_value()[..., np.newaxis])
+                      for parameter in self.parameters)
+        result = self._function(axis, **values)
+        shape = self.parameters[0].map.shape + axis.shape
+        if result.shape != shape:
+            result = result + np.zeros(shape)
+        return result
+
     def __call__(self) :
         """Returns the corresponding model for the current coordinates
         
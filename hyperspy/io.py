@@ -18,6 +18,11 @@
 
 import os
 import glob
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
 
 from hyperspy import messages
 import hyperspy.defaults_parser
@@ -29,6 +34,7 @@
 from hyperspy.misc.natsort import natsorted
 import hyperspy.misc.io.tools
 from hyperspy.io_plugins import io_plugins, default_write_ext
+from hyperspy.misc.chunked_array import ChunkedArray
 
 def load(filenames=None,
          record_by=None,
@@ -39,6 +45,8 @@ def load(filenames=None,
          new_axis_name="stack_element",
          mmap=False,
          mmap_dir=None,
+         lazy=False,
+         workers=None,
          **kwds):
     """
     Load potentially multiple supported file into an hyperspy structure
@@ -122,6 +130,17 @@ def load(filenames=None,
         If mmap_dir is not None, and stack and mmap are True, the memory
         mapped file will be created in the given directory,
         otherwise the default directory is used.
+    lazy : bool
+        If True, the data of the formats that support it (HDF5 and 
+        the memory-mapped formats, e.g. Ripple) is not loaded in memory 
+        but read on demand through a ChunkedArray 
+        (see `hyperspy.misc.chunked_array`).
+    workers : {None, int}
+        If an integer larger than one and multiple files are passed in,
+        they are read concurrently by that number of processes, or of
+        threads if any of them is read by a memory-mapping or HDF5
+        reader. The files are returned (or stacked) in the same order
+        as when reading them sequentially.
         
     Returns
     -------
@@ -149,6 +168,7 @@ def load(filenames=None,
     kwds['record_by'] = record_by
     kwds['signal_type'] = signal_type    
     kwds['signal_origin'] = signal_origin
+    kwds['lazy'] = lazy
     if filenames is None:
         if hyperspy.defaults_parser.preferences.General.interactive is True:
             from hyperspy.gui.tools import Load
@@ -177,15 +197,31 @@ def load(filenames=None,
         if len(filenames) > 1:
             messages.information('Loading individual files')
         if stack is True:
-            signal = []
-            for i, filename in enumerate(filenames):
-                obj = load_single_file(filename,
-                                       **kwds)
-                signal.append(obj)
-            signal = hyperspy.utils.stack(signal,
-                                 axis=stack_axis,
-                                 new_axis_name=new_axis_name,
-                                 mmap=mmap, mmap_dir=mmap_dir)
+            reader = _get_reader(filenames[0])
+            if (stack_axis is None and hasattr(reader, 'stack_reader') and
+                    all(_get_reader(filename) is reader 
+                        for filename in filenames)):
+                # The reader stacks the data without creating a signal
+                # for every file
+                signal = _file_data2signals(
+                    filenames[0],
+                    reader.stack_reader(filenames,
+                                        new_axis_name=new_axis_name,
+                                        mmap=mmap, mmap_dir=mmap_dir,
+                                        **kwds),
+                    record_by=record_by,
+                    signal_type=signal_type,
+                    signal_origin=signal_origin,
+                    lazy=lazy)
+            else:
+                # The files are read one by one into the preallocated 
+                # stack
+                signal = hyperspy.utils.stack(
+                    _iterate_files(filenames, workers, **kwds),
+                    axis=stack_axis,
+                    new_axis_name=new_axis_name,
+                    mmap=mmap, mmap_dir=mmap_dir,
+                    length=len(filenames))
             signal.mapped_parameters.title = \
                 os.path.split(
                     os.path.split(
@@ -196,9 +232,7 @@ def load(filenames=None,
             signal._print_summary()
             objects = [signal,] 
         else:
-            objects=[load_single_file(filename,
-                                      **kwds) 
-                for filename in filenames]
+            objects = list(_iterate_files(filenames, workers, **kwds))
             
         if hyperspy.defaults_parser.preferences.General.plot_on_load:
             for obj in objects:
@@ -208,6 +242,158 @@ def load(filenames=None,
     return objects
 
 
+def _use_processes(filenames):
+    """Whether the files can be read by a pool of processes.
+
+    The readers that support lazy loading (e.g. HDF5) return objects
+    that cannot be sent between processes, therefore they are read by
+    threads. The memory-mapped data of the other readers is sent as a
+    `MemmapDescriptor` and mapped again by the parent process.
+
+    """
+    if not hasattr(os, 'fork'):
+        return False
+    for reader in set(_get_reader(filename) for filename in filenames):
+        if getattr(reader, 'lazy', False):
+            return False
+    return True
+
+
+class MemmapDescriptor(object):
+    """Picklable description of a view of a file-backed numpy.memmap.
+
+    Parameters
+    ----------
+    data : numpy array
+        A numpy.memmap or a view of one.
+
+    Raises
+    ------
+    ValueError if the data is not a view of a file-backed numpy.memmap.
+
+    """
+
+    def __init__(self, data):
+        root = None
+        base = data
+        while base is not None:
+            if isinstance(base, np.memmap) and not isinstance(
+                    base.base, np.ndarray):
+                # The memmap that maps the file, whose offset
+                # attribute is valid
+                root = base
+            base = getattr(base, 'base', None)
+        if (root is None or getattr(root, 'filename', None) is None or
+                not data.size):
+            raise ValueError("The data is not a file-backed numpy.memmap")
+        self.filename = root.filename
+        self.mode = 'r+' if root.mode == 'w+' else root.mode
+        self.dtype = data.dtype
+        self.shape = data.shape
+        self.strides = data.strides
+        self.offset = root.offset + (data.__array_interface__['data'][0] -
+                                     root.__array_interface__['data'][0])
+
+    def open(self):
+        """Map the file and return the described view."""
+        # The range of bytes spanned by the view
+        low = sum((n - 1) * stride for n, stride in
+                  zip(self.shape, self.strides) if stride < 0)
+        high = sum((n - 1) * stride for n, stride in
+                   zip(self.shape, self.strides) if stride > 0)
+        mapped = np.memmap(self.filename, dtype=np.uint8, mode=self.mode,
+                           offset=self.offset + low,
+                           shape=(high - low + self.dtype.itemsize,))
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=mapped,
+                          offset=-low, strides=self.strides)
+
+
+def _read_file_dicts(filename, kwds):
+    """Read a file returning the dictionaries of its signals. Used by the
+    processes of `_iterate_files`.
+
+    The memory-mapped data is replaced by a `MemmapDescriptor` to avoid
+    copying it to the parent process.
+
+    """
+    kwds = kwds.copy()
+    del kwds['signal_type'], kwds['signal_origin']
+    file_data_list = _read_file(filename, _get_reader(filename), **kwds)
+    for signal_dict in file_data_list:
+        if is_memory_mapped(signal_dict['data']):
+            try:
+                signal_dict['data'] = MemmapDescriptor(signal_dict['data'])
+            except ValueError:
+                pass
+    return file_data_list
+
+
+def _open_file_dicts(file_data_list):
+    """Map the data described by a `MemmapDescriptor`."""
+    for signal_dict in file_data_list:
+        if isinstance(signal_dict['data'], MemmapDescriptor):
+            signal_dict['data'] = signal_dict['data'].open()
+    return file_data_list
+
+
+def _iterate_files(filenames, workers=None, **kwds):
+    """Load the files and yield the objects in the order of `filenames`.
+
+    If `workers` is larger than one, up to `workers` files are read
+    in advance by a pool of processes or, if any of the files is read
+    by a reader that supports lazy loading (e.g. HDF5), of threads. An IOError naming
+    the file is raised if reading any of the files fails.
+
+    """
+    if not workers or workers < 2:
+        for filename in filenames:
+            yield load_single_file(filename, **kwds)
+        return
+    if _use_processes(filenames):
+        pool = multiprocessing.Pool(workers)
+
+        def submit(filename):
+            return pool.apply_async(_read_file_dicts, (filename, kwds))
+
+        def get(filename, result):
+            return _file_data2signals(
+                filename, _open_file_dicts(result.get()),
+                record_by=kwds.get('record_by'),
+                signal_type=kwds.get('signal_type'),
+                signal_origin=kwds.get('signal_origin'),
+                lazy=kwds.get('lazy', False))
+    else:
+        pool = ThreadPool(workers)
+
+        def submit(filename):
+            return pool.apply_async(load_single_file, (filename,), kwds)
+
+        def get(filename, result):
+            return result.get()
+    try:
+        pending = collections.deque()
+        filenames = iter(filenames)
+        for filename in filenames:
+            pending.append((filename, submit(filename)))
+            if len(pending) == workers:
+                break
+        while pending:
+            filename, result = pending.popleft()
+            try:
+                obj = get(filename, result)
+            except Exception as error:
+                raise IOError("Loading %s failed: %s: %s" % (
+                    filename, type(error).__name__, error))
+            for filename in filenames:
+                pending.append((filename, submit(filename)))
+                break
+            yield obj
+            del obj
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def load_single_file(filename,
                      record_by=None,
                      signal_type=None,
@@ -229,30 +415,22 @@ def load_single_file(filename,
         If 'image' the file will be loaded as an Image object
 
     """
-    extension = os.path.splitext(filename)[1][1:]
+    return load_with_reader(filename=filename,
+                            reader=_get_reader(filename),
+                            record_by=record_by,
+                            signal_type=signal_type,
+                            signal_origin=signal_origin,
+                            **kwds)
+
 
+def _get_reader(filename):
+    """Return the io plugin that reads the file given its extension."""
+    extension = os.path.splitext(filename)[1][1:]
     i = 0
     while extension.lower() not in io_plugins[i].file_extensions and \
         i < len(io_plugins) - 1:
         i += 1
-    if i == len(io_plugins):
-        # Try to load it with the python imaging library
-        reader = image
-        try:
-            return load_with_reader(filename, reader, record_by, 
-                signal_type=signal_type, **kwds)
-        except:
-            raise IOError('If the file format is supported'
-                          ' please report this error')
-    else:
-        reader = io_plugins[i]
-        return load_with_reader(filename=filename,
-                                reader=reader,
-                                record_by=record_by,
-                    signal_type=signal_type,
-                                signal_origin=signal_origin,
-                                **kwds)
-
+    return io_plugins[i]
 
 
 def load_with_reader(filename,
@@ -260,13 +438,30 @@ def load_with_reader(filename,
                      record_by=None,
                      signal_type=None,
                      signal_origin=None,
+                     lazy=False,
                      **kwds):
-    file_data_list = reader.file_reader(filename,
-                                        record_by=record_by,
-                                        **kwds)
+    file_data_list = _read_file(filename, reader, record_by=record_by,
+                                lazy=lazy, **kwds)
+    return _file_data2signals(filename, file_data_list,
+                              record_by=record_by,
+                              signal_type=signal_type,
+                              signal_origin=signal_origin,
+                              lazy=lazy)
+
+
+def _read_file(filename, reader, record_by=None, lazy=False, **kwds):
+    if lazy is True and getattr(reader, 'lazy', False) is True:
+        kwds['lazy'] = True
+    return reader.file_reader(filename, record_by=record_by, **kwds)
+
+
+def _file_data2signals(filename, file_data_list, record_by=None,
+                       signal_type=None, signal_origin=None, lazy=False):
     objects = []
 
     for signal_dict in file_data_list:
+        if lazy is True and is_memory_mapped(signal_dict['data']):
+            signal_dict['data'] = ChunkedArray(signal_dict['data'])
         if record_by is not None:
             signal_dict['mapped_parameters']['record_by'] = record_by
         if signal_type is not None:
@@ -284,6 +479,14 @@ def load_with_reader(filename,
         objects = objects[0]
     return objects
 
+def is_memory_mapped(data):
+    """Whether the array is a numpy.memmap or a view of one."""
+    while data is not None:
+        if isinstance(data, np.memmap):
+            return True
+        data = getattr(data, 'base', None)
+    return False
+
 def assign_signal_subclass(record_by="",
                            signal_type="",
                            signal_origin="",):
@@ -405,7 +608,15 @@ def save(filename, signal, overwrite=None, **kwds):
         if overwrite is None:
             overwrite = hyperspy.misc.io.tools.overwrite(filename)
         if overwrite is True:
-            writer.file_writer(filename, signal, **kwds)
+            if (not isinstance(signal.data, np.ndarray) and
+                    not getattr(writer, 'lazy', False)):
+                # e.g. a LowRankArray, that only the writers that
+                # support lazy data can handle
+                signal_ = signal._deepcopy_with_new_data(
+                    np.asarray(signal.data))
+            else:
+                signal_ = signal
+            writer.file_writer(filename, signal_, **kwds)
             print('The %s file was created' % filename)
             folder, filename = os.path.split(os.path.abspath(filename))
             signal.tmp_parameters.set_item('folder', folder)
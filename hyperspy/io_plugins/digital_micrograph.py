@@ -24,6 +24,9 @@
 from __future__ import division
 
 import os
+import mmap
+import struct
+from cStringIO import StringIO
 
 import numpy as np
 import traits.api as t
@@ -64,6 +67,10 @@ class DigitalMicrographReader(object):
                      
     _complex_type = (15, 18, 20)
     simple_type =  (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)
+    # struct format of the simple types, consistent with the readers
+    # of get_data_reader
+    _simple_format = {2 : 'h', 3 : 'l', 4 : 'H', 5 : 'L', 6 : 'f', 7 : 'd',
+                      8 : 'B', 9 : 'c', 10 : 'b', 11 : 'd', 12 : 'd'}
 
     def __init__(self, f, verbose=False):
         self.verbose = verbose
@@ -71,8 +78,43 @@ def __init__(self, f, verbose=False):
         self.endian = None
         self.tags_dict = None
         self.f = f
+        self._structs = {}
+
+    def _open_buffer(self):
+        """Replace the file by a memory map of it (or by a copy in memory 
+        if it cannot be mapped) so that the tags are decoded from a 
+        buffer with struct.unpack_from instead of reading them byte by 
+        byte.
+        
+        """
+        try:
+            self._buffer = mmap.mmap(self.f.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+            self.f = self._buffer
+        except (AttributeError, EnvironmentError, ValueError):
+            self.f.seek(0)
+            self._buffer = self.f.read()
+            self.f = StringIO(self._buffer)
+
+    def _get_struct(self, fmt, endian="big"):
+        key = (fmt, endian)
+        if key not in self._structs:
+            self._structs[key] = struct.Struct(
+                (">" if endian == "big" else "<") + fmt)
+        return self._structs[key]
+
+    def _unpack(self, fmt, endian="big"):
+        """Decode the data at the current position and skip it."""
+        st = self._get_struct(fmt, endian)
+        values = st.unpack_from(self._buffer, self.f.tell())
+        self.f.seek(st.size, 1)
+        return values
+
+    def _read_long(self):
+        return self._unpack('l')[0]
         
     def parse_file(self):
+        self._open_buffer()
         self.f.seek(0)
         self.parse_header()
         self.tags_dict = {"root" : {}}
@@ -85,7 +127,7 @@ def parse_file(self):
                 group_dict=self.tags_dict)
 
     def parse_header(self):
-        self.dm_version = read_long(self.f, "big")
+        self.dm_version = self._read_long()
         if self.dm_version not in (3,4):
             print('File address:', dm_version[1])
             raise NotImplementedError(
@@ -93,8 +135,8 @@ def parse_header(self):
                 "this file "
                 "seems to be version %s " % self.dm_version)
         self.skipif4()
-        filesizeB = read_long(self.f, "big")
-        is_little_endian = read_long(self.f, "big") 
+        filesizeB = self._read_long()
+        is_little_endian = self._read_long()
     
         if self.verbose is True:
             # filesizeMB = filesizeB[3] / 2.**20
@@ -135,19 +177,19 @@ def parse_tags(self, ntags, group_name='root', group_dict={}):
                 # Start reading the data
                 self.check_data_tag_delimiter() # Raises IOError if it is wrong
                 self.skipif4()
-                infoarray_size = read_long(self.f, 'big')
+                infoarray_size = self._read_long()
                 if self.verbose:
                     print("Infoarray size ", infoarray_size)
                 self.skipif4()
                 if infoarray_size == 1: # Simple type
                     if self.verbose:
                         print("Reading simple data")
-                    etype = read_long(self.f, "big")
+                    etype = self._read_long()
                     data = self.read_simple_data(etype)
                 elif infoarray_size == 2: # String
                     if self.verbose:
                         print("Reading string")
-                    enctype = read_long(self.f, "big")
+                    enctype = self._read_long()
                     if enctype != 18:
                         raise IOError("Expected 18 (string), got %i" % enctype)
                     string_length = self.parse_string_definition()
@@ -156,13 +198,13 @@ def parse_tags(self, ntags, group_name='root', group_dict={}):
                     if self.verbose:
                         print("Reading simple array")
                     # Read array header
-                    enctype = read_long(self.f, "big")
+                    enctype = self._read_long()
                     if enctype != 20: # Should be 20 if it is an array
                         raise IOError("Expected 20 (string), got %i" % enctype)
                     size, enc_eltype = self.parse_array_definition()
                     data = self.read_array(size, enc_eltype, skip=skip)
                 elif infoarray_size > 3:
-                    enctype = read_long(self.f, "big")
+                    enctype = self._read_long()
                     if enctype == 15: # It is a struct
                         if self.verbose:
                             print("Reading struct")
@@ -176,13 +218,13 @@ def parse_tags(self, ntags, group_name='root', group_dict={}):
                         # 20 <4>, ?  <4>, enc_dtype <4>, definition <?>, 
                         # size <4>
                         self.skipif4()                    
-                        enc_eltype = read_long(self.f, "big")
+                        enc_eltype = self._read_long()
                         if enc_eltype == 15: # Array of structs
                             if self.verbose:
                                 print("Reading array of structs")
                             definition = self.parse_struct_definition()
                             self.skipif4() # Padding? 
-                            size = read_long(self.f, "big")
+                            size = self._read_long()
                             if self.verbose:
                                 print("Struct definition: ", definition)
                                 print("Array size: ", size)
@@ -196,7 +238,7 @@ def parse_tags(self, ntags, group_name='root', group_dict={}):
                                 print("Reading array of strings")
                             string_length = \
                                 self.parse_string_definition()
-                            size = read_long(self.f, "big")
+                            size = self._read_long()
                             data = self.read_array(
                                     size=size,
                                     enc_eltype=enc_eltype,
@@ -207,7 +249,7 @@ def parse_tags(self, ntags, group_name='root', group_dict={}):
                                 print("Reading array of arrays")
                             el_length, enc_eltype = \
                                 self.parse_array_definition()
-                            size = read_long(self.f, "big")
+                            size = self._read_long()
                             data = self.read_array(
                                     size=size,
                                     enc_eltype=enc_eltype,
@@ -273,9 +315,9 @@ def parse_array_definition(self):
 
         """
         self.skipif4()
-        enc_eltype = read_long(self.f, "big")
+        enc_eltype = self._read_long()
         self.skipif4()
-        length = read_long(self.f, "big")
+        length = self._read_long()
         return length, enc_eltype
 
     def parse_string_definition(self):
@@ -285,7 +327,7 @@ def parse_string_definition(self):
         string encoded dtype.
         """
         self.skipif4()
-        return read_long(self.f, "big")
+        return self._read_long()
 
     def parse_struct_definition(self):
         """Reads and returns the struct definition tuple.
@@ -296,12 +338,12 @@ def parse_struct_definition(self):
         """
         self.f.seek(4, 1) # Skip the name length
         self.skipif4(2)
-        nfields = read_long(self.f, "big")
+        nfields = self._read_long()
         definition = ()
         for ifield in xrange(nfields):
             self.f.seek(4, 1)
             self.skipif4(2)
-            definition += (read_long(self.f, "big"),)
+            definition += (self._read_long(),)
 
         return definition
 
@@ -314,7 +356,7 @@ def read_simple_data(self, etype):
         'little' endian for Intel, PC; 'big' endian for Mac, Motorola.
         If skip != 0 the data is actually skipped.
         """
-        data = self.get_data_reader(etype)[0](self.f, self.endian)
+        data = self._unpack(self._simple_format[etype], self.endian)[0]
         if isinstance(data, str):
             data = hyperspy.misc.utils.ensure_unicode(data)
         return data
@@ -329,18 +371,12 @@ def read_string(self, length, skip=False):
         """
         if skip is True:
             offset = self.f.tell()
-            self.f.seek(lenght, 1)
-            return {'size'       : lenght,
-                    'size_bytes' : size_bytes,
+            self.f.seek(length, 1)
+            return {'size'       : length,
+                    'size_bytes' : length,
                     'offset'     : offset,
                     'endian'     : self.endian,}
-        data = ''
-        if self.endian == 'little':
-            s = L_char
-        elif self.endian == 'big':
-            s = B_char
-        for char in xrange(length):
-            data += s.unpack(self.f.read(1))[0]
+        data = self.f.read(length)
         try:
             data = data.decode('utf8')
         except:
@@ -357,23 +393,16 @@ def read_struct(self, definition, skip=False):
         endian can be either 'big' or 'little'.
         
         """
-        field_value = []
-        size_bytes = 0
-        offset = self.f.tell()
         for dtype in definition:
-            if dtype in self.simple_type:
-                if skip is False:
-                    data = self.get_data_reader(dtype)[0](self.f, self.endian)
-                    field_value.append(data)
-                else:
-                    sbytes = self.get_data_reader(dtype)[1]
-                    self.f.seek(sbytes, 1)
-                    size_bytes += sbytes
-            else:
+            if dtype not in self.simple_type:
                 raise DM3DataTypeError(dtype)
+        fmt = "".join([self._simple_format[dtype] for dtype in definition])
         if skip is False:
-            return tuple(field_value)
+            return self._unpack(fmt, self.endian)
         else:
+            offset = self.f.tell()
+            size_bytes = self._get_struct(fmt, self.endian).size
+            self.f.seek(size_bytes, 1)
             return {'size'       : len(definition),
                     'size_bytes' : size_bytes,
                     'offset'     : offset,
@@ -401,7 +430,9 @@ def read_array(self, size, enc_eltype, extra=None, skip=False):
                 data['size_bytes'] *= size
         else:
             if enc_eltype in self.simple_type:  # simple type
-                data = [eltype(self.f, self.endian) for element in xrange(size)]
+                data = list(self._unpack(
+                    "%i%s" % (size, self._simple_format[enc_eltype]),
+                    self.endian))
                 if enc_eltype == 4 and data: # it's actually a string
                     data = "".join([unichr(i) for i in data])
             elif enc_eltype in self._complex_type:
@@ -414,10 +445,9 @@ def parse_tag_group(self, skip4=1):
         Returns the tuple (is_sorted, is_open, n_tags).
         endian can be either 'big' or 'little'.
         """
-        is_sorted = read_byte(self.f, "big")
-        is_open = read_byte(self.f, "big")
+        is_sorted, is_open = self._unpack('bb')
         self.skipif4(n=skip4)
-        n_tags = read_long(self.f, "big")
+        n_tags = self._read_long()
         return bool(is_sorted), bool(is_open), n_tags
            
     def find_next_tag(self):
@@ -461,8 +491,7 @@ def find_next_data_tag(self):
             self.find_next_data_tag()
 
     def parse_tag_header(self):
-        tag_id = read_byte(self.f, "big")
-        tag_name_length = read_short(self.f, "big")
+        tag_id, tag_name_length = self._unpack('bh')
         tag_name = self.read_string(tag_name_length)
         return {'tag_id' : tag_id,
                 'tag_name_length' : tag_name_length,
@@ -615,13 +644,18 @@ def signal_type(self):
             return ""
 
     def _get_data_array(self):
-        self.file.seek(self.imdict.ImageData.Data.offset)
         count = self.imdict.ImageData.Data.size
         if self.imdict.ImageData.DataType in (27, 28): # Packed complex
             count = int(count / 2)
-        return np.fromfile(self.file,
-                           dtype=self.dtype,
-                           count=count)
+        if not count:
+            return np.empty((0,), dtype=self.dtype)
+        # Copy-on-write so that modifying the data does not modify the
+        # file
+        return np.memmap(self.file,
+                         dtype=self.dtype,
+                         mode='c',
+                         offset=self.imdict.ImageData.Data.offset,
+                         shape=(count,))
     @property
     def size(self):
         if self.imdict.ImageData.DataType in (27, 28): # Packed complex
@@ -677,13 +711,8 @@ def unpack_packed_complex(self, tmpdata):
                 
         # fill in the non-redundant complex values:
         # top right quarter, except 1st column
-        for i in xrange(N): # this could be optimized
-            start = 2 * i * N + 2
-            stop = start + 2 * (N - 1) - 1
-            step = 2
-            realpart = tmpdata[start:stop:step]
-            imagpart = tmpdata[start+1:stop+1:step]
-            data[i, N+1:2*N] = realpart + imagpart * 1j
+        rows = tmpdata[:2 * N**2].reshape(N, 2 * N)
+        data[:N, N+1:2*N] = rows[:, 2::2] + rows[:, 3::2] * 1j
         # 1st column, bottom left quarter
         start = 2 * N
         stop = start + 2 * N * (N - 1) - 1
@@ -740,11 +769,22 @@ def get_mapped_parameters(self, mapped_parameters={}):
         mapped_parameters['signal_type'] = self.signal_type
         return mapped_parameters
 
+# The functions in the dictionaries returned by file_reader are defined
+# at module level so that they can be pickled (see io.load)
+def _to_spectrum(s):
+    return s.to_spectrum()
+
+def _squeeze(s):
+    return s.squeeze()
+
+def _volt2kilovolt(x):
+    return x / 1e3
+
 mapping = {
         "ImageList.TagGroup0.ImageTags.EELS.Experimental_Conditions.Collection_semi_angle_mrad"  : ("TEM.EELS.collection_angle", None),
         "ImageList.TagGroup0.ImageTags.EELS.Experimental_Conditions.Convergence_semi_angle_mrad" : ("TEM.convergence_angle", None),
         "ImageList.TagGroup0.ImageTags.Acquisition.Parameters.Detector.exposure_s" : ("TEM.dwell_time", None),
-        "ImageList.TagGroup0.ImageTags.Microscope_Info.Voltage" : ("TEM.beam_energy", lambda x: x/1e3)
+        "ImageList.TagGroup0.ImageTags.Microscope_Info.Voltage" : ("TEM.beam_energy", _volt2kilovolt)
         }
 def file_reader(filename, record_by=None, order=None, verbose=False):
     """Reads a DM3 file and loads the data into the appropriate class.
@@ -776,8 +816,8 @@ def file_reader(filename, record_by=None, order=None, verbose=False):
             mp['original_filename'] = os.path.split(filename)[1]
             post_process = []
             if image.to_spectrum is True:
-                post_process.append(lambda s: s.to_spectrum())
-            post_process.append(lambda s: s.squeeze())
+                post_process.append(_to_spectrum)
+            post_process.append(_squeeze)
             imd.append(
                     {'data' : image.get_data(),
                      'axes' : axes,
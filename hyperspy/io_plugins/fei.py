@@ -262,7 +262,60 @@ def file_reader(filename, *args, **kwds):
     elif ext in emi_extensions:
         return emi_reader(filename, *args, **kwds)
             
+def _get_stride(offsets):
+    """Return the distance between evenly spaced offsets, 0 if there is
+    only one offset or None if they are not evenly spaced.
+    
+    """
+    if len(offsets) < 2:
+        return 0
+    strides = np.diff(offsets.astype(np.int64))
+    if strides[0] > 0 and (strides == strides[0]).all():
+        return int(strides[0])
+    return None
+
+def map_elements(f, dtype, offsets):
+    """Return an array of the elements of the given dtype stored at the 
+    given offsets of the file.
+    
+    If the elements are evenly spaced, as it is usually the case, the
+    array is a view of a copy-on-write memory map of the file and 
+    therefore no data is read until it is used. Otherwise the elements 
+    are read.
+    
+    """
+    dtype = np.dtype(dtype)
+    n = len(offsets)
+    stride = _get_stride(offsets)
+    if stride is not None and n > 1 and stride < dtype.itemsize:
+        stride = None
+    if stride is not None:
+        if n < 2 or stride == dtype.itemsize:
+            return np.memmap(f, dtype=dtype, mode='c',
+                             offset=int(offsets[0]), shape=(n,))
+        # Skip the bytes between the elements, e.g. their tags
+        mapped = np.memmap(f, dtype=np.uint8, mode='c',
+                           offset=int(offsets[0]),
+                           shape=((n - 1) * stride + dtype.itemsize,))
+        return np.ndarray((n,), dtype=dtype, buffer=mapped,
+                          strides=(stride,))
+    elements = np.empty((n,), dtype=dtype)
+    for i, offset in enumerate(offsets):
+        f.seek(offset)
+        elements[i] = np.fromfile(f, dtype=dtype, count=1)[0]
+    return elements
+
 def load_ser_file(filename, verbose=False):
+    """Read the header of a ser file and map its data and tags.
+    
+    Returns
+    -------
+    header : struct array
+    data, tags : struct arrays
+        The data elements and their tags (see `map_elements`). Only the
+        valid elements are returned.
+    
+    """
     if verbose:
         print "Opening the file: ", filename
     with open(filename,'rb') as f:
@@ -282,26 +335,23 @@ def load_ser_file(filename, verbose=False):
                 "If it is a single spectrum, the data is contained in the  "
                 ".emi file but Hyperspy cannot currently extract this information.")
                 
-        data_offsets = header['Data_Offsets'][0]
-        try:
-            data_offsets = data_offsets[0]
-        except:
-            pass
+        n_elements = int(header['ValidNumberElements'][0])
+        data_offsets = np.atleast_1d(header['Data_Offsets'][0])[:n_elements]
+        tag_offsets = np.atleast_1d(header['Tag_Offsets'][0])[:n_elements]
         data_dtype_list = get_data_dtype_list(
                 f,
-                data_offsets,
+                data_offsets[0],
                 guess_record_by(header['DataTypeID']))
         tag_dtype_list =  get_data_tag_dtype_list(header['TagTypeID'])
-        f.seek(data_offsets)
-        data = np.fromfile(f,
-                           dtype=np.dtype(data_dtype_list + tag_dtype_list), 
-                           count=header["TotalNumberElements"])
+        data = map_elements(f, data_dtype_list, data_offsets)
+        tags = map_elements(f, tag_dtype_list, tag_offsets)
         if verbose is True:
             print "\n"
             print "Data info:"
             print "----------"
             print_struct_array_values(data[0])
-    return header, data
+            print_struct_array_values(tags[0])
+    return header, data, tags
     
 def get_xml_info_from_emi(emi_file):
     with open(emi_file, 'rb') as f:
@@ -321,15 +371,15 @@ def ser_reader(filename, objects=None, verbose=False, *args, **kwds):
     
     """
     
-    header, data = load_ser_file(filename, verbose=verbose)
+    header, data, tags = load_ser_file(filename, verbose=verbose)
     record_by = guess_record_by(header['DataTypeID'])
     axes = []
     ndim = int(header['NumberDimensions'])
     if record_by == 'spectrum':
         array_shape = [None,] * int(ndim)
         i_array = range(ndim)
-        if len(data['PositionY']) > 1 and \
-                (data['PositionY'][0] == data['PositionY'][1]):
+        if len(tags['PositionY']) > 1 and \
+                (tags['PositionY'][0] == tags['PositionY'][1]):
             # The spatial dimensions are stored in the reversed order
             # We reverse the shape
             i_array.reverse()
@@ -407,7 +457,8 @@ def ser_reader(filename, objects=None, verbose=False, *args, **kwds):
     # report the requested size even though no values are recorded. Therefore if
     # the shapes of the retrieved array does not match that of the data 
     # dimensions we must fill the rest with zeros or (better) nans if the 
-    # dtype is float
+    # dtype is float. Otherwise the data is a view of the memory-mapped 
+    # file.
     if np.cumprod(array_shape)[-1] != np.cumprod(data['Array'].shape)[-1]:
         dc = np.zeros(np.cumprod(array_shape)[-1], 
                       dtype = data['Array'].dtype)
@@ -426,6 +477,7 @@ def ser_reader(filename, objects=None, verbose=False, *args, **kwds):
         original_parameters = {}
     header_parameters = sarray2dict(header)
     sarray2dict(data, header_parameters)
+    sarray2dict(tags, header_parameters)
     
     # We remove the Array key to save memory avoiding duplication
     del header_parameters['Array']
@@ -23,6 +23,8 @@
 
 from hyperspy.misc.utils import ensure_unicode
 from hyperspy.axes import AxesManager
+from hyperspy.misc import chunked_array
+from hyperspy.misc.chunked_array import ChunkedArray
 
 # Plugin characteristics
 # ----------------------
@@ -38,6 +40,9 @@
 # Writing capabilities
 writes = True
 version = 1.1
+# The data can be read on demand and written block by block
+# (see io.load and io.save)
+lazy = True
 
 # -----------------------
 # File format description
@@ -68,36 +73,88 @@
 
 not_valid_format = 'The file is not a valid Hyperspy hdf5 file'
 
-def file_reader(filename, record_by, mode = 'r', driver = 'core', 
-                backing_store = False, **kwds):
-    with h5py.File(filename, mode=mode, driver=driver) as f:
-        # If the file has been created with Hyperspy it should cointain a
-        # folder Experiments.
-        experiments = []
-        exp_dict_list = []
-        if 'Experiments' in f:
-            for ds in f['Experiments']:
-                if isinstance(f['Experiments'][ds], h5py.Group):
-                    if 'data' in f['Experiments'][ds]:
-                        experiments.append(ds)
-            if not experiments:
-                raise IOError(not_valid_format)
-            # Parse the file
-            for experiment in experiments:
-                exg = f['Experiments'][experiment]
-                exp=hdfgroup2signaldict(exg)
-                exp_dict_list.append(exp)
-        else:
-            # Eventually there will be the possibility of loading the
-            # datasets of any hdf5 file
-            raise IOError('This is not a Hyperspy HDF5')
+def file_reader(filename, record_by, mode = 'r', driver = None, 
+                backing_store = False, lazy=False, data_slice=None,
+                **kwds):
+    """Read a Hyperspy HDF5 file.
+    
+    Parameters
+    ----------
+    driver : {None, 'core', str}
+        The h5py driver. 'core' reads the whole file in memory, what is
+        only faster for small files.
+    lazy : bool
+        If True the data is not read but wrapped in a ChunkedArray and
+        the file is kept open until the `close` method of the 
+        ChunkedArray is called (e.g. `s.data.close()`).
+    data_slice : {None, int, slice, Ellipsis or tuple of them}
+        If not None, only the part of the data selected by indexing it
+        (in array order) with data_slice is read and the axes are 
+        updated accordingly.
+    
+    Raises
+    ------
+    ValueError if data_slice contains other kind of indices (e.g. 
+    numpy.newaxis or arrays).
+        
+    """
+    if lazy is True:
+        # The file must remain open while the data is in use and the 
+        # core driver would load the whole file in memory
+        f = h5py.File(filename, mode=mode)
+        try:
+            exp_dict_list = _read_experiments(f, lazy=True,
+                                              data_slice=data_slice)
+        except:
+            f.close()
+            raise
+        if not any(isinstance(exp['data'], ChunkedArray)
+                   for exp in exp_dict_list):
+            # All the selected data has been read
+            f.close()
         return exp_dict_list
+    with h5py.File(filename, mode=mode, driver=driver) as f:
+        return _read_experiments(f, data_slice=data_slice)
 
-def hdfgroup2signaldict(group):
+def _read_experiments(f, lazy=False, data_slice=None):
+    # If the file has been created with Hyperspy it should cointain a
+    # folder Experiments.
+    experiments = []
+    exp_dict_list = []
+    if 'Experiments' in f:
+        for ds in f['Experiments']:
+            if isinstance(f['Experiments'][ds], h5py.Group):
+                if 'data' in f['Experiments'][ds]:
+                    experiments.append(ds)
+        if not experiments:
+            raise IOError(not_valid_format)
+        # Parse the file
+        for experiment in experiments:
+            exg = f['Experiments'][experiment]
+            exp=hdfgroup2signaldict(exg, lazy=lazy, data_slice=data_slice)
+            exp_dict_list.append(exp)
+    else:
+        # Eventually there will be the possibility of loading the
+        # datasets of any hdf5 file
+        raise IOError('This is not a Hyperspy HDF5')
+    return exp_dict_list
+
+def hdfgroup2signaldict(group, lazy=False, data_slice=None):
     exp = {}
-    exp['data'] = group['data'][:]
+    if data_slice is not None:
+        data_slice = _expand_data_slice(data_slice, 
+                                        len(group['data'].shape))
+        # Only the selected part is read, or wrapped if lazy and 
+        # larger than BLOCK_BYTES
+        exp['data'] = ChunkedArray(group['data'])[data_slice]
+        if lazy is False:
+            exp['data'] = np.asarray(exp['data'])
+    elif lazy is True:
+        exp['data'] = ChunkedArray(group['data'])
+    else:
+        exp['data'] = group['data'][:]
     axes = []
-    for i in xrange(len(exp['data'].shape)):
+    for i in xrange(len(group['data'].shape)):
         try:
             axes.append(dict(group['axis-%i' % i].attrs))
         except KeyError:
@@ -105,6 +162,8 @@ def hdfgroup2signaldict(group):
     for axis in axes:
         for key, item in axis.iteritems():
             axis[key] = ensure_unicode(item)
+    if data_slice is not None:
+        axes = _slice_axes(axes, data_slice)
     exp['mapped_parameters'] = hdfgroup2dict(
         group['mapped_parameters'], {})
     exp['original_parameters'] = hdfgroup2dict(
@@ -145,6 +204,54 @@ def hdfgroup2signaldict(group):
         
     return exp
 
+def _expand_data_slice(data_slice, ndim):
+    """Return data_slice as a tuple with an int or a slice for each of
+    the ndim dimensions of the data.
+    
+    Raises
+    ------
+    ValueError if data_slice contains other kind of indices or too 
+    many of them.
+    
+    """
+    if not isinstance(data_slice, tuple):
+        data_slice = (data_slice,)
+    for key in data_slice:
+        if not (key is Ellipsis or isinstance(
+                key, (int, long, np.integer, slice))):
+            raise ValueError(
+                "data_slice can only contain ints, slices and Ellipsis, "
+                "not %s" % repr(key))
+    data_slice = list(data_slice)
+    if data_slice.count(Ellipsis) > 1:
+        raise ValueError("data_slice can only contain one Ellipsis")
+    elif Ellipsis in data_slice:
+        i = data_slice.index(Ellipsis)
+        data_slice[i:i + 1] = [slice(None)] * (ndim - len(data_slice) + 1)
+    if len(data_slice) > ndim:
+        raise ValueError("data_slice has too many indices")
+    return tuple(data_slice + [slice(None)] * (ndim - len(data_slice)))
+
+def _slice_axes(axes, data_slice):
+    """Return the dictionaries of the axes, in array order, of the part of 
+    the data selected by data_slice (see `_expand_data_slice`).
+    
+    """
+    sliced_axes = []
+    for axis, key in zip(axes, data_slice):
+        if not isinstance(key, slice):
+            # The axis is removed by integer indexing
+            continue
+        start, stop, step = key.indices(axis['size'])
+        axis = axis.copy()
+        axis['offset'] = axis['offset'] + start * axis['scale']
+        axis['scale'] = axis['scale'] * step
+        axis['size'] = len(xrange(start, stop, step))
+        sliced_axes.append(axis)
+    for i, axis in enumerate(sliced_axes):
+        axis['index_in_array'] = i
+    return sliced_axes
+
 def dict2hdfgroup(dictionary, group, compression=None):
     from hyperspy.misc.utils import DictionaryBrowser
     from hyperspy.signal import Signal
@@ -228,10 +335,111 @@ def hdfgroup2dict(group, dictionary = {}):
                 hdfgroup2dict(group[key], dictionary[key])
     return dictionary
 
-def write_signal(signal, group, compression='gzip'):
-    group.create_dataset('data',
-                         data=signal.data,
-                         compression=compression)
+def get_signal_chunks(shape, dtype, signal_axes=None,
+                      target_size=2 ** 20):
+    """Return a chunk shape that contains whole signals (if they fit in 
+    target_size bytes) and as many navigation positions as needed to
+    reach about target_size bytes.
+    
+    Parameters
+    ----------
+    shape : tuple
+    dtype : numpy dtype
+    signal_axes : {None, list of ints}
+        The indices in array of the signal axes. If None, the last axis.
+    target_size : int
+        The approximate size of the chunks in bytes.
+        
+    """
+    ndim = len(shape)
+    if signal_axes is None:
+        signal_axes = [ndim - 1]
+    signal_axes = [i % ndim for i in signal_axes]
+    itemsize = np.dtype(dtype).itemsize
+    chunks = [shape[i] if i in signal_axes else 1 for i in xrange(ndim)]
+    # Split the signal if it is too large
+    while (np.prod(chunks) * itemsize > target_size and
+           max(chunks[i] for i in signal_axes) > 1):
+        i = max(signal_axes, key=lambda i: chunks[i])
+        chunks[i] = (chunks[i] + 1) // 2
+    # Add navigation positions starting from the fastest axis
+    for i in reversed(xrange(ndim)):
+        if i in signal_axes:
+            continue
+        factor = int(target_size // (np.prod(chunks) * itemsize))
+        if factor < 2:
+            break
+        chunks[i] = min(shape[i], factor)
+    return tuple(int(max(chunk, 1)) for chunk in chunks)
+
+def _iterate_blocks(data):
+    """Iterate over an array-like in blocks of about BLOCK_BYTES of its 
+    first axis.
+    
+    """
+    row_bytes = (np.prod(data.shape[1:]) * np.dtype(data.dtype).itemsize)
+    step = int(max(chunked_array.BLOCK_BYTES // max(row_bytes, 1), 1))
+    for start in xrange(0, data.shape[0], step):
+        yield data[start:start + step]
+
+def write_data(group, name, data, shape=None, dtype=None, **kwds):
+    """Create a dataset writing the data incrementally if it is not in
+    memory.
+    
+    Parameters
+    ----------
+    group : h5py Group
+    name : string
+    data : numpy array, array-like or iterable
+        A numpy array is written at once. Other array-like objects that
+        support slicing their first axis (e.g. ChunkedArray, 
+        LowRankArray or numpy.memmap) are read and written in blocks. 
+        Any other iterable (e.g. a generator) must yield blocks, or 
+        single elements, of the first axis of the dataset, whose shape 
+        and dtype must then be given.
+    shape : {None, tuple}
+    dtype : {None, numpy dtype}
+    **kwds
+        Passed to h5py.Group.create_dataset, e.g. chunks, compression 
+        and shuffle.
+    
+    Returns
+    -------
+    h5py Dataset
+    
+    """
+    if type(data) is np.ndarray:
+        return group.create_dataset(name, data=data, **kwds)
+    if hasattr(data, 'shape') and hasattr(data, '__getitem__'):
+        shape, dtype = data.shape, data.dtype
+        data = _iterate_blocks(data)
+    elif shape is None or dtype is None:
+        raise ValueError("The shape and dtype of the dataset must be given "
+                         "to write it from an iterable")
+    dataset = group.create_dataset(name, shape=shape, dtype=dtype, **kwds)
+    start = 0
+    for block in data:
+        block = np.asarray(block)
+        if block.ndim == len(shape) - 1:
+            block = block[np.newaxis]
+        if start + len(block) > shape[0]:
+            raise ValueError("The data is larger than the dataset")
+        dataset[start:start + len(block)] = block
+        start += len(block)
+    if start != shape[0]:
+        raise ValueError("The data is smaller than the dataset")
+    return dataset
+
+def write_signal(signal, group, compression='gzip', shuffle=False,
+                 chunks=True):
+    if chunks is True:
+        chunks = get_signal_chunks(
+            signal.data.shape, signal.data.dtype,
+            [axis.index_in_array for axis in 
+             signal.axes_manager.signal_axes]) \
+            if signal.data.size else None
+    write_data(group, 'data', signal.data, chunks=chunks, 
+               compression=compression, shuffle=shuffle)
     for axis in signal.axes_manager._axes:
         axis_dict = axis.get_axis_dictionary()
         # For the moment we don't store the navigate attribute
@@ -254,7 +462,24 @@ def write_signal(signal, group, compression='gzip'):
         dict2hdfgroup(signal.peak_learning_results.__dict__, 
                   peak_learning_results, compression = compression)
                                                                         
-def file_writer(filename, signal, compression = 'gzip', *args, **kwds):
+def file_writer(filename, signal, compression = 'gzip', shuffle=False,
+                chunks=True, *args, **kwds):
+    """Write the signal in a Hyperspy HDF5 file.
+    
+    Parameters
+    ----------
+    compression : {'gzip', 'lzf', None}
+        'lzf' is much faster than 'gzip' but compresses less.
+    shuffle : bool
+        Apply the shuffle filter, that usually improves the compression
+        of numeric data.
+    chunks : {True, None, tuple}
+        If True, the chunks contain whole signals (see 
+        `get_signal_chunks`) so that reading a spectrum or an image 
+        only decompresses the chunks that contain it. If None, h5py 
+        chooses the chunks. Otherwise the given chunk shape is used.
+    
+    """
     with h5py.File(filename, mode = 'w') as f:
         f.attrs['file_format'] = "Hyperspy"
         f.attrs['file_format_version'] = version
@@ -262,4 +487,5 @@ def file_writer(filename, signal, compression = 'gzip', *args, **kwds):
         group_name = signal.mapped_parameters.title if \
                      signal.mapped_parameters.title else '__unnamed__'
         expg = exps.create_group(group_name)
-        write_signal(signal,expg, compression = compression)
+        write_signal(signal,expg, compression = compression,
+                     shuffle=shuffle, chunks=chunks)
@@ -17,6 +17,8 @@
 # along with  Hyperspy.  If not, see <http://www.gnu.org/licenses/>.
 
 import locale
+import re
+import tempfile
 import time
 import datetime
 import codecs
@@ -125,41 +127,61 @@
                     'TEM.EDS.EDS_det'},	
             }
 
+# The line that separates the keywords from the data. The files are read
+# without translating the newlines and CRLF is the standard line ending.
+spectrum_keyword = re.compile(r'^#+[ \t]*SPECTRUM[ \t]*(?:: .*)?\r?$',
+                              re.MULTILINE)
+
+def parse_data(data, datatype):
+    """Parse the data section of a msa file.
+    
+    The numbers are converted by numpy in a single call. Only files 
+    with comments in the data section or with XY lines that do not 
+    contain exactly two columns are parsed line by line.
+    
+    """
+    if '#' in data:
+        data = u'\n'.join([line for line in data.splitlines()
+                           if not line.startswith('#')])
+    values = np.array(data.replace(',', ' ').split(), dtype=float)
+    if datatype == 'Y':
+        return values
+    elif datatype == 'XY':
+        lines = [line for line in data.splitlines() if line.strip()]
+        if len(values) == 2 * len(lines):
+            return values[1::2]
+        return np.array([line.replace(',', ' ').split()[1] 
+                         for line in lines], dtype=float)
+
 def file_reader(filename, encoding='latin-1', **kwds):
-    parameters = {}
-    mapped = DictionaryBrowser({})
     with codecs.open(
             filename,
             encoding=encoding,
             errors='replace') as spectrum_file:
-        y = []
-        # Read the keywords
-        data_section = False
-        for line in spectrum_file.readlines():
-            if data_section is False:
-                if line[0] == "#":
-                    try:
-                        key,value = line.split(': ')
-                        value = value.strip()
-                    except ValueError:
-                        key = line
-                        value = None
-                    key = key.strip('#').strip()
-                    
-                    if key != 'SPECTRUM':
-                        parameters[key] = value
-                    else:
-                        data_section = True
-            else:
-                # Read the data
-                if line[0] != "#" and line.strip(): 
-                    if parameters['DATATYPE'] == 'XY':
-                        xy = line.replace(',', ' ').strip().split()
-                        y.append(float(xy[1]))
-                    elif parameters['DATATYPE'] == 'Y':
-                        data = [
-                        float(i) for i in line.replace(',', ' ').strip().split()]
-                        y.extend(data)
+        return [parse_msa_string(spectrum_file.read(), filename),]
+
+def parse_msa_string(string, filename=None):
+    """Parse the content of a msa file and return a signal dictionary."""
+    parameters = {}
+    mapped = DictionaryBrowser({})
+    # Read the keywords
+    match = spectrum_keyword.search(string)
+    header = string[:match.start()] if match else string
+    for line in header.splitlines():
+        if line and line[0] == "#":
+            try:
+                key,value = line.split(': ')
+                value = value.strip()
+            except ValueError:
+                key = line
+                value = None
+            key = key.strip('#').strip()
+            parameters[key] = value
+    # Read the data
+    if match:
+        y = parse_data(string[match.end():], parameters['DATATYPE'])
+    else:
+        y = np.array([])
     # We rewrite the format value to be sure that it complies with the 
     # standard, because it will be used by the writer routine
     parameters['FORMAT'] = "EMSA/MAS Spectral Data File"
@@ -245,12 +267,68 @@ def file_reader(filename, encoding='latin-1', **kwds):
         mapped.signal_type = 'EELS'
 
     dictionary = {
-                    'data' : np.array(y),
+                    'data' : y,
                     'axes' : axes,
                     'mapped_parameters': mapped.as_dictionary(),
                     'original_parameters' : parameters
                 }
-    return [dictionary,]
+    return dictionary
+
+def stack_reader(filenames, encoding='latin-1', 
+                 new_axis_name='stack_element', mmap=False, mmap_dir=None,
+                 **kwds):
+    """Read msa files with data of the same size in a single signal 
+    dictionary with an extra axis.
+    
+    The result is equivalent to that of `utils.stack` (see `io.load`) but 
+    the data is read directly into the stack without creating a signal
+    for every file.
+    
+    """
+    data = None
+    stack_elements = {}
+    for i, filename in enumerate(filenames):
+        with codecs.open(
+                filename,
+                encoding=encoding,
+                errors='replace') as spectrum_file:
+            dictionary = parse_msa_string(spectrum_file.read(), filename)
+        if data is None:
+            first = dictionary
+            stack_shape = (len(filenames),) + dictionary['data'].shape
+            if mmap is False:
+                data = np.empty(stack_shape, dtype=dictionary['data'].dtype)
+            else:
+                data = np.memmap(tempfile.NamedTemporaryFile(dir=mmap_dir),
+                                 dtype=dictionary['data'].dtype,
+                                 mode='w+',
+                                 shape=stack_shape)
+        elif dictionary['data'].shape != stack_shape[1:]:
+            raise IOError(
+                "Only files with data of the same shape can be stacked")
+        data[i] = dictionary['data']
+        stack_elements['element%i' % i] = {
+            'original_parameters' : dictionary['original_parameters'],
+            'mapped_parameters' : dictionary['mapped_parameters'],}
+    axes = [dict(axis) for axis in first['axes']]
+    for axis in axes:
+        axis['index_in_array'] += 1
+    axis_name = new_axis_name
+    j = 1
+    while axis_name in [axis['name'] for axis in axes]:
+        axis_name = new_axis_name + "-%i" % j
+        j += 1
+    axes.insert(0, {'name' : axis_name,
+                    'size' : len(filenames),
+                    'index_in_array' : 0,
+                    'navigate' : True,})
+    mapped = dict(first['mapped_parameters'])
+    mapped['title'] = "Stack of " + mapped.get('title', '')
+    return [{'data' : data,
+             'axes' : axes,
+             'mapped_parameters' : mapped,
+             'original_parameters' : {'stack_elements' : stack_elements},
+             },]
 
 def file_writer(filename, signal, format = None, separator = ', ',
                 encoding = 'latin-1'):
@@ -358,15 +436,19 @@ def file_writer(filename, signal, format = None, separator = ', ',
         
         f.write(u'#%-12s: Spectral Data Starts Here\u000D\u000A' % 'SPECTRUM')
 
+        # The data is formatted in one pass by repeating the format of
+        # a line
+        separator = separator.replace('%', '%%')
+        y = np.asarray(signal.data).ravel()
         if format == 'XY':        
-            for x,y in zip(signal.axes_manager._axes[0].axis, signal.data):
-                f.write("%g%s%g" % (x, separator, y))
-                f.write(u'\u000D\u000A')
+            line = u'%g' + separator + u'%g\u000D\u000A'
+            values = np.column_stack((signal.axes_manager._axes[0].axis,
+                                      y)).ravel()
         elif format == 'Y':
-            for y in signal.data:
-                f.write('%f%s' % (y, separator))
-                f.write(u'\u000D\u000A')
+            line = u'%f' + separator + u'\u000D\u000A'
+            values = y
         else:
             raise ValueError('format must be one of: None, \'XY\' or \'Y\'')
+        f.write(line * len(y) % tuple(values.tolist()))
 
         f.write(u'#%-12s: End Of Data and File' % 'ENDOFDATA')
@@ -30,6 +30,7 @@
 from hyperspy.misc.io.utils_readfile import *
 from hyperspy import Release
 from hyperspy.misc.utils import DictionaryBrowser
+from hyperspy.misc import chunked_array
 
 # Plugin characteristics
 # ----------------------
@@ -44,6 +45,8 @@
 default_extension = 0
 # Writing capabilities
 writes = [(1,0), (1,1), (1,2), (2,0), (2,1),]
+# Data that is not in memory is written block by block (see io.save)
+lazy = True
 # ----------------------
 
 # The format only support the followng data types
@@ -193,7 +196,7 @@ def read_raw(rpl_info, fp, mmap_mode='c'):
     into memory.  However, it can be accessed and sliced like any
     ndarray.  Memory mapping is especially useful for accessing
     small fragments of large files without reading the entire file
-    into memory.
+    into memory. If None, the data is read in memory.
     
     
     """
@@ -226,10 +229,15 @@ def read_raw(rpl_info, fp, mmap_mode='c'):
     data_type = np.dtype(data_type)
     data_type = data_type.newbyteorder(endian)
 
-    data = np.memmap(fp,
-                     offset=offset,
-                     dtype=data_type,
-                     mode=mmap_mode)
+    if mmap_mode is None:
+        with open(fp, 'rb') as f:
+            f.seek(offset)
+            data = np.fromfile(f, dtype=data_type)
+    else:
+        data = np.memmap(fp,
+                         offset=offset,
+                         dtype=data_type,
+                         mode=mmap_mode)
 
     if record_by == 'vector':   # spectral image
         size = (height, width, depth)
@@ -341,6 +349,14 @@ def file_reader(filename, rpl_info=None, encoding="latin-1",
     Other keys and values can be included and are ignored.
 
     Any number of spaces can go along with each tab.
+
+    The data is stored in the array order of the signal, therefore it is
+    never reordered after reading. By default it is memory mapped in
+    copy-on-write mode ('c'): the data can be modified in memory without
+    changing the file. Use mmap_mode='r' to get a read-only memory map
+    that never copies the data, e.g. to process large files with
+    io.load(..., lazy=True), or mmap_mode=None to read the data in
+    memory.
     
     """
     
@@ -490,7 +506,26 @@ def file_reader(filename, rpl_info=None, encoding="latin-1",
         }
     return [dictionary, ]
 
-def file_writer(filename, signal, encoding='latin-1', *args, **kwds):
+def file_writer(filename, signal, encoding='latin-1', byte_order=None,
+                *args, **kwds):
+    """Write a Spectrum or Image to a ripple (.rpl) file and the data to
+    the corresponding raw (.raw) file.
+
+    The raw file is written block by block (see `write_raw`), therefore
+    memory mapped and lazy data (e.g. a ChunkedArray) is never loaded in
+    memory as a whole.
+
+    Parameters
+    ----------
+    filename : string
+    signal : Signal
+    encoding : string
+        The encoding of the rpl file.
+    byte_order : {None, 'little-endian', 'big-endian'}
+        The byte order of the raw file. If None, that of the data is
+        used.
+
+    """
 
     # Set the optional keys to None
     ev_per_chan = None
@@ -511,7 +546,11 @@ def file_writer(filename, signal, encoding='latin-1', *args, **kwds):
 
     # Gather the information to write the rpl
     data_type, data_length = dtype2keys[dc.dtype.name]
-    byte_order = endianess2rpl[dc.dtype.byteorder.replace('|', '=')]
+    if byte_order is None or data_length == 1:
+        byte_order = endianess2rpl[dc.dtype.byteorder.replace('|', '=')]
+    elif byte_order not in ('little-endian', 'big-endian'):
+        raise ValueError("byte_order must be 'little-endian' or "
+                         "'big-endian'")
     offset = 0
     if hasattr(signal.mapped_parameters,'signal_type'):
         signal_type = signal.mapped_parameters.signal_type
@@ -603,7 +642,7 @@ def file_writer(filename, signal, encoding='latin-1', *args, **kwds):
             keys_dictionary['energy-resolution'] = mp.EDS.energy_resolution_MnKa
         
     write_rpl(filename, keys_dictionary, encoding)
-    write_raw(filename, signal, record_by)
+    write_raw(filename, signal, record_by, byte_order)
 
 def write_rpl(filename, keys_dictionary, encoding = 'ascii'):
     f = codecs.open(filename, 'w', encoding = encoding,
@@ -618,35 +657,52 @@ def write_rpl(filename, keys_dictionary, encoding = 'ascii'):
         f.write(key + '\t' + value + '\n')
     f.close()
 
-def write_raw(filename, signal, record_by):
+def _get_raw_axes_order(signal, record_by):
+    """Return the order of the array axes of the signal in the raw file."""
+    axes = range(len(signal.data.shape))
+    if record_by == 'vector' and len(axes) > 1:
+        index = signal.axes_manager.signal_axes[0].index_in_array
+        axes.remove(index)
+        axes.append(index)
+    elif record_by == 'image' and len(axes) == 3:
+        index = signal.axes_manager.navigation_axes[0].index_in_array
+        axes.remove(index)
+        axes.insert(0, index)
+    return axes
+
+def write_raw(filename, signal, record_by, byte_order='dont-care'):
     """Writes the raw file object
 
+    The data is read and written in blocks of about 
+    chunked_array.BLOCK_BYTES along the first axis of the file, reordering
+    and byte-swapping only one block at a time. Therefore, the data can 
+    be a numpy array, a numpy.memmap or any array-like object that 
+    supports slicing, e.g. a ChunkedArray.
+
     Parameters:
     -----------
     filename : string
         the filename, either with the extension or without it
     record_by : string
      'vector' or 'image'
+    byte_order : {'dont-care', 'little-endian', 'big-endian'}
+        'dont-care' writes the data in its own byte order.
 
         """
     filename = os.path.splitext(filename)[0] + '.raw'
-    dshape = signal.data.shape
     data = signal.data
-    if len(dshape) == 3:
-        if record_by == 'vector':
-            np.rollaxis(
-                data, signal.axes_manager.signal_axes[0].index_in_array, 3
-                        ).ravel().tofile(filename)
-        elif record_by == 'image':
-            data = np.rollaxis(
-                data, signal.axes_manager.navigation_axes[0].index_in_array, 0
-                        ).ravel().tofile(filename)
-    elif len(dshape) == 2:
-        if record_by == 'vector':
-            np.rollaxis(
-                data, signal.axes_manager.signal_axes[0].index_in_array, 2
-                        ).ravel().tofile(filename)
-        elif record_by in ('image', 'dont-care'):
-            data.ravel().tofile(filename)
-    elif len(dshape) == 1:
-        data.ravel().tofile(filename)
+    dtype = np.dtype(data.dtype)
+    if byte_order == 'little-endian':
+        dtype = dtype.newbyteorder('<')
+    elif byte_order == 'big-endian':
+        dtype = dtype.newbyteorder('>')
+    axes = _get_raw_axes_order(signal, record_by)
+    shape = [data.shape[axis] for axis in axes]
+    row_bytes = int(np.prod(shape[1:])) * dtype.itemsize
+    step = int(max(chunked_array.BLOCK_BYTES // max(row_bytes, 1), 1))
+    key = [slice(None)] * len(axes)
+    with open(filename, 'wb') as f:
+        for start in xrange(0, shape[0], step):
+            key[axes[0]] = slice(start, start + step)
+            block = np.asarray(data[tuple(key)]).transpose(axes)
+            np.ascontiguousarray(block, dtype=dtype).tofile(f)
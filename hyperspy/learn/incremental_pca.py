@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# Copyright 2007-2011 The Hyperspy developers
+#
+# This file is part of  Hyperspy.
+#
+#  Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+#  Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with  Hyperspy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Decomposition tools that only access the data in blocks of rows.
+
+The data matrix can be any 2D array-like object that supports slicing
+of its first axis, e.g. a numpy array, a numpy.memmap or an h5py
+dataset, so that the full matrix never needs to be loaded in memory.
+
+"""
+
+import numpy as np
+import scipy.linalg
+
+# Default maximum size in bytes of a block of rows read from the data
+BLOCK_BYTES = 2 ** 26
+
+
+def get_block_size(data, block_size=None):
+    """Number of rows that fit in a block of about BLOCK_BYTES bytes."""
+    if block_size is None:
+        block_size = BLOCK_BYTES // (8 * max(data.shape[1], 1))
+    return int(max(block_size, 1))
+
+
+def iterate_blocks(data, navigation_mask=None, signal_mask=None,
+                   block_size=None):
+    """Iterate over the data matrix in blocks of rows.
+
+    Parameters
+    ----------
+    data : array-like
+        NxM matrix (N navigation positions, M signal channels).
+    navigation_mask : None or boolean numpy array of length N
+        The rows marked as True are used, the rest are skipped.
+    signal_mask : None or boolean numpy array of length M
+        The columns marked as True are used, the rest are skipped.
+    block_size : None or int
+        Maximum number of rows per block. If None, it is chosen so that
+        each block takes about BLOCK_BYTES bytes.
+
+    Yields
+    ------
+    start, stop : int
+        The limits of the block in the data.
+    rows : boolean numpy array or slice
+        The rows of the block selected by the navigation mask.
+    block : float64 numpy array
+        The selected part of the block.
+
+    """
+    block_size = get_block_size(data, block_size)
+    for start in xrange(0, data.shape[0], block_size):
+        stop = min(start + block_size, data.shape[0])
+        if navigation_mask is None:
+            rows = slice(None)
+        else:
+            rows = navigation_mask[start:stop]
+            if not rows.any():
+                continue
+        block = np.array(data[start:stop], dtype='float64')
+        if signal_mask is not None:
+            block = block[:, signal_mask]
+        yield start, stop, rows, block[rows]
+
+
+def poissonian_weights(data, navigation_mask=None, signal_mask=None,
+                       block_size=None):
+    """Compute the weights to normalize the Poissonian noise of the
+    data following Surf. Interface Anal. 2004; 36: 203–212.
+
+    The data is read in blocks of rows. See `iterate_blocks` for the
+    description of the parameters.
+
+    Returns
+    -------
+    root_aG : numpy array of shape (n, 1)
+    root_bH : numpy array of shape (1, m)
+        where n and m are the number of selected rows and columns.
+
+    """
+    aG = []
+    bH = 0
+    for start, stop, rows, block in iterate_blocks(
+            data, navigation_mask, signal_mask, block_size):
+        aG.append(block.sum(1))
+        bH = bH + block.sum(0)
+    aG = np.hstack(aG)
+    if (aG < 0).any() or (bH < 0).any():
+        raise ValueError(
+            "Data error: negative values\n"
+            "Are you sure that the data follow a poissonian "
+            "distribution?")
+    return np.sqrt(aG)[:, np.newaxis], np.sqrt(bH)[np.newaxis, :]
+
+
+def normalize_block(block, root_aG, root_bH):
+    """Divide the block in place by root_aG * root_bH and set the nans
+    resulting from 0/0 to zero.
+
+    """
+    old_settings = np.seterr(invalid='ignore', divide='ignore')
+    try:
+        block /= root_aG * root_bH
+    finally:
+        np.seterr(**old_settings)
+    block[~np.isfinite(block)] = 0
+    return block
+
+
+def _iterate_normalized_blocks(data, navigation_mask, signal_mask,
+                               block_size, root_aG, root_bH):
+    i = 0
+    for start, stop, rows, block in iterate_blocks(
+            data, navigation_mask, signal_mask, block_size):
+        if root_aG is not None:
+            n = len(block)
+            normalize_block(block, root_aG[i:i + n], root_bH)
+            i += n
+        yield block
+
+
+def incremental_pca(data, output_dimension=None, centre=None,
+                    navigation_mask=None, signal_mask=None,
+                    root_aG=None, root_bH=None, block_size=None):
+    """Perform PCA reading the data in blocks of rows.
+
+    The covariance matrix of the signal channels is accumulated block by
+    block and diagonalized. The loadings are then computed in a second
+    pass over the data. Therefore, only a block of rows, the MxM
+    covariance matrix and the loadings are held in memory at any time.
+
+    Parameters
+    ----------
+    data : array-like
+        NxM matrix (N navigation positions, M signal channels). It can be
+        a numpy array, a numpy.memmap or an h5py dataset.
+    output_dimension : None or int
+        Number of components to keep. If None, all are kept.
+    centre : None | 'variables' | 'trials'
+        As in `svd_pca`.
+    navigation_mask : None or boolean numpy array of length N
+        The rows marked as True are used, the rest are skipped.
+    signal_mask : None or boolean numpy array of length M
+        The columns marked as True are used, the rest are skipped.
+    root_aG, root_bH : None or numpy array
+        If not None, the data is divided by root_aG * root_bH on the fly
+        (see `poissonian_weights`).
+    block_size : None or int
+        Maximum number of rows per block. If None, it is chosen so that
+        each block takes about BLOCK_BYTES bytes.
+
+    Returns
+    -------
+    factors : numpy array
+    loadings : numpy array
+    explained_variance : numpy array
+    mean : numpy array or None (if center is None)
+
+    """
+    if centre not in (None, 'variables', 'trials'):
+        raise AttributeError(
+            'centre must be one of: None, variables, trials')
+
+    def blocks():
+        return _iterate_normalized_blocks(data, navigation_mask,
+                                          signal_mask, block_size,
+                                          root_aG, root_bH)
+    # First pass: covariance matrix
+    covariance = 0
+    column_sum = 0
+    row_means = []
+    N = 0
+    for block in blocks():
+        if centre == 'variables':
+            row_mean = block.mean(1)[:, np.newaxis]
+            row_means.append(row_mean)
+            block -= row_mean
+        covariance = covariance + np.dot(block.T, block)
+        column_sum = column_sum + block.sum(0)
+        N += len(block)
+    if centre == 'trials':
+        mean = (column_sum / N)[np.newaxis, :]
+        covariance -= N * np.dot(mean.T, mean)
+    elif centre == 'variables':
+        mean = np.vstack(row_means)
+    else:
+        mean = None
+    eigenvalues, eigenvectors = scipy.linalg.eigh(covariance)
+    # Sort in decreasing order
+    eigenvalues = eigenvalues[::-1].clip(0)
+    eigenvectors = eigenvectors[:, ::-1]
+    if output_dimension is not None:
+        eigenvalues = eigenvalues[:output_dimension]
+        eigenvectors = eigenvectors[:, :output_dimension]
+    factors = eigenvectors
+    explained_variance = eigenvalues / N
+
+    # Second pass: loadings
+    loadings = np.empty((N, factors.shape[1]))
+    i = 0
+    for block in blocks():
+        n = len(block)
+        if centre == 'variables':
+            block -= mean[i:i + n]
+        elif centre == 'trials':
+            block -= mean
+        loadings[i:i + n] = np.dot(block, factors)
+        i += n
+    return factors, loadings, explained_variance, mean
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Copyright 2007-2011 The Hyperspy developers
+#
+# This file is part of  Hyperspy.
+#
+#  Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+#  Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with  Hyperspy.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+from hyperspy.learn.incremental_pca import BLOCK_BYTES
+
+
+class LowRankArray(object):
+    """Array-like object that stores the product of the loadings and the
+    factors of a decomposition and computes its elements on demand.
+
+    Indexing, `sum` and `squeeze` only compute the requested part of the
+    data. Any numpy function that requires the full array (and
+    `numpy.asarray`) materializes it block by block, without
+    intermediate copies.
+
+    Parameters
+    ----------
+    loadings : numpy array
+        Array of shape navigation_shape + (n,), where n is the number of
+        components.
+    factors : numpy array
+        Array of shape signal_shape + (n,).
+
+    """
+
+    def __init__(self, loadings, factors):
+        if loadings.shape[-1] != factors.shape[-1]:
+            raise ValueError("The loadings and the factors must have the "
+                             "same number of components")
+        self.loadings = loadings
+        self.factors = factors
+
+    @classmethod
+    def from_decomposition(cls, factors, loadings, navigation_shape,
+                           signal_shape, mean=None, centre=None):
+        """Create a LowRankArray from the results of a decomposition.
+
+        Parameters
+        ----------
+        factors : numpy array
+            MxN array (M signal channels, N components).
+        loadings : numpy array
+            PxN array (P navigation positions).
+        navigation_shape, signal_shape : tuple
+            The shapes of the navigation and signal spaces in array order.
+        mean : None or numpy array
+            The mean subtracted before the decomposition, as returned by
+            `svd_pca` for the 'trials' (1xM) or 'variables' (Px1) centre.
+        centre : {None, 'trials', 'variables'}
+            The centre of the decomposition. It must be given if mean is
+            not None.
+
+        Raises
+        ------
+        ValueError if mean is given and centre is not 'trials' or 
+        'variables'.
+
+        """
+        if mean is not None:
+            if centre not in ('trials', 'variables'):
+                raise ValueError(
+                    "centre must be 'trials' or 'variables' when the "
+                    "mean is given")
+            # The mean is stored as an extra component
+            mean = np.asarray(mean)
+            if centre == 'trials':
+                loadings = np.hstack((loadings,
+                                      np.ones((len(loadings), 1))))
+                factors = np.hstack((factors, mean.T))
+            else:
+                loadings = np.hstack((loadings, mean))
+                factors = np.hstack((factors, np.ones((len(factors), 1))))
+        return cls(loadings.reshape(tuple(navigation_shape) + (-1,)),
+                   factors.reshape(tuple(signal_shape) + (-1,)))
+
+    @property
+    def navigation_shape(self):
+        return self.loadings.shape[:-1]
+
+    @property
+    def signal_shape(self):
+        return self.factors.shape[:-1]
+
+    @property
+    def shape(self):
+        return self.navigation_shape + self.signal_shape
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self):
+        return np.result_type(self.loadings, self.factors)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return "<LowRankArray, shape: %s, components: %i>" % (
+            str(self.shape), self.loadings.shape[-1])
+
+    def _product(self, loadings, factors):
+        return np.tensordot(loadings, factors, axes=([-1], [-1]))
+
+    def _expand_key(self, key):
+        if not isinstance(key, (tuple, list)):
+            key = (key,)
+        key = list(key)
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key[i:i + 1] = [slice(None)] * (self.ndim - len(key) + 1)
+        if len(key) > self.ndim:
+            raise IndexError("too many indices")
+        return key + [slice(None)] * (self.ndim - len(key))
+
+    def __getitem__(self, key):
+        key = self._expand_key(key)
+        nav_ndim = len(self.navigation_shape)
+        loadings = self.loadings[tuple(key[:nav_ndim]) + (slice(None),)]
+        factors = self.factors[tuple(key[nav_ndim:]) + (slice(None),)]
+        return self._product(loadings, factors)
+
+    def __array__(self, dtype=None):
+        data = np.empty(self.shape, dtype=self.dtype if dtype is None
+                        else dtype)
+        n_components = self.loadings.shape[-1]
+        loadings = self.loadings.reshape((-1, n_components))
+        factors = self.factors.reshape((-1, n_components))
+        unfolded = data.reshape((len(loadings), len(factors)))
+        block_size = max(BLOCK_BYTES // (8 * max(len(factors), 1)), 1)
+        for start in xrange(0, len(loadings), block_size):
+            unfolded[start:start + block_size] = np.dot(
+                loadings[start:start + block_size], factors.T)
+        return data
+
+    def copy(self):
+        """Return the data as a numpy array."""
+        return np.asarray(self)
+
+    def squeeze(self):
+        return LowRankArray(
+            self.loadings.reshape(
+                tuple(i for i in self.navigation_shape if i != 1) + (-1,)),
+            self.factors.reshape(
+                tuple(i for i in self.signal_shape if i != 1) + (-1,)))
+
+    def sum(self, axis=None, dtype=None, out=None, **kwargs):
+        """Sum over the given axis computing only the result.
+
+        If the result has no navigation or signal dimensions it is
+        returned as a numpy array, otherwise as a LowRankArray.
+
+        """
+        if axis is None:
+            result = self._product(
+                self.loadings.reshape((-1, self.loadings.shape[-1])).sum(0),
+                self.factors.reshape((-1, self.factors.shape[-1])).sum(0))
+        else:
+            if axis < 0:
+                axis += self.ndim
+            nav_ndim = len(self.navigation_shape)
+            loadings, factors = self.loadings, self.factors
+            if axis < nav_ndim:
+                loadings = loadings.sum(axis)
+            else:
+                factors = factors.sum(axis - nav_ndim)
+            if loadings.ndim == 1 or factors.ndim == 1:
+                result = self._product(loadings, factors)
+            else:
+                result = LowRankArray(loadings, factors)
+        if dtype is not None:
+            result = result.astype(dtype)
+        if out is not None:
+            out[...] = result
+            return out
+        return result
+
+    def astype(self, dtype):
+        return LowRankArray(self.loadings.astype(dtype),
+                            self.factors.astype(dtype))
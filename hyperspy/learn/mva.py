@@ -35,8 +35,14 @@
 from hyperspy.misc.machine_learning.import_sklearn import *
 from hyperspy.misc import utils
 import hyperspy.misc.io.tools as io_tools 
-from hyperspy.learn.svd_pca import svd_pca
+from hyperspy.learn.svd_pca import svd_pca, randomized_svd
 from hyperspy.learn.mlpca import mlpca
+from hyperspy.learn.low_rank import LowRankArray
+from hyperspy.misc.chunked_array import ChunkedArray
+from hyperspy.learn.incremental_pca import (incremental_pca,
+                                            poissonian_weights,
+                                            get_block_size,
+                                            normalize_block)
 from hyperspy.defaults_parser import preferences
 from hyperspy import messages
 from hyperspy.decorators import auto_replot, do_not_replot
@@ -87,10 +93,21 @@ def decomposition(self,
         Parameters
         ----------
         normalize_poissonian_noise : bool
-            If True, scale the SI to normalize Poissonian noise
+            If True, scale the SI to normalize Poissonian noise. The 
+            scaling is applied to the data given to the algorithm, the
+            signal data is not modified.
             
         algorithm : 'svd' | 'fast_svd' | 'mlpca' | 'fast_mlpca' | 'nmf' |
-            'sparse_pca' | 'mini_batch_sparse_pca'
+            'sparse_pca' | 'mini_batch_sparse_pca' | 'incremental_pca' |
+            'randomized_svd'
+            The 'incremental_pca' and 'randomized_svd' algorithms read the
+            data in blocks of navigation positions and never copy the full
+            dataset, so they can decompose data stored in a numpy.memmap
+            that does not fit in memory. The maximum number of navigation
+            positions per block can be set with the `block_size` keyword.
+            'randomized_svd' requires the output_dimension and accepts the
+            `oversampling`, `power_iterations` and `random_state` keywords
+            (see `hyperspy.learn.svd_pca.randomized_svd`).
         
         output_dimension : None or int
             number of components to keep/calculate
@@ -99,7 +116,7 @@ def decomposition(self,
             If None no centring is applied. If 'variable' the centring will be
             performed in the variable axis. If 'trials', the centring will be 
             performed in the 'trials' axis. It only has effect when using the 
-            svd or fast_svd algorithms
+            svd, fast_svd, incremental_pca or randomized_svd algorithms
         
         auto_transpose : bool
             If True, automatically transposes the data to boost performance.
@@ -141,8 +158,8 @@ def decomposition(self,
                 ' e.g. s.change_dtype(\'float64\')\n'
                 'Nothing done.')
             return
-        # backup the original data
-        self._data_before_treatments = self.data.copy()
+        # The out-of-core algorithms read the data in blocks
+        out_of_core = algorithm in ('incremental_pca', 'randomized_svd')
 
         if algorithm == 'mlpca':
             if normalize_poissonian_noise is True:
@@ -166,13 +183,6 @@ def decomposition(self,
             if hasattr(signal_mask, 'ravel'):
                 signal_mask = signal_mask.ravel()
 
-            # Normalize the poissonian noise
-            # TODO this function can change the masks and this can cause
-            # problems when reprojecting
-            if normalize_poissonian_noise is True:
-                self.normalize_poissonian_noise(
-                                        navigation_mask=navigation_mask,
-                                        signal_mask=signal_mask,)
             messages.information('Performing decomposition analysis')
 
             dc = self.data
@@ -193,6 +203,37 @@ def decomposition(self,
             # negaties i.e. True -> False and viceversa. However, the 
             # stored value (at the end of the method) coincides with the 
             # input masks
+            nav_mask = None if isinstance(navigation_mask, slice) \
+                else navigation_mask
+            sig_mask = None if isinstance(signal_mask, slice) \
+                else signal_mask
+            block_size = kwargs.get('block_size', None)
+
+            # Normalize the poissonian noise. Only the weights are 
+            # computed, the algorithms apply them to the data they 
+            # decompose without modifying self.data
+            if normalize_poissonian_noise is True:
+                messages.information(
+                    "Computing the Poissonian noise normalization "
+                    "weights")
+                try:
+                    self._root_aG, self._root_bH = poissonian_weights(
+                        dc, nav_mask, sig_mask, block_size)
+                except ValueError, e:
+                    messages.warning_exit(str(e))
+                root_aG, root_bH = self._root_aG, self._root_bH
+            else:
+                root_aG, root_bH = None, None
+
+            def get_data(data):
+                """The data normalized if requested, without modifying
+                the signal data.
+
+                """
+                if root_aG is None:
+                    return data
+                return normalize_block(np.array(data, dtype='float64'),
+                                       root_aG, root_bH)
             
             # Reset the explained_variance which is not set by all the 
             # algorithms
@@ -203,7 +244,8 @@ def decomposition(self,
             if algorithm == 'svd':
                 factors, loadings, explained_variance, mean = svd_pca(
                     dc[:,signal_mask][navigation_mask,:], centre = centre,
-                    auto_transpose = auto_transpose)
+                    auto_transpose = auto_transpose,
+                    root_aG = root_aG, root_bH = root_bH)
 
             elif algorithm == 'fast_svd':
                 factors, loadings, explained_variance, mean = svd_pca(
@@ -211,7 +253,40 @@ def decomposition(self,
                     fast=True,
                     output_dimension=output_dimension,
                     centre=centre,
-                    auto_transpose=auto_transpose)
+                    auto_transpose=auto_transpose,
+                    root_aG=root_aG,
+                    root_bH=root_bH)
+
+            elif out_of_core is True:
+                if algorithm == 'incremental_pca':
+                    factors, loadings, explained_variance, mean = \
+                        incremental_pca(dc,
+                                        output_dimension=output_dimension,
+                                        centre=centre,
+                                        navigation_mask=nav_mask,
+                                        signal_mask=sig_mask,
+                                        root_aG=root_aG,
+                                        root_bH=root_bH,
+                                        block_size=block_size)
+                else:
+                    if output_dimension is None:
+                        messages.warning_exit(
+                            "With the randomized_svd algorithm the "
+                            "output_dimension must be specified")
+                    U, S, V, mean = randomized_svd(
+                        dc, output_dimension,
+                        navigation_mask=nav_mask,
+                        signal_mask=sig_mask,
+                        root_aG=root_aG,
+                        root_bH=root_bH,
+                        centre=centre,
+                        block_size=block_size,
+                        **dict((key, kwargs[key]) for key in
+                               ('oversampling', 'power_iterations',
+                                'random_state') if key in kwargs))
+                    factors = V.T
+                    loadings = U * S
+                    explained_variance = S ** 2 / len(loadings)
 
             elif algorithm == 'sklearn_pca':
                 if sklearn_installed is False:
@@ -219,8 +294,8 @@ def decomposition(self,
                     'sklearn is not installed. Nothing done')
                 sk = sklearn.decomposition.PCA(**kwargs)
                 sk.n_components = output_dimension
-                loadings = sk.fit_transform((
-                    dc[:,signal_mask][navigation_mask,:]))
+                loadings = sk.fit_transform(
+                    get_data(dc[:,signal_mask][navigation_mask,:]))
                 factors = sk.components_.T
                 explained_variance = sk.explained_variance_
                 mean = sk.mean_
@@ -232,8 +307,8 @@ def decomposition(self,
                     'sklearn is not installed. Nothing done')
                 sk = sklearn.decomposition.NMF(**kwargs)
                 sk.n_components = output_dimension
-                loadings = sk.fit_transform((
-                    dc[:,signal_mask][navigation_mask,:]))
+                loadings = sk.fit_transform(
+                    get_data(dc[:,signal_mask][navigation_mask,:]))
                 factors = sk.components_.T
                 
             elif algorithm == 'sparse_pca':
@@ -243,7 +318,7 @@ def decomposition(self,
                 sk = sklearn.decomposition.SparsePCA(
                     output_dimension, **kwargs)
                 loadings = sk.fit_transform(
-                    dc[:,signal_mask][navigation_mask,:])
+                    get_data(dc[:,signal_mask][navigation_mask,:]))
                 factors = sk.components_.T
                 
             elif algorithm == 'mini_batch_sparse_pca':
@@ -253,7 +328,7 @@ def decomposition(self,
                 sk = sklearn.decomposition.MiniBatchSparsePCA(
                     output_dimension, **kwargs)
                 loadings = sk.fit_transform(
-                    dc[:,signal_mask][navigation_mask,:])
+                    get_data(dc[:,signal_mask][navigation_mask,:]))
                 factors = sk.components_.T
 
             elif algorithm == 'mlpca' or algorithm == 'fast_mlpca':
@@ -337,18 +412,24 @@ def decomposition(self,
             # Reproject
             if mean is None:
                 mean = 0
+            if reproject is not None and out_of_core is True:
+                messages.information("Reprojecting is not yet "
+                                     "supported for this algorithm")
+                reproject = None
             if reproject in ('navigation', 'both'):
                 if algorithm not in ('nmf', 'sparse_pca', 
                                       'mini_batch_sparse_pca'):
-                    loadings_ = np.dot(dc[:,signal_mask] - mean, factors)
+                    loadings_ = np.dot(get_data(dc[:,signal_mask]) - mean,
+                                       factors)
                 else:
-                    loadings_ = sk.transform(dc[:,signal_mask])
+                    loadings_ = sk.transform(get_data(dc[:,signal_mask]))
                 target.loadings = loadings_
             if reproject in ('signal', 'both'):
                 if algorithm not in ('nmf', 'sparse_pca',
                                       'mini_batch_sparse_pca'):
                     factors = np.dot(np.linalg.pinv(loadings), 
-                                     dc[navigation_mask,:] - mean).T
+                                     get_data(dc[navigation_mask,:]) - 
+                                     mean).T
                     target.factors = factors
                 else:
                     messages.information("Reprojecting the signal is not yet "
@@ -383,9 +464,6 @@ def decomposition(self,
                     loadings[navigation_mask == False,:] = np.nan
                     target.loadings = loadings
         finally:
-            #undo any pre-treatments
-            self.undo_treatments()
-            
             if self._unfolded4decomposition is True:
                 self.fold()
                 self._unfolded4decomposition is False
@@ -617,7 +695,8 @@ def _unmix_loadings(self,target):
         target.bss_loadings = np.dot(Q,W).T
 
     @do_not_replot
-    def _calculate_recmatrix(self, components = None, mva_type=None,):
+    def _calculate_recmatrix(self, components = None, mva_type=None,
+                             lazy=False):
         """
         Rebuilds SIs from selected components
 
@@ -630,6 +709,9 @@ def _calculate_recmatrix(self, components = None, mva_type=None,):
              if list of ints, rebuilds SI from only components in given list
         mva_type : string, currently either 'decomposition' or 'bss'
              (not case sensitive)
+        lazy : bool
+            If True, the data of the returned signal is a LowRankArray
+            that computes the data on demand.
 
         Returns
         -------
@@ -640,48 +722,39 @@ def _calculate_recmatrix(self, components = None, mva_type=None,):
 
         if mva_type.lower() == 'decomposition':
             factors = target.factors
-            loadings = target.loadings.T
+            loadings = target.loadings
         elif mva_type.lower() == 'bss':
             factors = target.bss_factors
-            loadings = target.bss_loadings.T
+            loadings = target.bss_loadings
         if components is None:
-            a = np.dot(factors,loadings)
             signal_name = 'model from %s with %i components' % (
             mva_type,factors.shape[1])
         elif hasattr(components, '__iter__'):
-            tfactors = np.zeros((factors.shape[0],len(components)))
-            tloadings = np.zeros((len(components),loadings.shape[1]))
-            for i in xrange(len(components)):
-                tfactors[:,i] = factors[:,components[i]]
-                tloadings[i,:] = loadings[components[i],:]
-            a = np.dot(tfactors, tloadings)
+            factors = factors[:, list(components)]
+            loadings = loadings[:, list(components)]
             signal_name = 'model from %s with components %s' % (
             mva_type,components)
         else:
-            a = np.dot(factors[:,:components],
-                                     loadings[:components,:])
+            factors = factors[:, :components]
+            loadings = loadings[:, :components]
             signal_name = 'model from %s with %i components' % (
             mva_type,components)
 
-        self._unfolded4decomposition = self.unfold_if_multidim()
-
-        sc = self.deepcopy()
-
-        import hyperspy._signals.spectrum
-        #if self.mapped_parameters.record_by==spectrum:
-        sc.data = a.T.squeeze()
-        #else:
-        #    sc.data = a.squeeze()
+        data = LowRankArray.from_decomposition(
+            factors, loadings,
+            self.axes_manager._navigation_shape_in_array,
+            self.axes_manager._signal_shape_in_array,
+            mean=target.mean,
+            centre=target.centre)
+        if lazy is False:
+            # Materialize it block by block
+            data = np.asarray(data)
+        # Copy everything but the data
+        sc = self._deepcopy_with_new_data(data)
         sc.mapped_parameters.title += signal_name
-        if target.mean is not None:
-            sc.data += target.mean
-        if self._unfolded4decomposition is True:
-            self.fold()
-            sc.history = ['unfolded']
-            sc.fold()
         return sc
 
-    def get_decomposition_model(self, components=None):
+    def get_decomposition_model(self, components=None, lazy=False):
         """Return the spectrum generated with the selected number of principal
         components
 
@@ -691,18 +764,24 @@ def get_decomposition_model(self, components=None):
              if None, rebuilds SI from all components
              if int, rebuilds SI from components in range 0-given int
              if list of ints, rebuilds SI from only components in given list
+        lazy : bool
+            If True, the data of the returned signal is a LowRankArray
+            that only computes the spectra when indexed, plotted or
+            iterated. It is materialized block by block when saved or
+            when `numpy.asarray` is called on it, e.g.
+            ``s.data = np.asarray(s.data)``. The residual is computed 
+            block by block (see `_get_residual`).
 
         Returns
         -------
         Signal instance
         """
         rec=self._calculate_recmatrix(components=components,
-                                      mva_type='decomposition')
-        rec.residual=rec.copy()
-        rec.residual.data=self.data-rec.data
+                                      mva_type='decomposition', lazy=lazy)
+        rec.residual = self._get_residual(rec)
         return rec
 
-    def get_bss_model(self,components = None):
+    def get_bss_model(self,components = None, lazy=False):
         """Return the spectrum generated with the selected number of
         independent components
 
@@ -712,15 +791,38 @@ def get_bss_model(self,components = None):
              if None, rebuilds SI from all components
              if int, rebuilds SI from components in range 0-given int
              if list of ints, rebuilds SI from only components in given list
+        lazy : bool
+            If True, the data of the returned signal is a LowRankArray
+            that only computes the spectra when needed. See
+            `get_decomposition_model`.
 
         Returns
         -------
         Signal instance
         """
-        rec=self._calculate_recmatrix(components=components, mva_type='bss',)
-        rec.residual=rec.copy()
-        rec.residual.data=self.data-rec.data
+        rec=self._calculate_recmatrix(components=components, mva_type='bss',
+                                      lazy=lazy)
+        rec.residual = self._get_residual(rec)
         return rec
+
+    def _get_residual(self, rec):
+        """Return the difference between the data and the model `rec`.
+        
+        If the data of `rec` is a LowRankArray the difference is 
+        computed block by block and, if it is larger than 
+        `chunked_array.BLOCK_BYTES`, stored in a memory-mapped 
+        temporary file.
+        
+        """
+        residual = rec._deepcopy_with_new_data(None)
+        if isinstance(rec.data, LowRankArray):
+            data = self.data
+            if not isinstance(data, ChunkedArray):
+                data = ChunkedArray(data)
+            residual.data = data - rec.data
+        else:
+            residual.data = self.data - rec.data
+        return residual
         
 
     def plot_explained_variance_ratio(self, n=50, log = True,
@@ -793,56 +895,93 @@ def normalize_poissonian_noise(self, navigation_mask=None,
         Scales the SI following Surf. Interface Anal. 2004; 36: 203–212 
         to "normalize" the poissonian data for decomposition analysis
 
+        The data is scaled in place and only the weights are stored, so
+        that `undo_treatments` can revert the scaling without keeping a
+        copy of the data. It requires float data. Note that 
+        `decomposition` does not use this method: it scales the data 
+        that it decomposes without modifying the signal.
+
         Parameters
         ----------
         navigation_mask : boolen numpy array
         signal_mask  : boolen numpy array
         """
+        if self.data.dtype.char not in ['e', 'f', 'd']: # If not float
+            messages.warning(
+                'To normalize the Poissonian noise the data must be of the '
+                'float type. You can change the type using the '
+                'change_dtype method e.g. s.change_dtype(\'float64\')\n'
+                'Nothing done.')
+            return
         messages.information(
             "Scaling the data to normalize the (presumably)"
             " Poissonian noise")
         refold = self.unfold_if_multidim()
+        try:
+            dc = self.data
+            if navigation_mask is not None:
+                navigation_mask = ~navigation_mask.ravel()
+            if signal_mask is not None:
+                signal_mask = ~signal_mask.ravel()
+            # Rescale the data to gaussianize the poissonian noise
+            try:
+                self._root_aG, self._root_bH = poissonian_weights(
+                    dc, navigation_mask, signal_mask)
+            except ValueError, e:
+                messages.warning_exit(str(e))
+            self._poissonian_masks = (navigation_mask, signal_mask)
+            self._scale_poissonian_noise()
+        finally:
+            if refold is True:
+                print "Automatically refolding the SI after scaling"
+                self.fold()
+
+    def _scale_poissonian_noise(self, undo=False):
+        """Divide (multiply if undo is True) the unfolded data in place by
+        the weights computed by normalize_poissonian_noise.
+
+        """
+        navigation_mask, signal_mask = self._poissonian_masks
         dc = self.data
-        if navigation_mask is None:
-            navigation_mask = slice(None)
-        else:
-            navigation_mask = ~navigation_mask.ravel()
-        if signal_mask is None:
-            signal_mask = slice(None)
-        else:
-            signal_mask = ~signal_mask
-        # Rescale the data to gaussianize the poissonian noise
-        aG = dc[:,signal_mask][navigation_mask,:].sum(1).squeeze()
-        bH = dc[:,signal_mask][navigation_mask,:].sum(0).squeeze()
-        # Checks if any is negative
-        if (aG < 0).any() or (bH < 0).any():
-            messages.warning_exit(
-            "Data error: negative values\n"
-            "Are you sure that the data follow a poissonian "
-            "distribution?")
-
-        self._root_aG = np.sqrt(aG)[:, np.newaxis]
-        self._root_bH = np.sqrt(bH)[np.newaxis, :]
-        # We first disable numpy's warning when the result of an
-        # operation produces nans
-        np.seterr(invalid='ignore')
-        dc[:,signal_mask][navigation_mask,:] /= (self._root_aG * 
-            self._root_bH)
-        # Enable numpy warning
-        np.seterr(invalid=None)
-        #Set the nans resulting from 0/0 to zero
-        dc[:,signal_mask][navigation_mask,:] = \
-            np.nan_to_num(dc[:,signal_mask][navigation_mask,:])
-        
-        if refold is True:
-            print "Automatically refolding the SI after scaling"
-            self.fold()
+        block_size = get_block_size(dc)
+        i = 0
+        for start in xrange(0, dc.shape[0], block_size):
+            stop = min(start + block_size, dc.shape[0])
+            block = dc[start:stop]
+            if navigation_mask is None:
+                rows = np.arange(stop - start)
+            else:
+                rows = np.where(navigation_mask[start:stop])[0]
+            n = len(rows)
+            if n == 0:
+                continue
+            root_aG = self._root_aG[i:i + n]
+            i += n
+            if navigation_mask is None and signal_mask is None:
+                # No need of fancy indexing (and therefore of copies)
+                index = slice(None)
+            elif signal_mask is None:
+                index = rows
+            else:
+                index = np.ix_(rows, np.where(signal_mask)[0])
+            if undo is True:
+                block[index] = block[index] * (root_aG * self._root_bH)
+            else:
+                block[index] = normalize_block(block[index], root_aG,
+                                                self._root_bH)
 
     def undo_treatments(self):
         """Undo normalize_poissonian_noise"""
+        if not hasattr(self, '_poissonian_masks'):
+            return
         print "Undoing data pre-treatments"
-        self.data=self._data_before_treatments
-        del self._data_before_treatments
+        refold = self.unfold_if_multidim()
+        try:
+            self._scale_poissonian_noise(undo=True)
+        finally:
+            del self._poissonian_masks
+            if refold is True:
+                self.fold()
 
 class LearningResults(object):
     # Decomposition
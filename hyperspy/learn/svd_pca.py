@@ -21,9 +21,10 @@
 
 from hyperspy.misc.machine_learning.import_sklearn import *
 from hyperspy import messages
+from hyperspy.learn.incremental_pca import iterate_blocks, normalize_block
 
 def svd_pca(data, fast = False, output_dimension = None, centre = None,
-            auto_transpose = True):
+            auto_transpose = True, root_aG = None, root_bH = None):
     """Perform PCA using SVD.
     
     Parameters
@@ -32,7 +33,8 @@ def svd_pca(data, fast = False, output_dimension = None, centre = None,
         MxN array of input data (M variables, N trials)
     fast : bool
         Wheter to use randomized svd estimation to estimate a limited number of
-        componentes given by output_dimension
+        componentes given by output_dimension. If sklearn is not installed
+        `randomized_svd` is used.
     output_dimension : int
         Number of components to estimate when fast is True
     centre : None | 'variables' | 'trials'
@@ -41,6 +43,11 @@ def svd_pca(data, fast = False, output_dimension = None, centre = None,
         performed in the 'trials' axis.
     auto_transpose : bool
         If True, automatically transposes the data to boost performance
+    root_aG, root_bH : None or numpy arrays
+        If not None, the data is divided by root_aG * root_bH to 
+        normalize the Poissonian noise (see 
+        `incremental_pca.poissonian_weights`) before the centring. The 
+        input data is not modified.
     
     Returns
     -------
@@ -51,6 +58,10 @@ def svd_pca(data, fast = False, output_dimension = None, centre = None,
     mean : numpy array or None (if center is None)
     """
     N, M = data.shape
+    if root_aG is not None:
+        # Do not modify the input data, that can be a view of the signal
+        data = normalize_block(np.array(data, dtype='float64'), root_aG,
+                               root_bH)
     if centre is not None:
         if centre == 'variables':
             mean = data.mean(1)[:,np.newaxis]
@@ -59,7 +70,12 @@ def svd_pca(data, fast = False, output_dimension = None, centre = None,
         else:
             raise AttributeError(
                 'centre must be one of: None, variables, trials')
-        data -= mean
+        if root_aG is not None:
+            data -= mean
+        else:
+            # Do not modify the input data, that can be a view of the 
+            # signal
+            data = data - mean
     else:
         mean = None 
     if auto_transpose is True:
@@ -68,11 +84,14 @@ def svd_pca(data, fast = False, output_dimension = None, centre = None,
             data = data.T
         else:
             auto_transpose = False
-    if fast is True and sklearn_installed is True:
+    if fast is True:
         if output_dimension is None:
             messages.warning_exit('When using fast_svd it is necessary to '
                                   'define the output_dimension')
-        U, S, V = fast_svd(data, output_dimension)
+        if sklearn_installed is True:
+            U, S, V = fast_svd(data, output_dimension)
+        else:
+            U, S, V, _ = randomized_svd(data, output_dimension)
     else:
         U, S, V = scipy.linalg.svd(data, full_matrices = False)
     if auto_transpose is False:
@@ -84,3 +103,138 @@ def svd_pca(data, fast = False, output_dimension = None, centre = None,
         explained_variance = S ** 2 / N
         factors = U * S
     return factors, loadings, explained_variance, mean
+
+
+class _BlockedMatrix(object):
+    """Matrix products with a data matrix that is read in blocks of rows.
+
+    The optional masks, Poissonian noise normalization weights and
+    centring are applied to each block on the fly, so the data itself is
+    never modified nor copied as a whole.
+
+    """
+
+    def __init__(self, data, navigation_mask=None, signal_mask=None,
+                 root_aG=None, root_bH=None, centre=None, block_size=None):
+        if centre not in (None, 'variables', 'trials'):
+            raise AttributeError(
+                'centre must be one of: None, variables, trials')
+        self.data = data
+        self.navigation_mask = navigation_mask
+        self.signal_mask = signal_mask
+        self.root_aG = root_aG
+        self.root_bH = root_bH
+        self.block_size = block_size
+        self.centre = None
+        self.mean = None
+        self.shape = None
+        # Compute the shape and, if needed, the mean in a first pass
+        column_sum = 0
+        row_means = []
+        N = 0
+        for i, block in self.iterate():
+            N += len(block)
+            column_sum = column_sum + block.sum(0)
+            if centre == 'variables':
+                row_means.append(block.mean(1)[:, np.newaxis])
+        self.shape = (N, len(column_sum))
+        if centre == 'trials':
+            self.mean = (column_sum / N)[np.newaxis, :]
+        elif centre == 'variables':
+            self.mean = np.vstack(row_means)
+        self.centre = centre
+
+    def iterate(self):
+        """Yields the index of the first row and the treated block."""
+        i = 0
+        for start, stop, rows, block in iterate_blocks(
+                self.data, self.navigation_mask, self.signal_mask,
+                self.block_size):
+            n = len(block)
+            if self.root_aG is not None:
+                normalize_block(block, self.root_aG[i:i + n], self.root_bH)
+            if self.centre == 'trials':
+                block -= self.mean
+            elif self.centre == 'variables':
+                block -= self.mean[i:i + n]
+            yield i, block
+            i += n
+
+    def dot(self, x):
+        """A x"""
+        result = np.empty((self.shape[0], x.shape[1]))
+        for i, block in self.iterate():
+            result[i:i + len(block)] = np.dot(block, x)
+        return result
+
+    def rdot(self, y):
+        """A^T y"""
+        result = np.zeros((self.shape[1], y.shape[1]))
+        for i, block in self.iterate():
+            result += np.dot(block.T, y[i:i + len(block)])
+        return result
+
+
+def randomized_svd(data, output_dimension, oversampling=10,
+                   power_iterations=2, navigation_mask=None,
+                   signal_mask=None, root_aG=None, root_bH=None,
+                   centre=None, block_size=None, random_state=None):
+    """Estimate the first singular vectors using a randomized range finder.
+
+    The data is only accessed through matrix products computed in blocks
+    of rows, therefore it can be a numpy.memmap or an h5py dataset that
+    does not fit in memory. It performs 2 + 2 * power_iterations passes
+    over the data (plus one more to compute the mean and the shape).
+
+    See Halko, Martinsson and Tropp, SIAM Rev. 2011; 53: 217-288.
+
+    Parameters
+    ----------
+    data : array-like
+        NxM matrix.
+    output_dimension : int
+        Number of singular values and vectors to estimate.
+    oversampling : int
+        Number of extra random vectors used to sample the range of the
+        matrix. Larger values increase the accuracy.
+    power_iterations : int
+        Number of power iterations. They improve the accuracy when the
+        singular values decay slowly, e.g. for noisy data.
+    navigation_mask : None or boolean numpy array of length N
+        The rows marked as True are used, the rest are skipped.
+    signal_mask : None or boolean numpy array of length M
+        The columns marked as True are used, the rest are skipped.
+    root_aG, root_bH : None or numpy array
+        If not None, the data is divided by root_aG * root_bH on the fly.
+    centre : None | 'variables' | 'trials'
+        As in `svd_pca`.
+    block_size : None or int
+        Maximum number of rows per block.
+    random_state : None or int
+        Seed of the random number generator.
+
+    Returns
+    -------
+    U, S, V : numpy arrays
+        The first output_dimension left singular vectors (Nxk), singular
+        values (k) and right singular vectors (kxM).
+    mean : numpy array or None (if center is None)
+
+    """
+    A = _BlockedMatrix(data, navigation_mask=navigation_mask,
+                       signal_mask=signal_mask, root_aG=root_aG,
+                       root_bH=root_bH, centre=centre, block_size=block_size)
+    n_random = min(output_dimension + oversampling, min(A.shape))
+    random_state = np.random.RandomState(random_state)
+    omega = random_state.normal(size=(A.shape[1], n_random))
+    Q = scipy.linalg.qr(A.dot(omega), mode='economic')[0]
+    for i in xrange(power_iterations):
+        # Orthonormalize in every step to avoid losing the smallest
+        # singular values to round-off errors
+        Z = scipy.linalg.qr(A.rdot(Q), mode='economic')[0]
+        Q = scipy.linalg.qr(A.dot(Z), mode='economic')[0]
+    B = A.rdot(Q).T
+    Ub, S, V = scipy.linalg.svd(B, full_matrices=False)
+    U = np.dot(Q, Ub)
+    k = output_dimension
+    return U[:, :k], S[:k], V[:k], A.mean
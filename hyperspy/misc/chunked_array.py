@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+# Copyright 2007-2011 The Hyperspy developers
+#
+# This file is part of  Hyperspy.
+#
+#  Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+#  Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with  Hyperspy.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Array-like access to data that does not fit in memory.
+
+A ChunkedArray wraps an on-disk array, e.g. a numpy.memmap or an h5py
+dataset, and performs all the operations that the Signal class needs
+(slicing, reductions, rebinning and arithmetic operators) reading the
+data in blocks. Results that are larger than BLOCK_BYTES are streamed
+to a memory-mapped temporary file and returned as a ChunkedArray.
+
+"""
+
+import tempfile
+
+import numpy as np
+
+from hyperspy.misc import array_tools
+
+# Maximum size in bytes of the blocks read from the data and of the
+# results that are returned in memory
+BLOCK_BYTES = 2 ** 26
+# The directory of the temporary files. If None, the default is used.
+mmap_dir = None
+
+
+def _slice_length(s):
+    return max(0, (s.stop - s.start + s.step - 1) // s.step)
+
+
+def create_output(shape, dtype):
+    """Return a numpy array, or a memory-mapped array in a temporary file
+    if it is larger than BLOCK_BYTES.
+
+    """
+    shape = tuple(shape)
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if nbytes <= BLOCK_BYTES:
+        return np.empty(shape, dtype=dtype)
+    tempf = tempfile.NamedTemporaryFile(dir=mmap_dir)
+    return np.memmap(tempf, dtype=dtype, mode='w+', shape=shape)
+
+
+def wrap(data):
+    """Wrap the memory-mapped results in a ChunkedArray."""
+    if isinstance(data, np.memmap):
+        return ChunkedArray(data)
+    return data
+
+
+class ChunkedArray(object):
+    """Array-like object that reads an on-disk array in blocks.
+
+    Indexing with integers and slices with positive steps returns a view
+    that is only read if it is smaller than BLOCK_BYTES. Other kinds of
+    indices read the whole view in memory.
+
+    Parameters
+    ----------
+    data : array-like
+        Any array-like object supporting basic slicing, e.g. a
+        numpy.memmap or an h5py dataset.
+
+    """
+    # Make numpy use the reflected operators of this class
+    __array_priority__ = 20
+
+    def __init__(self, data, index=None):
+        self._data = data
+        if index is None:
+            index = [slice(0, n, 1) for n in data.shape]
+        self._index = index
+
+    @property
+    def shape(self):
+        return tuple(_slice_length(s) for s in self._index
+                     if isinstance(s, slice))
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self):
+        return np.dtype(self._data.dtype)
+
+    @property
+    def itemsize(self):
+        return self.dtype.itemsize
+
+    @property
+    def nbytes(self):
+        return self.size * self.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return "<ChunkedArray, shape: %s, dtype: %s>" % (str(self.shape),
+                                                         self.dtype)
+
+    def _expand_key(self, key):
+        if not isinstance(key, (tuple, list)):
+            key = (key,)
+        key = list(key)
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key[i:i + 1] = [slice(None)] * (self.ndim - len(key) + 1)
+        if len(key) > self.ndim:
+            raise IndexError("too many indices")
+        return key + [slice(None)] * (self.ndim - len(key))
+
+    def _compose(self, key):
+        """Return the index in the data of the view selected by key or None
+        if the key is not supported.
+
+        """
+        key = self._expand_key(key)
+        index = []
+        i = 0
+        for entry in self._index:
+            if not isinstance(entry, slice):
+                index.append(entry)
+                continue
+            k = key[i]
+            length = _slice_length(entry)
+            i += 1
+            if isinstance(k, slice):
+                start, stop, step = k.indices(length)
+                if step < 0:
+                    return None
+                n = len(xrange(start, stop, step))
+                start = entry.start + start * entry.step
+                step *= entry.step
+                index.append(slice(start, start + n * step, step))
+            elif isinstance(k, (int, long, np.integer)):
+                if k < 0:
+                    k += length
+                if not 0 <= k < length:
+                    raise IndexError("index out of bounds")
+                index.append(entry.start + k * entry.step)
+            else:
+                return None
+        return index
+
+    def close(self):
+        """Close the file of the data if it is an h5py dataset. The data 
+        cannot be read afterwards.
+        
+        """
+        f = getattr(self._data, 'file', None)
+        if f is not None:
+            f.close()
+
+    def read(self):
+        """Read the data in memory."""
+        return np.array(self._data[tuple(self._index)])
+
+    def __array__(self, dtype=None):
+        data = self.read()
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    def __getitem__(self, key):
+        index = self._compose(key)
+        if index is None:
+            return self.read()[key]
+        view = ChunkedArray(self._data, index)
+        if view.nbytes <= BLOCK_BYTES:
+            return view.read()
+        return view
+
+    def __setitem__(self, key, value):
+        """Write into the data, which must be writable (e.g. a numpy.memmap
+        not opened in 'r' mode or an h5py dataset of a file opened for 
+        writing).
+
+        Only integers and slices with positive steps are supported. 
+        Values larger than BLOCK_BYTES with the shape of the selection 
+        (e.g. a ChunkedArray) are written block by block.
+
+        """
+        index = self._compose(key)
+        if index is None:
+            raise IndexError(
+                "Only integers and slices with positive steps can be "
+                "assigned to a ChunkedArray")
+        view = ChunkedArray(self._data, index)
+        if (view.ndim and view.nbytes > BLOCK_BYTES and
+                getattr(value, 'shape', None) == view.shape):
+            step = max(BLOCK_BYTES // max(view.nbytes // len(view), 1), 1)
+            for start in xrange(0, len(view), step):
+                stop = min(start + step, len(view))
+                self._data[tuple(view._compose(slice(start, stop)))] = \
+                    np.asarray(value[start:stop], dtype=self.dtype)
+        else:
+            self._data[tuple(index)] = np.asarray(value, dtype=self.dtype)
+
+    def iterate(self, axis=0, multiple=1):
+        """Iterate over the data in blocks along the given axis.
+
+        Parameters
+        ----------
+        axis : int
+        multiple : int
+            The number of elements along the axis in every block (except
+            perhaps the last one) is a multiple of this number.
+
+        Yields
+        ------
+        start, stop : int
+            The limits of the block along the axis.
+        block : numpy array
+
+        """
+        n = self.shape[axis]
+        slice_bytes = self.nbytes // max(n, 1)
+        step = max(BLOCK_BYTES // max(slice_bytes, 1) // multiple, 1) * \
+            multiple
+        key = [slice(None)] * self.ndim
+        for start in xrange(0, n, step):
+            stop = min(start + step, n)
+            key[axis] = slice(start, stop)
+            yield start, stop, ChunkedArray(self._data,
+                                            self._compose(key)).read()
+
+    def reduce(self, function, axis, **kwargs):
+        """Apply a function that reduces an axis, e.g. numpy.sum or
+        scipy.integrate.simps, block by block.
+
+        The function is called as function(block, axis=axis, **kwargs).
+
+        """
+        if axis < 0:
+            axis += self.ndim
+        if self.ndim == 1:
+            return function(self.read(), axis=0, **kwargs)
+        # Iterate over an axis that is not reduced so that every block
+        # contains the full reduced axis
+        iteration_axis = 1 if axis == 0 else 0
+        out = None
+        for start, stop, block in self.iterate(iteration_axis):
+            result = function(block, axis=axis, **kwargs)
+            if out is None:
+                shape = list(self.shape)
+                del shape[axis]
+                out = create_output(shape, result.dtype)
+            out[start:stop] = result
+        return wrap(out)
+
+    def _reduction(self, function, axis, out=None, **kwargs):
+        if isinstance(axis, tuple):
+            raise NotImplementedError(
+                "Reducing several axes at once is not supported")
+        if axis is None:
+            # Valid for sum, max, min and mean
+            result = function(np.asarray(self._reduction(function, 0,
+                                                         **kwargs)),
+                              **kwargs)
+        else:
+            result = self.reduce(function, axis, **kwargs)
+        if out is not None:
+            out[...] = result
+            return out
+        return result
+
+    def sum(self, axis=None, dtype=None, out=None, **kwargs):
+        return self._reduction(np.sum, axis, out=out, dtype=dtype,
+                               **kwargs)
+
+    def mean(self, axis=None, dtype=None, out=None, **kwargs):
+        return self._reduction(np.mean, axis, out=out, dtype=dtype,
+                               **kwargs)
+
+    def max(self, axis=None, out=None, **kwargs):
+        return self._reduction(np.max, axis, out=out, **kwargs)
+
+    def min(self, axis=None, out=None, **kwargs):
+        return self._reduction(np.min, axis, out=out, **kwargs)
+
+    def var(self, axis=None, dtype=None, out=None, ddof=0, **kwargs):
+        if axis is not None:
+            return self._reduction(np.var, axis, out=out, dtype=dtype,
+                                   ddof=ddof, **kwargs)
+        mean = self.mean()
+        squares = 0.
+        for start, stop, block in self.iterate():
+            squares += ((block - mean) ** 2).sum()
+        return squares / (self.size - ddof)
+
+    def std(self, axis=None, dtype=None, out=None, ddof=0, **kwargs):
+        if axis is not None:
+            return self._reduction(np.std, axis, out=out, dtype=dtype,
+                                   ddof=ddof, **kwargs)
+        return np.sqrt(self.var(ddof=ddof))
+
+    def rebin(self, new_shape):
+        """Rebin block by block. See `array_tools.rebin`."""
+        factor = self.shape[0] // new_shape[0]
+        out = None
+        for start, stop, block in self.iterate(multiple=factor):
+            result = array_tools.rebin(
+                block, ((stop - start) // factor,) + tuple(new_shape[1:]))
+            if out is None:
+                out = create_output(new_shape, result.dtype)
+            out[start // factor:stop // factor] = result
+        return wrap(out)
+
+    def apply_elementwise(self, function, other=None):
+        """Apply an elementwise function block by block.
+
+        Parameters
+        ----------
+        function : function
+            It is called as function(block) if other is None and
+            function(block, other_block) otherwise.
+        other : None, scalar, numpy array or ChunkedArray
+            It must broadcast with the array without changing its shape.
+
+        """
+        split_other = (hasattr(other, 'shape') and
+                       len(other.shape) == self.ndim and
+                       other.shape[0] == self.shape[0] and
+                       self.shape[0] > 1)
+        if isinstance(other, ChunkedArray) and not split_other:
+            other = other.read()
+        out = None
+        for start, stop, block in self.iterate():
+            if other is None:
+                result = function(block)
+            elif split_other:
+                result = function(block, np.asarray(other[start:stop]))
+            else:
+                result = function(block, other)
+            if out is None:
+                out = create_output((self.shape[0],) + result.shape[1:],
+                            result.dtype)
+            out[start:stop] = result
+        return wrap(out)
+
+    def astype(self, dtype):
+        return self.apply_elementwise(lambda block: block.astype(dtype))
+
+    def copy(self):
+        return self.apply_elementwise(lambda block: block)
+
+    def _is_reshapable(self):
+        return (isinstance(self._data, np.ndarray) and
+                self._index == ChunkedArray(self._data)._index)
+
+    def squeeze(self):
+        if self._is_reshapable():
+            return ChunkedArray(self._data.squeeze())
+        return ChunkedArray(self._data, [
+            s.start if isinstance(s, slice) and _slice_length(s) == 1
+            else s for s in self._index])
+
+    def reshape(self, *shape):
+        if len(shape) == 1 and isinstance(shape[0], (tuple, list)):
+            shape = shape[0]
+        if not self._is_reshapable():
+            raise NotImplementedError(
+                "Only whole numpy.memmap arrays can be reshaped")
+        return ChunkedArray(self._data.reshape(shape))
+
+
+def _binary_operator(name):
+    def operator(self, other):
+        return self.apply_elementwise(
+            lambda block, other: getattr(block, name)(other), other)
+    operator.__name__ = name
+    return operator
+
+
+def _unary_operator(name):
+    def operator(self):
+        return self.apply_elementwise(
+            lambda block: getattr(block, name)())
+    operator.__name__ = name
+    return operator
+
+for name in (
+        # Arithmetic operators
+        "__add__",
+        "__sub__",
+        "__mul__",
+        "__floordiv__",
+        "__mod__",
+        "__pow__",
+        "__lshift__",
+        "__rshift__",
+        "__and__",
+        "__xor__",
+        "__or__",
+        "__div__",
+        "__truediv__",
+        "__radd__",
+        "__rsub__",
+        "__rmul__",
+        "__rfloordiv__",
+        "__rmod__",
+        "__rpow__",
+        "__rdiv__",
+        "__rtruediv__",
+        # Comparison operators
+        "__lt__",
+        "__le__",
+        "__eq__",
+        "__ne__",
+        "__ge__",
+        "__gt__",):
+    setattr(ChunkedArray, name, _binary_operator(name))
+
+for name in (
+        "__neg__",
+        "__pos__",
+        "__abs__",
+        "__invert__",):
+    setattr(ChunkedArray, name, _unary_operator(name))
@@ -1,12 +1,88 @@
 from __future__ import division
+from collections import OrderedDict
 
 import numpy as np
+import scipy as sp
+import scipy.integrate
+import scipy.interpolate
 
 from hyperspy.misc.math_tools import get_linear_interpolation
 from hyperspy.misc.eels.elements import elements
+from hyperspy.misc.physical_constants import a0
+
+# Maximum number of integrated cross sections that are kept in memory
+# (see GOSBase.integrateq)
+XSECTION_CACHE_SIZE = 256
+# Energy shifts that round to the same multiple of this value (in eV)
+# share the same integrated cross section. If 0, the cross section is
+# only reused for identical energy shifts.
+ENERGY_SHIFT_TOLERANCE = 0.01
+
+
+class XSectionCache(object):
+    """Least recently used cache of the integrated cross sections.
+
+    It is shared by all the GOS instances, therefore edges of the same
+    element subshell and all the pixels of a model reuse the integrals
+    computed for the same microscope parameters and energy shift.
+
+    """
+
+    def __init__(self, size=XSECTION_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items[key] = value
+        return value
+
+    def set(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+xsection_cache = XSectionCache()
+
+
+class ShiftedInterpolator(object):
+    """Evaluate a scipy.interpolate.interp1d instance at E - shift.
+
+    E - shift is clipped to the interpolation range to absorb the
+    rounding errors at the limits.
+
+    """
+
+    def __init__(self, interpolator, shift):
+        self.interpolator = interpolator
+        self.shift = shift
+
+    def __call__(self, E):
+        x = self.interpolator.x
+        return self.interpolator(np.clip(E - self.shift, x[0], x[-1]))
 
 
 class GOSBase(object):
+    # Identifies the tabulated GOS, if any, in the key of the integrated
+    # cross sections in `xsection_cache`
+    _source = None
+
     def read_elements(self):
         element = self.element
         subshell = self.subshell
@@ -59,3 +135,97 @@ def get_qaxis_and_gos(self, ienergy, qmin, qmax):
             qaxis = np.hstack((qmin, qaxis[index:]))
             qgosi = np.hstack((gosqmin, qgosi[index:],))
         return qaxis, qgosi.clip(0)
+
+    def integrate_gos(self, qmin, qmax):
+        """Integrate the GOS of every tabulated energy over
+        log((a0 * q) ** 2) between qmin and qmax using Simpson's rule.
+
+        The result is the same as integrating the output of
+        `get_qaxis_and_gos` energy by energy, but all the energies whose
+        integration grids have the same number of points are integrated
+        at once.
+
+        Parameters
+        ----------
+        qmin, qmax : numpy array
+            The limits of the integral for each tabulated energy.
+            qmin must be positive.
+
+        Returns
+        -------
+        numpy array
+
+        """
+        qaxis = self.qaxis
+        rows = np.arange(self.gos_array.shape[0])
+        start = qaxis.searchsorted(qmin)
+        stop = qaxis.searchsorted(qmax)
+
+        def interpolate(index, q):
+            # Linear interpolation between the tabulated points around
+            # q, or extrapolation from the last two if q is beyond
+            index = index.clip(1, len(qaxis) - 1)
+            return get_linear_interpolation(
+                (qaxis[index - 1], self.gos_array[rows, index - 1]),
+                (qaxis[index], self.gos_array[rows, index]), q)
+        gosqmin = interpolate(start, qmin)
+        gosqmax = interpolate(stop, qmax)
+        npoints = stop - start + 2
+        qint = np.empty(len(rows))
+        for n in np.unique(npoints):
+            selected = npoints == n
+            columns = start[selected, np.newaxis] + np.arange(n - 2)
+            q = np.hstack((qmin[selected, np.newaxis], qaxis[columns],
+                           qmax[selected, np.newaxis]))
+            gos = np.hstack((gosqmin[selected, np.newaxis],
+                             self.gos_array[rows[selected, np.newaxis],
+                                            columns],
+                             gosqmax[selected, np.newaxis]))
+            qint[selected] = sp.integrate.simps(
+                gos.clip(0), np.log((a0 * q) ** 2), axis=1)
+        return qint
+
+    def integrateq(self, onset_energy, angle, E0):
+        """Calculate the energy differential cross section at the 
+        tabulated energies shifted to the given onset energy.
+
+        The integrals are stored in `xsection_cache` and reused for the
+        same element subshell, GOS source (e.g. the GOS file and its 
+        modification time), microscope parameters and energy shift
+        (within ENERGY_SHIFT_TOLERANCE).
+
+        Parameters
+        ----------
+        onset_energy : float
+            The onset energy of the edge in eV.
+        angle : float
+            The effective collection angle in rad.
+        E0 : float
+            The beam energy in keV.
+
+        Returns
+        -------
+        A function of the energy that interpolates the cross section.
+        The cross section is stored in the `qint` attribute.
+
+        """
+        energy_shift = onset_energy - self.onset_energy
+        if ENERGY_SHIFT_TOLERANCE:
+            shift = round(energy_shift / ENERGY_SHIFT_TOLERANCE) * \
+                ENERGY_SHIFT_TOLERANCE
+        else:
+            shift = energy_shift
+        key = (self._name, self._source, self.element, self.subshell, 
+               E0, angle, shift)
+        cached = xsection_cache.get(key)
+        if cached is None:
+            self.energy_shift = shift
+            qint = self._integrateq(angle, E0)
+            qint.flags.writeable = False
+            cached = (qint, sp.interpolate.interp1d(
+                self.energy_axis + shift, qint,
+                kind=self._interpolation_kind))
+            xsection_cache.set(key, cached)
+        self.energy_shift = energy_shift
+        self.qint, xsection = cached
+        return ShiftedInterpolator(xsection, energy_shift - shift)
@@ -1,16 +1,124 @@
 from __future__ import division
 import os
 import math
+import hashlib
+import tempfile
 
 import numpy as np
 import scipy as sp
 import scipy.interpolate
 
 from hyperspy.defaults_parser import preferences
+from hyperspy.misc.config_dir import config_path
 from hyperspy.misc.physical_constants import R, e, m0, a0, c
 from hyperspy.misc.eels.base_gos import GOSBase
 from hyperspy.misc.eels.elements import elements
 
+# Directory of the binary copies of the GOS files (see get_gos_table)
+gos_binary_path = os.path.join(config_path, 'EELS_GOS_binary')
+# The GOS tables that have been read, shared by all the instances
+_gos_tables = {}
+
+
+def read_gos_file(filename):
+    """Parse a GOS file in the text format distributed by Gatan.
+
+    Returns
+    -------
+    float64 numpy array containing the 7 parameters of the table
+    (see `HartreeSlaterGOS.readgosfile`) followed by the GOS divided
+    by R.
+
+    """
+    with open(filename) as f:
+        GOS_list = f.read().replace('\r','').split()
+    # The first two items are the name of the material
+    table = np.array(GOS_list[2:], dtype=np.float64)
+    # The division by R is not in the equations, but it seems that
+    # the the GOS was tabulated this way
+    table[7:] /= R
+    return table
+
+
+def _get_binary_filename(filename):
+    filename = os.path.abspath(filename)
+    directory, name = os.path.split(filename)
+    if isinstance(directory, unicode):
+        directory = directory.encode('utf-8')
+    return os.path.join(gos_binary_path, hashlib.md5(directory).hexdigest(),
+                        name + '.npy')
+
+
+def get_gos_table(filename):
+    """Return the content of a GOS file as returned by `read_gos_file`.
+
+    The first time that a GOS file is read, it is converted to a binary
+    .npy file in gos_binary_path, that is memory mapped from then on. 
+    If the binary file cannot be written, the text file is parsed. The 
+    tables are only read once per session and shared by all the
+    HartreeSlaterGOS instances.
+
+    Parameters
+    ----------
+    filename : string
+        The path of the text GOS file.
+
+    Returns
+    -------
+    Read-only float64 numpy array or numpy.memmap
+
+    """
+    filename = os.path.abspath(filename)
+    mtime = os.path.getmtime(filename)
+    if filename in _gos_tables and _gos_tables[filename][0] >= mtime:
+        return _gos_tables[filename][1]
+    binary_filename = _get_binary_filename(filename)
+    if (not os.path.isfile(binary_filename) or
+            os.path.getmtime(binary_filename) < mtime):
+        table = read_gos_file(filename)
+        try:
+            directory = os.path.dirname(binary_filename)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # Write to a temporary file first so that other processes
+            # never read an incomplete table
+            with tempfile.NamedTemporaryFile(dir=directory,
+                                             delete=False) as f:
+                np.save(f, table)
+            if os.path.exists(binary_filename):
+                os.remove(binary_filename)
+            os.rename(f.name, binary_filename)
+        except (IOError, OSError):
+            table.flags.writeable = False
+            _gos_tables[filename] = (mtime, table)
+            return table
+    table = np.load(binary_filename, mmap_mode='r')
+    _gos_tables[filename] = (mtime, table)
+    return table
+
+
+def convert_gos_files(path=None):
+    """Convert all the GOS files of the elements database to the binary
+    format (see `get_gos_table`).
+
+    Parameters
+    ----------
+    path : {None, string}
+        The directory of the GOS files. If None, 
+        preferences.EELS.eels_gos_files_path is used.
+
+    """
+    if path is None:
+        path = preferences.EELS.eels_gos_files_path
+    filenames = set(subshell['filename']
+                    for element in elements.itervalues()
+                    for subshell in element['subshells'].itervalues()
+                    if 'filename' in subshell)
+    for filename in sorted(filenames):
+        filename = os.path.join(path, filename)
+        if os.path.isfile(filename):
+            get_gos_table(filename)
+
 
 class HartreeSlaterGOS(GOSBase):
     """Read Hartree-Slater Generalized Oscillator Strenght parametrized
@@ -27,7 +135,7 @@ class HartreeSlaterGOS(GOSBase):
     
     readgosfile()
         Read the GOS files of the element subshell from the location 
-        defined in Preferences.
+        defined in Preferences (see `get_gos_table`).
     get_qaxis_and_gos(ienergy, qmin, qmax)
         given the energy axis index and qmin and qmax values returns
         the qaxis and gos between qmin and qmax using linear 
@@ -48,6 +156,7 @@ class HartreeSlaterGOS(GOSBase):
     """
 
     _name = 'Hartree-Slater'
+    _interpolation_kind = 3
     def __init__(self, element_subshell):
         """
         Parameters
@@ -79,24 +188,20 @@ def readgosfile(self):
         filename = os.path.join(
             preferences.EELS.eels_gos_files_path, 
             elements[element]['subshells'][subshell]['filename'])
+        filename = os.path.abspath(filename)
             
-        with open(filename) as f:
-            GOS_list = f.read().replace('\r','').split()
+        table = get_gos_table(filename)
+        self._source = (filename, _gos_tables[filename][0])
 
         # Map the parameters
-        material = GOS_list[0]
-        info1_1 = float(GOS_list[2])
-        info1_2 = float(GOS_list[3])
-        info1_3 = float(GOS_list[4])
-        ncol    = int(GOS_list[5])
-        info2_1 = float(GOS_list[6])
-        info2_2 = float(GOS_list[7])
-        nrow    = int(GOS_list[8])
-        self.gos_array = np.array(GOS_list[9:], dtype=np.float64)
-        # The division by R is not in the equations, but it seems that
-        # the the GOS was tabulated this way
-        self.gos_array = self.gos_array.reshape(nrow, ncol) / R
-        del GOS_list
+        info1_1 = table[0]
+        info1_2 = table[1]
+        info1_3 = table[2]
+        ncol    = int(table[3])
+        info2_1 = table[4]
+        info2_2 = table[5]
+        nrow    = int(table[6])
+        self.gos_array = table[7:].reshape(nrow, ncol)
         
         # Calculate the scale of the matrix
         self.rel_energy_axis = self.get_parametrized_energy_axis(
@@ -105,34 +210,24 @@ def readgosfile(self):
             info1_1, info1_2, ncol)
         self.energy_axis = self.rel_energy_axis + self.onset_energy
                       
-    def integrateq(self,onset_energy, angle,E0):
-        energy_shift = onset_energy - self.onset_energy
-        self.energy_shift = energy_shift
-        qint = np.zeros((self.energy_axis.shape[0]))
+    def _integrateq(self, angle, E0):
         # Calculate the cross section at each energy position of the 
         # tabulated GOS
         gamma = 1 + E0 / 511.06
         T = 511060 * (1 - 1 / gamma**2) / 2
-        for i in xrange(0,self.gos_array.shape[0]):
-            E = self.energy_axis[i] + energy_shift
-            # Calculate the limits of the q integral
-            qa0sqmin = (E**2) / (4 * R * T) + (E**3) / (
-                            8 * gamma ** 3 * R * T**2)
-            p02 = T / (R * (1 - 2 * T / 511060))
-            pp2 = p02 - E / R * (gamma - E / 1022120)
-            qa0sqmax = qa0sqmin + 4 * np.sqrt(p02 * pp2) * \
-                (math.sin(angle/2))**2
-            qmin = math.sqrt(qa0sqmin) / a0
-            qmax = math.sqrt(qa0sqmax) / a0
-            # Perform the integration in a log grid
-            qaxis, gos = self.get_qaxis_and_gos(i, qmin, qmax)
-            logsqa0qaxis = np.log((a0 * qaxis)**2)
-            qint[i] = sp.integrate.simps(gos, logsqa0qaxis)
-        E = self.energy_axis + energy_shift
+        E = self.energy_axis + self.energy_shift
+        # Calculate the limits of the q integral
+        qa0sqmin = (E**2) / (4 * R * T) + (E**3) / (
+                        8 * gamma ** 3 * R * T**2)
+        p02 = T / (R * (1 - 2 * T / 511060))
+        pp2 = p02 - E / R * (gamma - E / 1022120)
+        qa0sqmax = qa0sqmin + 4 * np.sqrt(p02 * pp2) * \
+            (math.sin(angle/2))**2
+        qmin = np.sqrt(qa0sqmin) / a0
+        qmax = np.sqrt(qa0sqmax) / a0
+        # Perform the integration in a log grid
+        qint = self.integrate_gos(qmin, qmax)
         # Energy differential cross section in (barn/eV/atom)
         qint *= (4.0 * np.pi * a0 ** 2.0 * R**2 / E / T *
                  self.subshell_factor) * 1e28
-        self.qint = qint
-        return sp.interpolate.interp1d(E, qint, kind=3)
-            
-                                               
+        return qint
@@ -52,6 +52,7 @@ class HydrogenicGOS(GOSBase):
     
     """
     _name = 'hydrogenic'
+    _interpolation_kind = 'linear'
     def __init__(self, element_subshell):
         """
         Parameters
@@ -95,9 +96,8 @@ def __init__(self, element_subshell):
         print "\tSubshell: ", self.subshell[1:]
         print "\tOnset energy: ", self.onset_energy
 
-    def integrateq(self,onset_energy, angle,E0):
-        energy_shift = onset_energy - self.onset_energy
-        self.energy_shift = energy_shift
+    def _integrateq(self, angle, E0):
+        energy_shift = self.energy_shift
         gamma = 1 + E0 / 511.06
         T = 511060 * (1 - 1 / gamma**2) / 2
         qint = np.zeros((self.energy_axis.shape[0]))
@@ -114,9 +114,7 @@ def integrateq(self,onset_energy, angle,E0):
                 scipy.integrate.quad(
                     lambda x: self.gosfunc(E, np.exp(x)),
                     math.log(qa0sqmin), math.log(qa0sqmax))[0])
-        self.qint = qint
-        return sp.interpolate.interp1d(self.energy_axis + energy_shift,
-                                       qint)
+        return qint
                       
     def gosfuncK(self, E, qa02):
     # gosfunc calculates (=DF/DE) which IS PER EV AND PER ATOM
@@ -61,6 +61,16 @@ def sobel_filter(im):
     sob = np.hypot(sx, sy)
     return sob
     
+def fft_correlation_size(shape1, shape2=None):
+    """Return the 2**n-sized FFT shape to correlate arrays of the given
+    shapes.
+
+    """
+    if shape2 is None:
+        shape2 = shape1
+    size = np.array(shape1) + np.array(shape2) - 1
+    return tuple(int(i) for i in 2 ** np.ceil(np.log2(size)))
+
 def fft_correlation(in1, in2, normalize=False):
     """Correlation of two N-dimensional arrays using FFT.
     
@@ -73,21 +83,267 @@ def fft_correlation(in1, in2, normalize=False):
         If True performs phase correlation
 
     """
-    s1 = np.array(in1.shape)
-    s2 = np.array(in2.shape)
-    size = s1 + s2 - 1
-    # Use 2**n-sized FFT
-    fsize = 2 ** np.ceil(np.log2(size))
-    IN1 = fftn(in1, fsize)
-    IN1 *= fftn(in2, fsize).conjugate()
-    fslice = tuple([slice(0, int(sz)) for sz in size])
+    fsize = fft_correlation_size(in1.shape, in2.shape)
+    return correlation_from_spectra(fftn(in1, fsize), fftn(in2, fsize),
+                                    normalize=normalize)
+
+def cross_power_spectrum(spectrum, spectra, normalize=False):
+    """Product of the FFT of an array and the conjugate of the FFT of 
+    one or several arrays. 
+    
+    See `correlation_from_spectra` for the description of the 
+    parameters.
+
+    """
+    IN1 = spectrum * spectra.conjugate()
     if normalize is True:
-        ret = ifftn(np.nan_to_num(IN1/np.absolute(IN1))).real.copy()
-    else:
-        ret = ifftn(IN1).real.copy()
+        old_settings = np.seterr(invalid='ignore', divide='ignore')
+        try:
+            IN1 = np.nan_to_num(IN1 / np.absolute(IN1))
+        finally:
+            np.seterr(**old_settings)
+    return IN1
+
+def correlation_from_spectra(spectrum, spectra, normalize=False, 
+                             ndim=None):
+    """Correlation of an array with one or several arrays from their
+    Fourier transforms.
+
+    Parameters
+    ----------
+    spectrum : complex array
+        The FFT of the first array, e.g. as returned by `image_spectrum`,
+        or a stack of FFTs in its first axis.
+    spectra : complex array
+        The FFT of the second array or a stack of FFTs of arrays
+        in its first axis. They must broadcast with `spectrum`.
+    normalize: bool
+        If True performs phase correlation
+    ndim : {None, int}
+        The number of dimensions of the correlated arrays. If None, 
+        it is the number of dimensions of `spectrum`.
+
+    Returns
+    -------
+    The correlation (or stack of correlations) as a real array.
+
+    """
+    IN1 = cross_power_spectrum(spectrum, spectra, normalize=normalize)
+    if ndim is None:
+        ndim = spectrum.ndim
+    ret = ifftn(IN1, axes=range(IN1.ndim - ndim, IN1.ndim)).real.copy()
     del IN1
     return ret
 
+def preprocess_image(image, roi=None, sobel=True, medfilter=True,
+                     hanning=True, dtype='float'):
+    """Return a copy of the region of interest of the image after 
+    applying the filters that improve the shift estimation.
+
+    See `estimate_image_shift` for the description of the parameters.
+
+    """
+    # Make a copy of the image to avoid modifying it
+    image = image.copy().astype(dtype)
+    if roi is not None:
+            top, bottom, left, right = roi
+    else:
+        top, bottom, left, right = [None,] * 4
+        
+    # Select region of interest
+    image = image[top:bottom,left:right]
+    
+    # Apply filters
+    if hanning is True:
+        image *= hanning2d(*image.shape) 
+    if medfilter is True:
+        image[:] = sp.signal.medfilt(image)
+    if sobel is True:
+        image[:] = sobel_filter(image)
+    return image
+
+def image_spectrum(image, fsize, **kwargs):
+    """Return the FFT of the preprocessed image to compute its 
+    correlation with images of the same shape.
+
+    Parameters
+    ----------
+    image : numpy array
+    fsize : tuple
+        The shape of the FFT as given by `fft_correlation_size`.
+
+    All extra keyword arguments are passed to `preprocess_image`.
+
+    """
+    return fftn(preprocess_image(image, **kwargs), fsize)
+
+def shifts_from_correlation(correlation):
+    """Estimate the shifts from the position of the maximum of the
+    correlation.
+
+    Parameters
+    ----------
+    correlation : numpy array
+        A correlation as returned by `fft_correlation` or a stack of 
+        correlations in its first axis.
+
+    Returns
+    -------
+    shifts : numpy array
+        The shift or, for a stack, an array with a shift per row.
+    max_value : float or numpy array
+        The maximum value of the correlation(s).
+
+    """
+    shape = correlation.shape[-2:]
+    flat = correlation.reshape((-1, shape[0] * shape[1]))
+    argmax = flat.argmax(1)
+    max_value = flat[np.arange(len(flat)), argmax]
+    shifts = np.array(np.unravel_index(argmax, shape)).T
+    threshold = (shape[0]/2 - 1, shape[1]/2 - 1)
+    for i in (0, 1):
+        shifts[:, i] = np.where(shifts[:, i] < threshold[i],
+                                shifts[:, i],
+                                shifts[:, i] - shape[i])
+    shifts = -shifts
+    if correlation.ndim == 2:
+        return shifts[0], max_value[0]
+    return shifts, max_value
+
+def _upsampled_dft_kernel(size, positions, region_size, upsample_factor):
+    """Matrices that evaluate the inverse DFT of an axis of the given size
+    in a grid of `region_size` points spaced by 1/`upsample_factor` and 
+    centred at every one of the given positions.
+
+    """
+    frequencies = np.fft.fftfreq(size) * size
+    offsets = (np.arange(region_size) - region_size // 2) / \
+        float(upsample_factor)
+    coordinates = positions[:, np.newaxis] + offsets
+    return np.exp(2j * np.pi / size * 
+                  coordinates[:, :, np.newaxis] * frequencies)
+
+def refine_shifts(cross_power, shifts, upsample_factor=10):
+    """Refine the shifts estimated from the maximum of a stack of 
+    correlations to 1/`upsample_factor` of a pixel.
+
+    The correlation is upsampled only in a region of 1.5x1.5 pixels 
+    around each maximum by computing its inverse DFT in a fine grid by 
+    matrix multiplication, as described in [1]_. Therefore, the cost is 
+    small compared to the FFTs even for large upsampling factors.
+
+    Parameters
+    ----------
+    cross_power : complex numpy array
+        Stack of cross power spectra as returned by 
+        `cross_power_spectrum`.
+    shifts : numpy array
+        The integer shifts (one row per spectrum in the stack) as 
+        returned by `shifts_from_correlation`.
+    upsample_factor : int
+
+    Returns
+    -------
+    shifts : numpy array of floats
+
+    References
+    ----------
+    .. [1] Manuel Guizar-Sicairos, Samuel T. Thurman, and James R. 
+    Fienup, "Efficient subpixel image registration algorithms," Opt. 
+    Lett. 33, 156-158 (2008).
+
+    """
+    region_size = int(np.ceil(1.5 * upsample_factor))
+    # The shifts are minus the position of the maximum of the correlation
+    positions = -np.asarray(shifts, dtype='float')
+    kernel0 = _upsampled_dft_kernel(cross_power.shape[-2], positions[:, 0],
+                                    region_size, upsample_factor)
+    kernel1 = _upsampled_dft_kernel(cross_power.shape[-1], positions[:, 1],
+                                    region_size, upsample_factor)
+    # kernel0[i] . cross_power[i] . kernel1[i].T for every image i
+    correlation = np.einsum('irn,isn->irs',
+                            np.einsum('irm,imn->irn', kernel0, cross_power),
+                            kernel1).real
+    flat = correlation.reshape((len(correlation), -1))
+    argmax = np.array(np.unravel_index(flat.argmax(1),
+                                       correlation.shape[1:])).T
+    positions += (argmax - region_size // 2) / float(upsample_factor)
+    return -positions
+
+def estimate_image_shifts(ref, images, roi=None, sobel=True,
+                          medfilter=True, hanning=True, dtype='float',
+                          normalize_corr=False, upsample_factor=1):
+    """Estimate the shifts of a stack of images using phase correlation.
+
+    The images are Fourier transformed with a single FFT call and all 
+    the correlations are computed at once. See `estimate_image_shift` 
+    for the description of the rest of the parameters.
+
+    Parameters
+    ----------
+    ref : numpy array
+        The reference image or a stack of reference images, one for 
+        every image.
+    images : numpy array
+        Stack of images in its first axis.
+    upsample_factor : int
+        If greater than one, the shifts are refined to 
+        1/`upsample_factor` of a pixel with `refine_shifts`.
+
+    Returns
+    -------
+    shifts : numpy array
+        One shift per image.
+    max_value : numpy array
+        The maximum values of the correlations.
+
+    """
+    kwargs = {'roi': roi, 'sobel': sobel, 'medfilter': medfilter,
+              'hanning': hanning, 'dtype': dtype}
+    images = np.array([preprocess_image(image, **kwargs)
+                       for image in images])
+    if ref.ndim == 2:
+        ref = preprocess_image(ref, **kwargs)
+    else:
+        ref = np.array([preprocess_image(image, **kwargs)
+                        for image in ref])
+    fsize = fft_correlation_size(images.shape[1:])
+    return shifts_from_spectra(fftn(ref, fsize, axes=(-2, -1)),
+                               fftn(images, fsize, axes=(-2, -1)),
+                               normalize_corr=normalize_corr,
+                               upsample_factor=upsample_factor)
+
+def shifts_from_spectra(spectrum, spectra, normalize_corr=False,
+                        upsample_factor=1):
+    """Estimate the shifts of a stack of images from their FFTs.
+
+    Parameters
+    ----------
+    spectrum : complex numpy array
+        The FFT of the reference image or a stack of FFTs of reference 
+        images, one for every image.
+    spectra : complex numpy array
+        Stack of FFTs of the images.
+    normalize_corr : bool
+        If True use phase correlation instead of standard correlation
+    upsample_factor : int
+        If greater than one, the shifts are refined to 
+        1/`upsample_factor` of a pixel with `refine_shifts`.
+
+    Returns
+    -------
+    shifts : numpy array
+    max_value : numpy array
+
+    """
+    cross_power = cross_power_spectrum(spectrum, spectra,
+                                       normalize=normalize_corr)
+    shifts, max_value = shifts_from_correlation(
+        ifftn(cross_power, axes=(-2, -1)).real)
+    if upsample_factor > 1:
+        shifts = refine_shifts(cross_power, shifts, upsample_factor)
+    return shifts, max_value
+
 def estimate_image_shift(ref, image, roi=None, sobel=True,
                          medfilter=True, hanning=True, plot=False,
                          dtype='float', normalize_corr=False,):
@@ -134,41 +390,16 @@ def estimate_image_shift(ref, image, roi=None, sobel=True,
     
     """
     
-    # Make a copy of the images to avoid modifying them 
-    ref = ref.copy().astype(dtype)
-    image = image.copy().astype(dtype)
-    if roi is not None:
-            top, bottom, left, right = roi
-    else:
-        top, bottom, left, right = [None,] * 4
-        
-    # Select region of interest
-    ref = ref[top:bottom,left:right] 
-    image = image[top:bottom,left:right]
-    
-    # Apply filters
-    for im in (ref,image):
-        if hanning is True:
-            im *= hanning2d(*im.shape) 
-        if medfilter is True:
-            im[:] = sp.signal.medfilt(im)
-        if sobel is True:
-            im[:] = sobel_filter(im)
-    
+    ref, image = [preprocess_image(im, roi=roi, sobel=sobel,
+                                   medfilter=medfilter, hanning=hanning,
+                                   dtype=dtype)
+                  for im in (ref, image)]
     
     phase_correlation = fft_correlation(ref, image,
         normalize=normalize_corr)
     
     # Estimate the shift by getting the coordinates of the maximum
-    argmax = np.unravel_index(np.argmax(phase_correlation),
-                              phase_correlation.shape)
-    threshold = (phase_correlation.shape[0]/2 - 1,
-                phase_correlation.shape[1]/2 - 1)
-    shift0 = argmax[0] if argmax[0] < threshold[0] else  \
-        argmax[0] - phase_correlation.shape[0] 
-    shift1 = argmax[1] if argmax[1] < threshold[1] else \
-        argmax[1] - phase_correlation.shape[1]
-    max_val = phase_correlation.max()
+    shift, max_val = shifts_from_correlation(phase_correlation)
     
     # Plot on demand
     if plot is True:
@@ -185,4 +416,4 @@ def estimate_image_shift(ref, image, roi=None, sobel=True,
     del ref
     del image
     
-    return -np.array((shift0, shift1)), max_val 
+    return shift, max_val 
@@ -334,13 +334,177 @@ def sg(data, num_points, pol_degree, diff_order=0):
     
   
 def interpolate1D(number_of_interpolation_points, data):
+    """Linearly interpolate the data (or all the 1D arrays in its last
+    axis) adding `number_of_interpolation_points` - 1 points between 
+    every two channels.
+
+    """
     ip = number_of_interpolation_points
-    ch = len(data)
+    ch = data.shape[-1]
     old_ax = np.linspace(0, 100, ch)
     new_ax = np.linspace(0, 100, ch * ip - (ip-1))
-    interpolator = scipy.interpolate.interp1d(old_ax,data)
+    interpolator = scipy.interpolate.interp1d(old_ax, data, axis=-1)
     return interpolator(new_ax)
 
+def shift_spectra(data, shifts, fill_value=np.nan):
+    """Shift all the 1D arrays in the rows of a 2D array at once using
+    linear interpolation.
+
+    The result is the same as interpolating every row with 
+    scipy.interpolate.interp1d at its channels minus the shift.
+
+    Parameters
+    ----------
+    data : numpy array
+        2D array.
+    shifts : numpy array
+        The shift of every row in channels.
+    fill_value : float
+        The value of the channels that are out of the original interval
+        after the shift.
+
+    Returns
+    -------
+    numpy array of floats with the shape of `data`.
+
+    """
+    size = data.shape[1]
+    positions = np.arange(size) - np.asarray(
+        shifts, dtype='float')[:, np.newaxis]
+    old_settings = np.seterr(invalid='ignore')
+    try:
+        valid = (positions >= 0) & (positions <= size - 1)
+    finally:
+        np.seterr(**old_settings)
+    positions[~valid] = 0
+    left = np.clip(positions.astype(int), 0, max(size - 2, 0))
+    weights = positions - left
+    rows = np.arange(len(data))[:, np.newaxis]
+    right = np.minimum(left + 1, size - 1)
+    result = data[rows, left] * (1 - weights) + data[rows, right] * weights
+    result[~valid] = fill_value
+    return result
+
+def correlate_spectra(reference, data):
+    """Compute np.correlate(reference, row, 'full') for all the rows of 
+    a 2D array at once using the FFT.
+
+    Parameters
+    ----------
+    reference : numpy array
+        1D array.
+    data : numpy array
+        2D array whose rows have the length of `reference`.
+
+    Returns
+    -------
+    numpy array with 2 * len(reference) - 1 columns.
+
+    """
+    length = len(reference)
+    size = fft_size(2 * length - 1)
+    correlation = np.fft.irfft(np.fft.rfft(reference, size) *
+                               np.fft.rfft(data, size).conjugate(), size)
+    # Reorder the circular correlation as the "full" correlation
+    return np.concatenate((correlation[:, size - length + 1:],
+                           correlation[:, :length]), axis=1)
+
+def fft_size(n):
+    """Returns the smallest power of two greater or equal than n"""
+    return 2 ** int(math.ceil(math.log(n, 2)))
+
+def convolution_fft_size(signal_size, kernel_size):
+    """Choose the fastest method to convolve in "valid" mode.
+
+    The cost of the direct convolution is compared with the cost of 
+    the FFT convolution in a single block and of the overlap-save 
+    method with blocks of different sizes.
+
+    Parameters
+    ----------
+    signal_size, kernel_size : int
+
+    Returns
+    -------
+    None if the direct convolution is estimated to be the fastest. 
+    Otherwise, the FFT size to pass to `fft_convolve_valid`.
+
+    """
+    output_size = signal_size - kernel_size + 1
+    # The direct convolution is implemented in C and it does not 
+    # require the overhead of the FFT calls, what we take into account 
+    # with a rough factor
+    best_cost = output_size * kernel_size / 4.
+    best_size = None
+    size = fft_size(2 * kernel_size)
+    while True:
+        nblocks = math.ceil(float(output_size) / (size - kernel_size + 1))
+        cost = 2 * nblocks * size * math.log(size, 2)
+        if cost < best_cost:
+            best_cost = cost
+            best_size = size
+        if size >= signal_size:
+            break
+        size *= 2
+    return best_size
+
+def fft_convolve_valid(a, kernel_fft, kernel_size, size=None):
+    """Convolve the last axis of an array with a kernel using FFT.
+
+    The result is equivalent to np.convolve(a_i, kernel, mode="valid")
+    for every 1D array a_i in the last axis of `a`, but all the arrays 
+    are convolved at once and the FFT of the kernel is reused. If the 
+    FFT size is smaller than the last axis of `a`, the overlap-save 
+    method is used.
+
+    Parameters
+    ----------
+    a : numpy array
+        Its last axis must be at least as long as the kernel.
+    kernel_fft : numpy array
+        The output of np.fft.rfft(kernel, size). It can contain a 
+        different kernel for each 1D array in `a` if its shape 
+        broadcasts with `a.shape[:-1]`.
+    kernel_size : int
+        The length of the kernel.
+    size : {None, int}
+        The length of the FFT used to compute `kernel_fft`. If 
+        None, `fft_size(a.shape[-1])` is used.
+
+    Returns
+    -------
+    numpy array with the same shape as `a` but with 
+    `a.shape[-1] - kernel_size + 1` elements in the last axis.
+
+    Notes
+    -----
+    The circular convolution only wraps around the first 
+    `kernel_size - 1` channels of each block, that are not part of the 
+    valid region. Therefore the FFT size only needs to cover the 
+    length of `a` to compute the convolution in a single block.
+
+    """
+    signal_size = a.shape[-1]
+    if size is None:
+        size = fft_size(signal_size)
+    if size >= signal_size:
+        result = np.fft.irfft(np.fft.rfft(a, size) * kernel_fft, size)
+        return result[..., kernel_size - 1:signal_size]
+    # Overlap-save
+    step = size - kernel_size + 1
+    output_size = signal_size - kernel_size + 1
+    nblocks = int(math.ceil(float(output_size) / step))
+    padded_size = (nblocks - 1) * step + size
+    padded = np.zeros(a.shape[:-1] + (padded_size,), dtype=a.dtype)
+    padded[..., :signal_size] = a
+    blocks_indices = (np.arange(nblocks)[:, np.newaxis] * step +
+                      np.arange(size))
+    result = np.fft.irfft(
+        np.fft.rfft(padded[..., blocks_indices], size) * 
+        kernel_fft[..., np.newaxis, :],
+        size)[..., kernel_size - 1:]
+    return result.reshape(a.shape[:-1] + (-1,))[..., :output_size]
+
 #def lowess(x, y, f=2/3., iter=3):
 #    """lowess(x, y, f=2./3., iter=3) -> yest
 #
@@ -19,6 +19,8 @@
 import copy
 import os
 import tempfile
+import multiprocessing
+import time
 
 import numpy as np
 import numpy.linalg
@@ -39,17 +41,181 @@
 import hyperspy.drawing.spectrum
 from hyperspy.drawing.utils import on_figure_window_close
 from hyperspy.misc import progressbar
+from hyperspy.misc import array_tools
+from hyperspy.misc.spectrum_tools import (convolution_fft_size,
+                                          fft_convolve_valid)
 from hyperspy._signals.eels import EELSSpectrum, Spectrum
 from hyperspy.defaults_parser import preferences
 from hyperspy.axes import generate_axis
-from hyperspy.exceptions import WrongObjectError
+from hyperspy.exceptions import WrongObjectError, NavigationDimensionError
 from hyperspy.decorators import interactive_range_selector
 from hyperspy.misc.mpfit.mpfit import mpfit
 from hyperspy.axes import AxesManager
+from hyperspy.component import Parameter
 from hyperspy.drawing.widgets import (DraggableVerticalLine,
                                       DraggableLabel)
 from hyperspy.gui.tools import ComponentFit
 
+# The model that the multifit worker processes inherit when forked.
+_multifit_model = None
+
+# The fit statistics that are stored at every navigation position
+fit_map_dtype = np.dtype([
+    ('nfev', 'int'),
+    ('njev', 'int'),
+    ('status', 'float'),
+    ('chisq', 'float'),
+    ('red_chisq', 'float'),
+    ('time', 'float'),
+    ('is_set', 'bool')])
+# The parts of the time of a fit recorded in `Model.fit_timing`
+fit_timing_keys = ('model', 'jacobian', 'convolution', 'fitter')
+
+def _multifit_block(args):
+    """Fit the model at a block of navigation positions.
+
+    This function runs in a worker process of `Model.multifit`. The 
+    model is not pickled but inherited from the parent process through 
+    the `_multifit_model` module variable.
+
+    Parameters
+    ----------
+    args : tuple
+        (start, stop, mask, initial, kwargs) where start and stop are 
+        the flat (C order) indices of the first and after the last 
+        navigation positions of the block, mask is None or a boolean 
+        array that is True at the positions of the block that must not 
+        be fitted, initial is None or a tuple with the navigation 
+        indices and the values of the parameters of the model when 
+        `multifit` was called and kwargs the keyword arguments to pass 
+        to `Model.fit`.
+
+    Returns
+    -------
+    block : numpy array
+        The flat indices of the fitted positions.
+    maps : list of numpy arrays
+        The content of the `map` attribute of every parameter of the
+        model at the fitted positions, in model order.
+    fit_map : numpy array
+        The content of `Model.fit_map` at the fitted positions.
+    timing : dictionary
+        The sum of `Model.fit_timing` over the fitted positions.
+
+    """
+    start, stop, mask, initial, kwargs = args
+    model = _multifit_model
+    nav_shape = tuple(model.axes_manager._navigation_shape_in_array)
+    parameters = [parameter for component in model
+                  for parameter in component.parameters]
+    if initial is not None:
+        # Start from the same state as the serial fit
+        indices, values = initial
+        model.axes_manager.indices = indices
+        for parameter, value in zip(parameters, values):
+            if parameter.twin is None:
+                parameter.value = value
+    timing = dict.fromkeys(fit_timing_keys, 0.)
+    for index in xrange(start, stop):
+        model.axes_manager.indices = np.unravel_index(
+            index, nav_shape)[::-1]
+        if index == start and initial is None:
+            # The values are only fetched when the position changes
+            model.fetch_stored_values()
+        if mask is None or not mask[index - start]:
+            model.fit(**kwargs)
+            for key in fit_timing_keys:
+                timing[key] += model.fit_timing[key]
+    block = np.arange(start, stop)
+    if mask is not None:
+        block = block[~mask]
+    maps = []
+    for parameter in parameters:
+        maps.append(parameter.map.ravel()[block])
+    return block, maps, model.fit_map.ravel()[block], timing
+
+def _get_coarse_signal(signal, factor):
+    """Average the signal over bins of `factor` positions in every
+    navigation dimension.
+
+    The positions at the end of the navigation axes that do not fill a
+    bin are not used.
+
+    Returns
+    -------
+    coarse : Signal
+    factors : list of int
+        The size of the bins in every navigation axis, in array order
+        (1 for the signal axes).
+
+    """
+    slices = []
+    factors = []
+    new_shape = [None] * len(signal.axes_manager._axes)
+    for axis in signal.axes_manager._axes:
+        f = min(factor, axis.size) if axis.navigate else 1
+        n = axis.size // f
+        slices.append(slice(0, n * f))
+        factors.append(f)
+        new_shape[axis.index_in_axes_manager] = n
+    coarse = signal._deepcopy_with_new_data(signal.data[tuple(slices)])
+    coarse.get_dimensions_from_data()
+    coarse = coarse.rebin(new_shape)
+    coarse.data = coarse.data / float(np.prod(factors))
+    return coarse, factors
+
+class _EvaluationPlan(object):
+    """Flat description of the active part of a model that evaluates it
+    from the vector of free parameters during a fit.
+
+    It is built once per fit by `Model.fit`. The values of the free 
+    parameters are written directly to the parameters, bypassing the 
+    `Parameter.value` setter, except for the parameters that are 
+    externally bounded or have connected functions (e.g. the onset 
+    energy of an EELSCLEdge). Those are set through the setter so that 
+    their values are clipped and the connected functions called. The 
+    twins of the free parameters read their value from them as usual.
+
+    Parameters
+    ----------
+    model : Model
+
+    """
+
+    def __init__(self, model):
+        # (component, convolved) for the active components
+        self.components = []
+        # (parameter, start, stop, use_setter) for the free parameters
+        # of the active components, in the order of the model p0
+        self.parameters = []
+        counter = 0
+        for component in model:
+            if not component.active:
+                continue
+            self.components.append(
+                (component, model.convolved and component.convolved))
+            start = counter
+            for parameter in component.free_parameters:
+                stop = start + parameter._number_of_elements
+                use_setter = bool(parameter.ext_bounded or
+                                  parameter.connected_functions)
+                self.parameters.append((parameter, start, stop,
+                                        use_setter))
+                start = stop
+            counter += component._nfree_param
+        self.size = counter
+        self.axis = model.axis.axis[model.channel_switches]
+
+    def set_values(self, p):
+        """Set the values of the free parameters from the vector p."""
+        for parameter, start, stop, use_setter in self.parameters:
+            value = (p[start] if stop - start == 1 
+                     else tuple(p[start:stop]))
+            if use_setter:
+                parameter.value = value
+            else:
+                parameter._Parameter__value = value
+
 class Model(list):
     """Build and fit a model
     
@@ -70,6 +236,18 @@ def __init__(self, spectrum):
         self.free_parameters_boundaries = None
         self.channel_switches=np.array([True] * len(self.axis.axis))
         self._low_loss = None
+        self._low_loss_cache = None
+        self._buffers = {}
+        # The evaluation plan of the current fit (see `fit`)
+        self._plan = None
+        # The number of calls and the time spent in the model function,
+        # the jacobian and the convolution during the current fit
+        self._fit_calls = {'nfev': 0, 'njev': 0}
+        self._fit_times = dict.fromkeys(fit_timing_keys, 0.)
+        self.fit_statistics = None
+        self.fit_timing = None
+        self.fit_map = None
+        self.multifit_timing = None
         self._position_widgets = []
         self._plot = None
         
@@ -109,6 +287,75 @@ def low_loss(self, value):
             self._low_loss = value
             self.convolution_axis = None
             self.convolved = False
+        self._low_loss_cache = None
+
+    def _get_low_loss_kernel(self):
+        """Returns the low-loss spectrum at the current coordinates 
+        and its FFT.
+        
+        The result is cached until the navigation position changes.
+        
+        Returns
+        -------
+        kernel : numpy array
+        kernel_fft : {numpy array, None}
+            The real FFT of the kernel of size `size`.
+        size : {int, None}
+            The FFT size chosen by `convolution_fft_size`. If None, the 
+            direct convolution is faster and `kernel_fft` is None.
+        
+        """
+        indices = self.axes_manager.indices
+        if (self._low_loss_cache is None or 
+                self._low_loss_cache[0] != indices):
+            kernel = self.low_loss(self.axes_manager)
+            size = convolution_fft_size(len(self.convolution_axis),
+                                        len(kernel))
+            kernel_fft = (np.fft.rfft(kernel, size) if size is not None
+                          else None)
+            self._low_loss_cache = (indices, kernel, kernel_fft, size)
+        return self._low_loss_cache[1:]
+
+    def _convolve_low_loss(self, a):
+        """Convolve the last axis of `a` with the low-loss spectrum at 
+        the current coordinates in "valid" mode.
+        
+        Depending on the sizes of the low-loss spectrum and of the
+        convolution axis, the convolution is performed directly or by 
+        FFT (using the overlap-save method if it is faster).
+        
+        Parameters
+        ----------
+        a : numpy array
+            1D or 2D array which last axis has the length of 
+            `convolution_axis`.
+        
+        """
+        start = time.time()
+        kernel, kernel_fft, size = self._get_low_loss_kernel()
+        if size is None:
+            if a.ndim == 1:
+                result = np.convolve(a, kernel, mode="valid")
+            else:
+                result = np.array([np.convolve(row, kernel, mode="valid")
+                                   for row in a])
+        else:
+            result = fft_convolve_valid(a, kernel_fft, len(kernel), size)
+        self._fit_times['convolution'] += time.time() - start
+        return result
+
+    def _get_buffer(self, name, shape):
+        """Returns a float array of the given shape that is reused 
+        between calls to avoid allocating memory in the fitting loops.
+        
+        The content of the array is undefined.
+        
+        """
+        buffer_ = self._buffers.get(name)
+        if buffer_ is None or buffer_.shape != shape:
+            buffer_ = np.empty(shape)
+            self._buffers[name] = buffer_
+        return buffer_
 
         
     # Extend the list methods to call the _touch when the model is modified
@@ -202,7 +449,6 @@ def as_signal(self, component_list=None, out_of_range_to_nan=True):
     
         """
 
-        # TODO: model cube should dissapear or at least be an option
         if component_list:
             active_state = []
             for component_ in self:
@@ -211,36 +457,104 @@ def as_signal(self, component_list=None, out_of_range_to_nan=True):
                     component_.active = True 
                 else:
                     component_.active = False
-        data = np.zeros(self.spectrum.data.shape,dtype='float')
-        data[:] = np.nan
+        data = np.empty(self.spectrum.data.shape, dtype='float')
+        data.fill(np.nan)
         if out_of_range_to_nan is True:
             channel_switches_backup = copy.copy(self.channel_switches)
             self.channel_switches[:] = True
-        maxval = self.axes_manager.navigation_size
-        if maxval > 0:
-            pbar = progressbar.progressbar(maxval=maxval)
-        i = 0
-        for index in self.axes_manager:
-            self.fetch_stored_values(only_fixed=False)
-            data[self.axes_manager._getitem_tuple][
-            self.channel_switches] = self.__call__(
-                non_convolved=not self.convolved, onlyactive=True)
-            i += 1
-            if maxval > 0:
-                pbar.update(i)
-        pbar.finish()
-        if out_of_range_to_nan is True:
-            self.channel_switches[:] = channel_switches_backup
+        try:
+            self._model_nd(data)
+        finally:
+            if out_of_range_to_nan is True:
+                self.channel_switches[:] = channel_switches_backup
+            if component_list:
+                for component_ in self:
+                    component_.active = active_state.pop(0)
         spectrum = self.spectrum.__class__(
             data,
             axes=self.spectrum.axes_manager._get_axes_dicts())
         spectrum.mapped_parameters.title = (
             self.spectrum.mapped_parameters.title + " from fitted model")
-        if component_list:
-            for component_ in self:
-                component_.active = active_state.pop(0)
         return spectrum
+
+    def _model_nd(self, data):
+        """Fill `data` with the model at all the navigation positions.
         
+        The active components that support vectorized evaluation (see 
+        `Component.supports_function_nd`) are evaluated for all the 
+        navigation positions at once using the values stored in the 
+        parameters maps. The rest of the components are evaluated position by 
+        position.
+        
+        Parameters
+        ----------
+        data : numpy array
+            An array with the shape of the spectrum data. Only the 
+            channels in `channel_switches` are written.
+        
+        """
+        # View of data with the signal axis last and the navigation 
+        # axes in the same order as the parameters maps
+        data = np.rollaxis(data, self.axis.index_in_array, data.ndim)
+        if self.axes_manager.navigation_dimension == 0:
+            data = data[np.newaxis]
+        nav_shape = data.shape[:-1]
+        convolved = self.convolved
+        axis = (self.axis.axis if convolved
+                else self.axis.axis[self.channel_switches])
+        sum_ = np.zeros(nav_shape + axis.shape)
+        if convolved:
+            sum_convolved = np.zeros(
+                nav_shape + self.convolution_axis.shape)
+        iterative = []
+        for component in self:
+            if not component.active:
+                continue
+            if not component.supports_function_nd:
+                iterative.append(component)
+            elif convolved and component.convolved:
+                sum_convolved += component.function_nd(
+                    self.convolution_axis)
+            else:
+                sum_ += component.function_nd(axis)
+        if iterative:
+            maxval = self.axes_manager.navigation_size
+            if maxval > 0:
+                pbar = progressbar.progressbar(maxval=maxval)
+            for i, index in enumerate(self.axes_manager):
+                index = index[::-1] if index else (0,)
+                self.fetch_stored_values(only_fixed=False)
+                for component in iterative:
+                    if convolved and component.convolved:
+                        sum_convolved[index] += component.function(
+                            self.convolution_axis)
+                    else:
+                        sum_[index] += component.function(axis)
+                if maxval > 0:
+                    pbar.update(i + 1)
+            if maxval > 0:
+                pbar.finish()
+        if convolved:
+            ll = self.low_loss.data
+            ll = np.rollaxis(ll,
+                self.low_loss.axes_manager.signal_axes[0].index_in_array,
+                ll.ndim)
+            if self.axes_manager.navigation_dimension == 0:
+                ll = ll[np.newaxis]
+            size = convolution_fft_size(sum_convolved.shape[-1],
+                                        ll.shape[-1])
+            if size is None:
+                for index in np.ndindex(*nav_shape):
+                    sum_[index] += np.convolve(ll[index],
+                                               sum_convolved[index],
+                                               mode="valid")
+            else:
+                sum_ += fft_convolve_valid(sum_convolved,
+                                           np.fft.rfft(ll, size),
+                                           ll.shape[-1],
+                                           size)
+            sum_ = sum_[..., self.channel_switches]
+        data[..., self.channel_switches] = sum_
         
     def _get_auto_update_plot(self):
         if self._plot is not None and self._plot.is_active() is True:
@@ -445,9 +759,7 @@ def __call__(self, non_convolved=False, onlyactive=False) :
                         np.add(sum_, component.function(self.axis.axis),
                         sum_)
                     counter+=component._nfree_param
-            to_return = sum_ + np.convolve(
-                self.low_loss(self.axes_manager), 
-                sum_convolved, mode="valid")
+            to_return = sum_ + self._convolve_low_loss(sum_convolved)
             to_return = to_return[self.channel_switches]
             return to_return
 
@@ -551,8 +863,25 @@ def reset_the_signal_range(self):
         if self._get_auto_update_plot() is True:
             self.update_plot()
 
-    def _model_function(self,param):
+    def _model_function(self, param):
+        """Returns the model evaluated with the given values of the free
+        parameters, counting the calls and the time spent (excluding 
+        the convolution) for the fit statistics.
+        
+        """
+        times = self._fit_times
+        convolution = times['convolution']
+        start = time.time()
+        if self._plan is not None:
+            result = self._plan_model_function(param)
+        else:
+            result = self._evaluate_model(param)
+        times['model'] += (time.time() - start - 
+                           times['convolution'] + convolution)
+        self._fit_calls['nfev'] += 1
+        return result
 
+    def _evaluate_model(self, param):
         if self.convolved is True:
             counter = 0
             sum_convolved = np.zeros(len(self.convolution_axis))
@@ -568,8 +897,7 @@ def _model_function(self,param):
                         component._nfree_param], self.axis.axis), sum)
                     counter+=component._nfree_param
 
-            return (sum + np.convolve(self.low_loss(self.axes_manager), 
-                                      sum_convolved,mode="valid"))[
+            return (sum + self._convolve_low_loss(sum_convolved))[
                                       self.channel_switches]
 
         else:
@@ -588,62 +916,100 @@ def _model_function(self,param):
                     counter += component._nfree_param
             return sum
 
+    def _plan_model_function(self, param):
+        """Evaluate the model using the evaluation plan of the current 
+        fit. The components are summed in a buffer that is reused 
+        between calls. The returned array is never the buffer itself.
+        
+        """
+        plan = self._plan
+        plan.set_values(param)
+        if self.convolved is True:
+            sum_convolved = self._get_buffer(
+                'model_convolved', (len(self.convolution_axis),))
+            sum_ = self._get_buffer('model', (len(self.axis.axis),))
+            sum_convolved[:] = 0
+            sum_[:] = 0
+            for component, convolved in plan.components:
+                if convolved:
+                    np.add(sum_convolved, 
+                           component.function(self.convolution_axis),
+                           sum_convolved)
+                else:
+                    np.add(sum_, component.function(self.axis.axis),
+                           sum_)
+            return (sum_ + self._convolve_low_loss(sum_convolved))[
+                self.channel_switches]
+        else:
+            sum_ = self._get_buffer('model', (len(plan.axis),))
+            sum_[:] = 0
+            for component, convolved in plan.components:
+                np.add(sum_, component.function(plan.axis), sum_)
+            # The buffer is overwritten by the next call
+            return sum_.copy()
+
     def _jacobian(self,param, y, weights=None):
+        """Returns the analytical jacobian of the model.
+        
+        The jacobian is computed in a buffer that is only allocated 
+        when the number of free parameters or channels changes. The 
+        returned array is never the buffer itself. When the
+        model is convolved, the gradients of the convolved components
+        are convolved with the low-loss spectrum all at once using FFT.
+        
+        """
+        times = self._fit_times
+        convolution = times['convolution']
+        start = time.time()
         if self.convolved is True:
-            counter = 0
-            grad = np.zeros(len(self.axis.axis))
-            for component in self: # Cut the parameters list
-                if component.active:
-                    component.fetch_values_from_array(param[counter:counter + \
-                    component._nfree_param] , onlyfree=True)
-                    if component.convolved:
-                        for parameter in component.free_parameters :
-                            par_grad = np.convolve(
-                            parameter.grad(self.convolution_axis), 
-                            self.low_loss(self.axes_manager), 
-                            mode="valid")
-                            if parameter._twins:
-                                for parameter in parameter._twins:
-                                    np.add(par_grad, np.convolve(
-                                    parameter.grad(
-                                    self.convolution_axis), 
-                                    self.low_loss(self.axes_manager), 
-                                    mode="valid"), par_grad)
-                            grad = np.vstack((grad, par_grad))
-                        counter += component._nfree_param
-                    else:
-                        for parameter in component.free_parameters :
-                            par_grad = parameter.grad(self.axis.axis)
-                            if parameter._twins:
-                                for parameter in parameter._twins:
-                                    np.add(par_grad, parameter.grad(
-                                    self.axis.axis), par_grad)
-                            grad = np.vstack((grad, par_grad))
-                        counter += component._nfree_param
-            if weights is None:
-                return grad[1:, self.channel_switches]
-            else:
-                return grad[1:, self.channel_switches] * weights
+            axis = self.axis.axis
+            grad = self._get_buffer('jacobian', (len(param), len(axis)))
+            conv_grad = self._get_buffer(
+                'convolved_jacobian', 
+                (len(param), len(self.convolution_axis)))
         else:
             axis = self.axis.axis[self.channel_switches]
-            counter = 0
-            grad = axis
-            for component in self: # Cut the parameters list
-                if component.active:
-                    component.fetch_values_from_array(param[counter:counter + \
-                    component._nfree_param] , onlyfree=True)
-                    for parameter in component.free_parameters :
-                        par_grad = parameter.grad(axis)
-                        if parameter._twins:
-                            for parameter in parameter._twins:
-                                np.add(par_grad, parameter.grad(
-                                axis), par_grad)
-                        grad = np.vstack((grad, par_grad))
-                    counter += component._nfree_param
-            if weights is None:
-                return grad[1:,:]
-            else:
-                return grad[1:,:] * weights
+            grad = self._get_buffer('jacobian', (len(param), len(axis)))
+        convolved_rows = []
+        counter = 0
+        if self._plan is not None:
+            self._plan.set_values(param)
+        for component in self: # Cut the parameters list
+            if component.active:
+                if self._plan is None:
+                    component.fetch_values_from_array(
+                        param[counter:counter + component._nfree_param],
+                        onlyfree=True)
+                convolved = self.convolved and component.convolved
+                x = self.convolution_axis if convolved else axis
+                row = counter
+                for parameter in component.free_parameters :
+                    nrows = parameter._number_of_elements
+                    rows = slice(row, row + nrows)
+                    if convolved:
+                        par_grad = conv_grad[rows]
+                        convolved_rows.extend(range(row, row + nrows))
+                    else:
+                        par_grad = grad[rows]
+                    par_grad[:] = parameter.grad(x)
+                    for twin in parameter._twins:
+                        np.add(par_grad, twin.grad(x), par_grad)
+                    row += nrows
+                counter += component._nfree_param
+        if convolved_rows:
+            grad[convolved_rows] = self._convolve_low_loss(
+                conv_grad[convolved_rows])
+        if self.convolved is True:
+            grad = grad[:, self.channel_switches]
+        if weights is not None:
+            grad = grad * weights
+        elif grad is self._buffers['jacobian']:
+            # The buffer is overwritten by the next call
+            grad = grad.copy()
+        times['jacobian'] += (time.time() - start - 
+                              times['convolution'] + convolution)
+        self._fit_calls['njev'] += 1
+        return grad
         
     def _function4odr(self,param,x):
         return self._model_function(param)
@@ -703,7 +1069,7 @@ def _errfunc4mpfit(self, p, fjac=None, x=None, y=None,
         
     def fit(self, fitter=None, method='ls', grad=False, weights=None,
             bounded=False, ext_bounding=False, update_plot=False, 
-            **kwargs):
+            compiled=True, **kwargs):
         """Fits the model to the experimental data
         
         Parameters
@@ -739,16 +1105,47 @@ def fit(self, fitter=None, method='ls', grad=False, weights=None,
             If True, the plot is updated during the optimization 
             process. It slows down the optimization but it permits
             to visualize the optimization progress. 
+        compiled : bool
+            If True, the model is compiled into an evaluation plan 
+            before fitting that evaluates it directly from the vector 
+            of free parameters, without going through the value setter
+            of the parameters that are not externally bounded and have
+            no connected functions. It reduces the overhead of 
+            evaluating small models. The parameters are set as usual 
+            when the fit finishes.
         
         **kwargs : key word arguments
             Any extra key word argument will be passed to the chosen
             fitter
             
+        Notes
+        -----
+        The statistics of the fit are stored in the `fit_statistics` 
+        attribute, a dictionary with the following keys:
+        
+        * nfev, njev: the number of evaluations of the model and of its
+          jacobian.
+        * status: the status code returned by the fitter (see its 
+          documentation), NaN if the fitter does not return one.
+        * chisq: the weighted sum of the squares of the residuals.
+        * red_chisq: chisq divided by the number of degrees of freedom.
+        * time: the duration of the fit in seconds.
+        
+        The `fit_timing` attribute stores how the duration of the fit 
+        splits between the evaluation of the model, of its jacobian, 
+        the convolution with the low-loss spectrum and the fitter. The 
+        statistics are also stored in the `fit_map` array at the current
+        navigation position.
+            
         See Also
         --------
-        multifit
+        multifit, fit_statistics_as_signal
             
         """
+        start = time.time()
+        self._fit_calls = {'nfev': 0, 'njev': 0}
+        self._fit_times = dict.fromkeys(fit_timing_keys, 0.)
+        status = np.nan
         if fitter is None:
             fitter = preferences.Model.default_fitter
         switch_aap = (update_plot != self._get_auto_update_plot())
@@ -757,6 +1154,8 @@ def fit(self, fitter=None, method='ls', grad=False, weights=None,
             
         self.p_std = None
         self._set_p0()
+        # The low-loss data may have changed since the last fit
+        self._low_loss_cache = None
         if ext_bounding:
             self._enable_ext_bounding()
         if grad is False :
@@ -785,133 +1184,233 @@ def fit(self, fitter=None, method='ls', grad=False, weights=None,
         args = (self.spectrum()[self.channel_switches], 
         weights)
         
-        # Least squares "dedicated" fitters
-        if fitter == "leastsq":
-            output = \
-            leastsq(self._errfunc, self.p0[:], Dfun = jacobian,
-            col_deriv=1, args = args, full_output = True, **kwargs)
+        self._plan = _EvaluationPlan(self) if compiled else None
+        try:
+            # Least squares "dedicated" fitters
+            if fitter == "leastsq":
+                output = \
+                leastsq(self._errfunc, self.p0[:], Dfun = jacobian,
+                col_deriv=1, args = args, full_output = True, **kwargs)
             
-            self.p0 = output[0]
-            var_matrix = output[1]
-            # In Scipy 0.7 sometimes the variance matrix is None (maybe a 
-            # bug?) so...
-            if var_matrix is not None:
-                self.p_std = np.sqrt(np.diag(var_matrix))
-            self.fit_output = output
-        
-        elif fitter == "odr":
-            modelo = odr.Model(fcn = self._function4odr, 
-            fjacb = odr_jacobian)
-            mydata = odr.RealData(self.axis.axis[self.channel_switches],
-            self.spectrum()[self.channel_switches],
-            sx = None,
-            sy = (1/weights if weights is not None else None))
-            myodr = odr.ODR(mydata, modelo, beta0=self.p0[:])
-            myoutput = myodr.run()
-            result = myoutput.beta
-            self.p_std = myoutput.sd_beta
-            self.p0 = result
-            self.fit_output = myoutput
+                self.p0 = output[0]
+                var_matrix = output[1]
+                # In Scipy 0.7 sometimes the variance matrix is None (maybe a 
+                # bug?) so...
+                if var_matrix is not None:
+                    self.p_std = np.sqrt(np.diag(var_matrix))
+                self.fit_output = output
+                status = output[4]
+        
+            elif fitter == "odr":
+                modelo = odr.Model(fcn = self._function4odr, 
+                fjacb = odr_jacobian)
+                mydata = odr.RealData(self.axis.axis[self.channel_switches],
+                self.spectrum()[self.channel_switches],
+                sx = None,
+                sy = (1/weights if weights is not None else None))
+                myodr = odr.ODR(mydata, modelo, beta0=self.p0[:])
+                myoutput = myodr.run()
+                result = myoutput.beta
+                self.p_std = myoutput.sd_beta
+                self.p0 = result
+                self.fit_output = myoutput
+                status = myoutput.info
             
-        elif fitter == 'mpfit':
-            autoderivative = 1
-            if grad is True:
-                autoderivative = 0
+            elif fitter == 'mpfit':
+                autoderivative = 1
+                if grad is True:
+                    autoderivative = 0
 
-            if bounded is True:
-                self.set_mpfit_parameters_info()
-            elif bounded is False:
-                self.mpfit_parinfo = None
-            m = mpfit(self._errfunc4mpfit, self.p0[:], 
-                parinfo=self.mpfit_parinfo, functkw= {
-                'y': self.spectrum()[self.channel_switches], 
-                'weights' :weights}, autoderivative = autoderivative,
-                quiet = 1)
-            self.p0 = m.params
-            self.p_std = m.perror
-            self.fit_output = m
+                if bounded is True:
+                    self.set_mpfit_parameters_info()
+                elif bounded is False:
+                    self.mpfit_parinfo = None
+                m = mpfit(self._errfunc4mpfit, self.p0[:], 
+                    parinfo=self.mpfit_parinfo, functkw= {
+                    'y': self.spectrum()[self.channel_switches], 
+                    'weights' :weights}, autoderivative = autoderivative,
+                    quiet = 1)
+                self.p0 = m.params
+                self.p_std = m.perror
+                self.fit_output = m
+                status = m.status
             
-        else:          
-        # General optimizers (incluiding constrained ones(tnc,l_bfgs_b)
-        # Least squares or maximum likelihood
-            if method == 'ml':
-                tominimize = self._poisson_likelihood_function
-                fprime = grad_ml
-            elif method == 'ls':
-                tominimize = self._errfunc2
-                fprime = grad_ls
+            else:          
+            # General optimizers (incluiding constrained ones(tnc,l_bfgs_b)
+            # Least squares or maximum likelihood
+                if method == 'ml':
+                    tominimize = self._poisson_likelihood_function
+                    fprime = grad_ml
+                elif method == 'ls':
+                    tominimize = self._errfunc2
+                    fprime = grad_ls
                         
-            # OPTIMIZERS
+                # OPTIMIZERS
             
-            # Simple (don't use gradient)
-            if fitter == "fmin" :
-                self.p0 = fmin(
-                    tominimize, self.p0, args = args, **kwargs)
-            elif fitter == "powell" :
-                self.p0 = fmin_powell(tominimize, self.p0, args = args, 
-                **kwargs)
+                # Simple (don't use gradient)
+                if fitter == "fmin" :
+                    self.p0 = fmin(
+                        tominimize, self.p0, args = args, **kwargs)
+                elif fitter == "powell" :
+                    self.p0 = fmin_powell(tominimize, self.p0, args = args, 
+                    **kwargs)
             
-            # Make use of the gradient
-            elif fitter == "cg" :
-                self.p0 = fmin_cg(tominimize, self.p0, fprime = fprime,
-                args= args, **kwargs)
-            elif fitter == "ncg" :
-                self.p0 = fmin_ncg(tominimize, self.p0, fprime = fprime,
-                args = args, **kwargs)
-            elif fitter == "bfgs" :
-                self.p0 = fmin_bfgs(
-                    tominimize, self.p0, fprime = fprime,
+                # Make use of the gradient
+                elif fitter == "cg" :
+                    self.p0 = fmin_cg(tominimize, self.p0, fprime = fprime,
+                    args= args, **kwargs)
+                elif fitter == "ncg" :
+                    self.p0 = fmin_ncg(tominimize, self.p0, fprime = fprime,
                     args = args, **kwargs)
+                elif fitter == "bfgs" :
+                    self.p0 = fmin_bfgs(
+                        tominimize, self.p0, fprime = fprime,
+                        args = args, **kwargs)
             
-            # Constrainded optimizers
+                # Constrainded optimizers
             
-            # Use gradient
-            elif fitter == "tnc":
-                if bounded is True:
-                    self.set_boundaries()
-                elif bounded is False:
-                    self.self.free_parameters_boundaries = None
-                self.p0 = fmin_tnc(tominimize, self.p0, fprime = fprime,
-                args = args, bounds = self.free_parameters_boundaries, 
-                approx_grad = approx_grad, **kwargs)[0]
-            elif fitter == "l_bfgs_b":
-                if bounded is True:
-                    self.set_boundaries()
-                elif bounded is False:
-                    self.self.free_parameters_boundaries = None
-                self.p0 = fmin_l_bfgs_b(tominimize, self.p0,
-                    fprime=fprime, args=args, 
-                    bounds=self.free_parameters_boundaries, 
-                    approx_grad = approx_grad, **kwargs)[0]
-            else:
-                print \
-                """
-                The %s optimizer is not available.
-
-                Available optimizers:
-                Unconstrained:
-                --------------
-                Only least Squares: leastsq and odr
-                General: fmin, powell, cg, ncg, bfgs
-
-                Cosntrained:
-                ------------
-                tnc and l_bfgs_b
-                """ % fitter
-                
-        
+                # Use gradient
+                elif fitter == "tnc":
+                    if bounded is True:
+                        self.set_boundaries()
+                    elif bounded is False:
+                        self.self.free_parameters_boundaries = None
+                    self.p0, nfeval, status = fmin_tnc(tominimize, self.p0,
+                    fprime = fprime, args = args, 
+                    bounds = self.free_parameters_boundaries, 
+                    approx_grad = approx_grad, **kwargs)
+                elif fitter == "l_bfgs_b":
+                    if bounded is True:
+                        self.set_boundaries()
+                    elif bounded is False:
+                        self.self.free_parameters_boundaries = None
+                    self.p0, f, info = fmin_l_bfgs_b(tominimize, self.p0,
+                        fprime=fprime, args=args, 
+                        bounds=self.free_parameters_boundaries, 
+                        approx_grad = approx_grad, **kwargs)
+                    status = info['warnflag']
+                else:
+                    print \
+                    """
+                    The %s optimizer is not available.
+
+                    Available optimizers:
+                    Unconstrained:
+                    --------------
+                    Only least Squares: leastsq and odr
+                    General: fmin, powell, cg, ncg, bfgs
+
+                    Cosntrained:
+                    ------------
+                    tnc and l_bfgs_b
+                    """ % fitter
+        finally:
+            self._plan = None
+
         if np.iterable(self.p0) == 0:
             self.p0 = (self.p0,)
         self._fetch_values_from_p0(p_std=self.p_std)
         self.store_current_values()
+        self._store_fit_statistics(time.time() - start, status, *args)
         if ext_bounding is True:
             self._disable_ext_bounding()
         if switch_aap is True and update_plot is False:
             self._connect_parameters2update_plot()
             self.update_plot()            
                 
+    def _create_fit_map(self):
+        """Create the array that stores the fit statistics at every 
+        navigation position unless it exists and has the right shape.
+        
+        """
+        shape = self.axes_manager._navigation_shape_in_array
+        if len(shape) == 1 and shape[0] == 0:
+            shape = [1,]
+        if self.fit_map is None or self.fit_map.shape != tuple(shape):
+            self.fit_map = np.zeros(shape, dtype=fit_map_dtype)
+            for field in ('status', 'chisq', 'red_chisq', 'time'):
+                self.fit_map[field] = np.nan
+
+    def _store_fit_statistics(self, elapsed, status, y, weights):
+        """Set `fit_statistics` and `fit_timing` and store the 
+        statistics in `fit_map` at the current position.
+        
+        Parameters
+        ----------
+        elapsed : float
+            The duration of the fit.
+        status : number
+            The status code returned by the fitter.
+        y, weights : numpy array
+            The data and the weights of the fit.
+        
+        """
+        timing = self._fit_times.copy()
+        timing['fitter'] = elapsed - (timing['model'] + 
+                                      timing['jacobian'] + 
+                                      timing['convolution'])
+        statistics = self._fit_calls.copy()
+        # Computed after reading the counters so that this evaluation
+        # of the model is not counted
+        chisq = self._errfunc2(self.p0, y, weights)
+        degrees_of_freedom = len(y) - len(self.p0)
+        statistics.update({
+            'status' : status,
+            'chisq' : chisq,
+            'red_chisq' : (chisq / degrees_of_freedom 
+                           if degrees_of_freedom > 0 else np.nan),
+            'time' : elapsed})
+        self.fit_timing = timing
+        self.fit_statistics = statistics
+        self._create_fit_map()
+        indices = self.axes_manager.indices[::-1]
+        # If it is a single spectrum indices is ()
+        if not indices:
+            indices = (0,)
+        for field, value in statistics.iteritems():
+            self.fit_map[field][indices] = value
+        self.fit_map['is_set'][indices] = True
+
+    def fit_statistics_as_signal(self, field='red_chisq'):
+        """Get the statistics of the fits stored in `fit_map` as a 
+        signal object.
+        
+        Please note that this method only works when the navigation 
+        dimension is greater than 0.
+        
+        Parameters
+        ----------
+        field : {'nfev', 'njev', 'status', 'chisq', 'red_chisq', 
+                 'time', 'is_set'}
+            See the documentation of `fit` for the meaning of the 
+            fields. The positions that have not been fitted are NaN (or
+            zero for 'nfev' and 'njev').
+        
+        Raises
+        ------
+        
+        NavigationDimensionError : if the navigation dimension is 0
+        
+        """
+        from hyperspy.signal import Signal
+        if self.axes_manager.navigation_dimension == 0:
+            raise NavigationDimensionError(0, '>0')
+        if field not in fit_map_dtype.names:
+            raise ValueError("field must be one of %s" % 
+                             str(fit_map_dtype.names))
+        if self.fit_map is None:
+            raise ValueError("The model has not been fitted")
+        s = Signal(data=self.fit_map[field].copy(),
+                   axes=self.axes_manager._get_navigation_axes_dicts())
+        s.mapped_parameters.title = field
+        for axis in s.axes_manager._axes:
+            axis.navigate = False
+        return s
+
     def multifit(self, mask=None, fetch_only_fixed=False,
-                 autosave=False, autosave_every=10, **kwargs):
+                 autosave=False, autosave_every=10, parallel=False,
+                 workers=None, seed='previous', seed_factor=2,
+                 **kwargs):
         """Fit the data to the model at all the positions of the 
         navigation dimensions.        
         
@@ -930,18 +1429,59 @@ def multifit(self, mask=None, fetch_only_fixed=False,
             with a frequency defined by autosave_every.
         autosave_every : int
             Save the result of fitting every given number of spectra.
+        parallel : bool
+            If True, the navigation space is split in blocks of 
+            contiguous positions that are fitted in a pool of worker 
+            processes. Each worker fits its blocks with its own copy of 
+            the model and the results are written back in the `map` 
+            attribute of the parameters. The results are identical to 
+            the serial ones (see Notes). It requires a platform that 
+            supports forking processes, otherwise the fit is performed
+            serially.
+        workers : {None, int}
+            The number of worker processes when `parallel` is True. If 
+            None, the number of CPUs is used.
+        seed : {'previous', 'neighbours', 'coarse'}
+            How the starting values of the free parameters are chosen 
+            at the positions where they are not stored. 'previous' 
+            starts from the result of the previous position. 
+            'neighbours' starts from the average of the results at the 
+            neighbouring positions that have already been fitted (it 
+            requires fitting serially). 'coarse' first fits the 
+            spectrum averaged over bins of `seed_factor` positions in 
+            every navigation dimension and stores the results as the 
+            starting values of all the positions of every bin.
+        seed_factor : int
+            The size of the bins when seed is 'coarse'.
         
         **kwargs : key word arguments
             Any extra key word argument will be passed to 
             the fit method. See the fit method documentation for 
             a list of valid arguments.
             
+        Notes
+        -----
+        The statistics of the fit at every position (see `fit`) are 
+        stored in the `fit_map` attribute, that `fit_statistics_as_signal`
+        returns as a signal, e.g. to find the positions that need to be 
+        refitted. The sum of the `fit_timing` of all the fits is stored 
+        in the `multifit_timing` dictionary, together with the total 
+        duration of multifit ('total' key).
+        
+        When fitting in parallel, the blocks only start at the 
+        positions where the values of all the parameters are stored 
+        (and at the first position), so that every position starts 
+        from the same values as in the serial fit. Therefore, the fit 
+        is only parallel when the starting values are stored, e.g. 
+        after `Parameter.assign_current_value_to_all` or with 
+        seed='coarse', otherwise it is performed serially.
+            
         See Also
         --------
-        fit
+        fit, fit_statistics_as_signal
             
         """
-        
+        start = time.time()
         if autosave is not False:
             fd, autosave_fn = tempfile.mkstemp(
                 prefix = 'hyperspy_autosave-', 
@@ -959,6 +1499,23 @@ def multifit(self, mask=None, fetch_only_fixed=False,
            "The mask must be a numpy array of boolen type with "
            " shape: %s" % 
            self.axes_manager._navigation_shape_in_array)
+        if seed not in ('previous', 'neighbours', 'coarse'):
+            raise ValueError(
+                "seed must be 'previous', 'neighbours' or 'coarse'")
+        if self.axes_manager.navigation_dimension == 0:
+            seed = 'previous'
+        if seed == 'neighbours' and parallel is True:
+            messages.warning(
+                "Seeding from the neighbours requires fitting serially.")
+            parallel = False
+        timing = dict.fromkeys(fit_timing_keys, 0.)
+        if seed == 'coarse':
+            self._fit_coarse(seed_factor, mask, parallel=parallel,
+                             workers=workers, **kwargs)
+            for key in fit_timing_keys:
+                timing[key] += self.multifit_timing[key]
+        self.multifit_timing = timing
+        self.fit_map = None
         masked_elements = 0 if mask is None else mask.sum()
         maxval=self.axes_manager.navigation_size - masked_elements
         if maxval > 0:
@@ -976,15 +1533,53 @@ def multifit(self, mask=None, fetch_only_fixed=False,
                 "If you require boundinig please select one of the "
                 "following fitters instead: mpfit, tnc, l_bfgs_b")
                 kwargs['bounded'] = False
-        i = 0
-        for index in self.axes_manager:
-            if mask is None or not mask[index]:
-                self.fit(**kwargs)
-                i += 1
-                if maxval > 0:
-                    pbar.update(i)
-            if autosave is True and i % autosave_every  == 0:
-                self.save_parameters2file(autosave_fn)
+        if parallel is True and not hasattr(os, 'fork'):
+            messages.warning(
+                "Parallel multifit requires forking processes, what "
+                "is not supported in this platform. Fitting serially.")
+            parallel = False
+        if parallel is True and maxval > 1:
+            if workers is None:
+                workers = multiprocessing.cpu_count()
+            # Several blocks per worker to balance the load when the
+            # convergence speed is not homogeneous
+            blocks = self._get_multifit_blocks(mask, 4 * workers)
+            if len(blocks) == 1:
+                messages.information(
+                    "Parallel multifit requires storing the starting "
+                    "values of the parameters. Fitting serially.")
+                parallel = False
+        if parallel is True and maxval > 1:
+            self._multifit_parallel(blocks=blocks,
+                                    mask=mask,
+                                    autosave=autosave,
+                                    autosave_fn=autosave_fn if autosave
+                                    else None,
+                                    autosave_every=autosave_every,
+                                    workers=workers,
+                                    pbar=pbar,
+                                    **kwargs)
+        else:
+            i = 0
+            fitted = None
+            if seed == 'neighbours':
+                fitted = np.zeros(
+                    self.axes_manager._navigation_shape_in_array, 
+                    dtype='bool')
+            for index in self.axes_manager:
+                if mask is None or not mask[index[::-1]]:
+                    if fitted is not None:
+                        self._seed_from_neighbours(index[::-1], fitted)
+                    self.fit(**kwargs)
+                    for key in fit_timing_keys:
+                        timing[key] += self.fit_timing[key]
+                    if fitted is not None:
+                        fitted[index[::-1]] = True
+                    i += 1
+                    if maxval > 0:
+                        pbar.update(i)
+                if autosave is True and i % autosave_every  == 0:
+                    self.save_parameters2file(autosave_fn)
         if maxval > 0:
             pbar.finish()
         if autosave is True:
@@ -992,7 +1587,189 @@ def multifit(self, mask=None, fetch_only_fixed=False,
             'Deleting the temporary file %s pixels' % (
                 autosave_fn + 'npz'))
             os.remove(autosave_fn + '.npz')
+        timing['total'] = time.time() - start
 
+    def _seed_from_neighbours(self, indices, fitted):
+        """Set the values of the free parameters that are not stored at
+        the given position to the average of their values at the 
+        neighbouring positions that have been fitted.
+        
+        Parameters
+        ----------
+        indices : tuple
+            The navigation position in array order.
+        fitted : boolean numpy array
+            True at the positions that have been fitted.
+        
+        """
+        window = tuple(slice(max(i - 1, 0), i + 2) for i in indices)
+        neighbours = fitted[window]
+        if not neighbours.any():
+            return
+        for component in self:
+            if component.active:
+                for parameter in component.free_parameters:
+                    if parameter.map['is_set'][indices]:
+                        continue
+                    values = parameter.map['values'][window][
+                        neighbours].mean(0)
+                    parameter.value = (
+                        values if parameter._number_of_elements == 1 
+                        else tuple(values))
+
+    def _fit_coarse(self, factor, mask=None, **kwargs):
+        """Fit the spectrum averaged over bins of `factor` positions in 
+        every navigation dimension and store the results in the maps of
+        the free parameters at all the positions of every bin where they
+        are not stored and not masked.
+        
+        The keyword arguments are passed to `multifit`.
+        
+        """
+        coarse, factors = _get_coarse_signal(self.spectrum, factor)
+        nav_shape = self.axes_manager._navigation_shape_in_array
+        nav_factors = [f for f, axis in 
+                       zip(factors, self.axes_manager._axes)
+                       if axis.navigate]
+        coarse_shape = coarse.axes_manager._navigation_shape_in_array
+        coarse_mask = None
+        if mask is not None:
+            cropped = mask[tuple(slice(0, n * f) for n, f in
+                                 zip(coarse_shape, nav_factors))]
+            # Only skip the bins where all the positions are masked
+            coarse_mask = (array_tools.rebin(cropped.astype('int'),
+                                             coarse_shape) ==
+                           np.prod(nav_factors))
+        low_loss = self._low_loss
+        spectrum = self.spectrum
+        axes_manager = self.axes_manager
+        maps = dict((parameter, parameter.map) for component in self
+                    for parameter in component.parameters)
+        fit_map = self.fit_map
+        self.spectrum = coarse
+        self.axes_manager = coarse.axes_manager
+        for component in self:
+            component._axes_manager = coarse.axes_manager
+            for parameter in component.parameters:
+                parameter.map = None
+            component._create_arrays()
+        if low_loss is not None:
+            self.low_loss = _get_coarse_signal(low_loss, factor)[0]
+        self.axes_manager.connect(self.fetch_stored_values)
+        try:
+            self.multifit(mask=coarse_mask, **kwargs)
+            coarse_maps = dict((parameter, parameter.map) 
+                               for component in self
+                               for parameter in component.parameters)
+        finally:
+            self.axes_manager.disconnect(self.fetch_stored_values)
+            self.spectrum = spectrum
+            self.axes_manager = axes_manager
+            for component in self:
+                component._axes_manager = axes_manager
+            for parameter, map_ in maps.iteritems():
+                parameter.map = map_
+            self.fit_map = fit_map
+            self._low_loss = low_loss
+            self._low_loss_cache = None
+        # The position of the bin of every position
+        bins = np.ix_(*[np.minimum(np.arange(n) // f, m - 1) for n, f, m
+                        in zip(nav_shape, nav_factors, coarse_shape)])
+        for component in self:
+            if component.active:
+                for parameter in component.free_parameters:
+                    coarse_map = coarse_maps[parameter][bins]
+                    # Keep the values stored before the coarse pass
+                    is_set = coarse_map['is_set'] & ~parameter.map['is_set']
+                    if mask is not None:
+                        is_set = is_set & ~mask
+                    parameter.map['values'][is_set] = \
+                        coarse_map['values'][is_set]
+                    parameter.map['is_set'][is_set] = True
+        self.fetch_stored_values()
+
+    def _get_multifit_blocks(self, mask, nblocks):
+        """Split the navigation space in up to `nblocks` blocks of 
+        contiguous positions with similar number of positions to fit.
+        
+        The blocks start at the first position or at positions where
+        the values of all the parameters that are fetched are stored, 
+        so that they can be fitted independently with the same result 
+        as the serial fit.
+        
+        Returns
+        -------
+        blocks : list of tuples
+            The flat (C order) indices of the first and after the last 
+            position of every block.
+            
+        """
+        size = self.axes_manager.navigation_size
+        stored = np.ones(size, dtype='bool')
+        for component in self:
+            for parameter in component.parameters:
+                if (parameter.twin is None or 
+                        not isinstance(parameter.twin, Parameter)):
+                    stored &= parameter.map['is_set'].ravel()
+        to_fit = (np.ones(size, dtype='bool') if mask is None 
+                  else ~mask.ravel())
+        # The number of positions to fit before every position
+        fitted_before = np.concatenate(([0], np.cumsum(to_fit)[:-1]))
+        block_size = to_fit.sum() / float(nblocks)
+        starts = [0]
+        for index in np.nonzero(stored)[0]:
+            if (index > 0 and fitted_before[index] - 
+                    fitted_before[starts[-1]] >= block_size):
+                starts.append(index)
+        return zip(starts, starts[1:] + [size])
+
+    def _multifit_parallel(self, blocks, mask, autosave, autosave_fn,
+                           autosave_every, workers, pbar, **kwargs):
+        """Fit all the not masked navigation positions in a pool of 
+        worker processes.
+        
+        See `multifit` for the meaning of the parameters and 
+        `_get_multifit_blocks` for `blocks`.
+        
+        """
+        global _multifit_model
+        parameters = [parameter for component in self
+                      for parameter in component.parameters]
+        initial = (self.axes_manager.indices, 
+                   [parameter.value for parameter in parameters])
+        args = []
+        for start, stop in blocks:
+            args.append((start, stop,
+                         None if mask is None 
+                         else mask.ravel()[start:stop],
+                         initial if start == 0 else None,
+                         kwargs))
+        self._create_fit_map()
+        _multifit_model = self
+        pool = multiprocessing.Pool(processes=workers)
+        try:
+            i = 0
+            for block, maps, fit_map, timing in pool.imap_unordered(
+                    _multifit_block, args):
+                for parameter, map_ in zip(parameters, maps):
+                    parameter.map.flat[block] = map_
+                self.fit_map.flat[block] = fit_map
+                for key in fit_timing_keys:
+                    self.multifit_timing[key] += timing[key]
+                old_i = i
+                i += len(block)
+                pbar.update(i)
+                if (autosave is True and
+                        i // autosave_every != old_i // autosave_every):
+                    self.save_parameters2file(autosave_fn)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            _multifit_model = None
+        self.fetch_stored_values()
             
     def save_parameters2file(self, filename):
         """Save the parameters array in binary format
@@ -20,6 +20,9 @@
 import os.path
 import warnings
 import math
+import itertools
+import multiprocessing
+import multiprocessing.pool
 
 import numpy as np
 import numpy.ma as ma
@@ -50,13 +53,130 @@
 from hyperspy.decorators import interactive_range_selector
 from scipy.ndimage.filters import gaussian_filter1d
 from hyperspy.misc.spectrum_tools import find_peaks_ohaver
-from hyperspy.misc.image_tools import (shift_image, estimate_image_shift)
+from hyperspy.misc.image_tools import (shift_image, estimate_image_shift,
+                                       estimate_image_shifts,
+                                       fft_correlation_size,
+                                       preprocess_image, image_spectrum,
+                                       shifts_from_spectra)
 from hyperspy.misc.math_tools import symmetrize, antisymmetrize
 from hyperspy.exceptions import SignalDimensionError, DataDimensionError
 from hyperspy.misc import array_tools
+from hyperspy.misc.chunked_array import ChunkedArray
+from hyperspy.misc import chunked_array
 from hyperspy.misc import spectrum_tools
 from hyperspy import components
 
+# The function of the pool of `_imap_unordered` in a worker process. 
+# It is set by the pool initializer when the worker is forked, so every
+# pool has its own.
+_pool_function = None
+
+def _set_pool_function(function):
+    global _pool_function
+    _pool_function = function
+
+def _call_pool_function(item):
+    return _pool_function(item)
+
+def _check_parallel(parallel):
+    """Return 'processes', 'threads' or False from the `parallel` 
+    keyword of the methods that can run in parallel.
+
+    """
+    if parallel is True:
+        parallel = 'processes'
+    if parallel not in (False, 'processes', 'threads'):
+        raise ValueError(
+            "parallel must be one of: False, True, 'processes', "
+            "'threads'")
+    if parallel == 'processes' and not hasattr(os, 'fork'):
+        messages.warning(
+            "Running in parallel processes requires forking, what "
+            "is not supported in this platform. Using threads.")
+        parallel = 'threads'
+    return parallel
+
+def _imap_unordered(function, iterable, parallel, workers=None):
+    """Apply a function to the items of an iterable in a pool of worker
+    processes or threads and yield the results as they are ready.
+
+    The function is not pickled but inherited by the worker processes 
+    when forked, so it can be e.g. a closure. Only the items and the 
+    results are pickled.
+
+    Parameters
+    ----------
+    function : function
+    iterable : iterable
+    parallel : {'processes', 'threads'}
+    workers : {None, int}
+        The number of workers. If None, the number of CPUs is used.
+
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if parallel == 'processes':
+        # The function is passed to the workers when they are forked, 
+        # not pickled
+        pool = multiprocessing.Pool(processes=workers,
+                                    initializer=_set_pool_function,
+                                    initargs=(function,))
+        function = _call_pool_function
+    else:
+        pool = multiprocessing.pool.ThreadPool(processes=workers)
+    try:
+        for result in pool.imap_unordered(function, iterable):
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+def _get_position_index(ndim, indices_in_array, position):
+    getitem = [slice(None)] * ndim
+    for axis, index in zip(indices_in_array, position):
+        getitem[axis] = index
+    return tuple(getitem)
+
+def _get_position_data(data, indices_in_array, position):
+    return data[_get_position_index(len(data.shape), indices_in_array,
+                                    position)]
+
+def _map_block(block, arguments):
+    """Apply the function of `Signal.map` at a block of navigation 
+    positions.
+
+    Parameters
+    ----------
+    block : numpy array
+        The flat (C order) indices of the navigation positions.
+    arguments : tuple
+        (data, indices_in_array, navigation_shape, function, iterated, 
+        kwargs).
+
+    Returns
+    -------
+    block : numpy array
+    results : list
+        The function result at every position of the block.
+
+    """
+    (data, indices_in_array, navigation_shape, function, iterated,
+        kwargs) = arguments
+    results = []
+    for index in block:
+        position = np.unravel_index(index, navigation_shape)
+        position_kwargs = kwargs.copy()
+        for key, (value, value_indices) in iterated.iteritems():
+            position_kwargs[key] = _get_position_data(
+                value, value_indices, position)
+        results.append(function(
+            _get_position_data(data, indices_in_array, position),
+            **position_kwargs))
+    return block, results
+
 class Signal2DTools(object):
     def estimate_shift2D(self, reference='current',
                                 correlation_threshold=None,
@@ -67,7 +187,9 @@ def estimate_shift2D(self, reference='current',
                                 medfilter=True,
                                 hanning=True,
                                 plot=False,
-                                dtype='float',):
+                                dtype='float',
+                                upsample_factor=1,
+                                parallel=False):
         """Estimate the shifts in a image using phase correlation
 
         This method can only estimate the shift by comparing 
@@ -106,11 +228,22 @@ def estimate_shift2D(self, reference='current',
         hanning : bool
             Apply a 2d hanning filter
         plot : bool
-            If True plots the images after applying the filters and
-            the phase correlation
+            If True plots the reference and the first image after 
+            applying the filters and their phase correlation. When 
+            `reference` is 'stat' only the autocorrelation of the 
+            current image is plotted.
         dtype : str or dtype
             Typecode or data-type in which the calculations must be
             performed.
+        upsample_factor : int
+            If greater than one, the shifts are estimated with a 
+            precision of 1/`upsample_factor` pixels by upsampling the 
+            correlation around its maximum. See 
+            `image_tools.refine_shifts`.
+        parallel : {False, True, 'processes', 'threads'}
+            If not False and `reference` is 'stat', filter and 
+            transform the images and compute the correlations in 
+            parallel. See `map`.
             
         Returns
         -------
@@ -123,6 +256,13 @@ def estimate_shift2D(self, reference='current',
         The statistical analysis approach to the translation estimation
         when using `reference`='stat' roughly follows [1]_ . If you use 
         it please cite their article.
+
+        The images are processed in blocks: the Fourier transforms of 
+        all the images of a block are computed with a single call and
+        all their correlations at once. When `reference` is 'stat' 
+        every image is filtered and Fourier transformed only once. The 
+        transforms are stored in memory or, if they are larger than 
+        `chunked_array.BLOCK_BYTES`, in a temporary memory-mapped file.
         
         References
         ----------
@@ -143,7 +283,6 @@ def estimate_shift2D(self, reference='current',
 
         ref = None if reference == 'cascade' else \
             self.__call__().copy()
-        shifts = []
         nrows = None
         images_number = self.axes_manager._max_index + 1
         if reference == 'stat':
@@ -152,7 +291,7 @@ def estimate_shift2D(self, reference='current',
             pcarray = ma.zeros((nrows, self.axes_manager._max_index + 1,
                                 ),
                                 dtype=np.dtype([('max_value', np.float),
-                                                ('shift', np.int32,
+                                                ('shift', np.float,
                                                 (2,))]))
             nshift, max_value = estimate_image_shift(
                           self(),
@@ -165,56 +304,39 @@ def estimate_shift2D(self, reference='current',
                           plot=plot,
                           dtype=dtype)
             np.fill_diagonal(pcarray['max_value'], max_value)
-            pbar = progressbar(maxval=nrows*images_number).start()
+            self._fill_correlation_array(pcarray,
+                                         nrows,
+                                         roi=roi,
+                                         sobel=sobel,
+                                         medfilter=medfilter,
+                                         hanning=hanning,
+                                         normalize_corr=normalize_corr,
+                                         dtype=dtype,
+                                         upsample_factor=upsample_factor,
+                                         parallel=parallel)
         else:
-            pbar = progressbar(maxval=images_number).start()
-            
-            
-        # Main iteration loop. Fills the rows of pcarray when reference 
-        # is stat
-        for i1, im in enumerate(self._iterate_signal()):
-            if reference in ['current', 'cascade']:
-                if ref is None:
-                    ref = im.copy()
-                    shift = np.array([0,0])
-                nshift, max_val = estimate_image_shift(ref,
-                                      im,
-                                      roi=roi,
-                                      sobel=sobel,
-                                      medfilter=medfilter,
-                                      hanning=hanning,
-                                      plot=plot,
-                                      normalize_corr=normalize_corr,
-                                      dtype=dtype)
-                if reference == 'cascade':
-                    shift += nshift
-                    ref = im.copy()
-                else:
-                    shift = nshift
-                shifts.append(shift.copy())
-                pbar.update(i1+1)
-            elif reference == 'stat':
-                if i1 == nrows:
-                    break
-                # Iterate to fill the columns of pcarray
-                for i2, im2 in enumerate(
-                                    self._iterate_signal()):
-                    if i2 > i1:
-                        nshift, max_value = estimate_image_shift(
-                                      im,
-                                      im2,
-                                      roi=roi,
-                                      sobel=sobel,
-                                      medfilter=medfilter,
-                                      hanning=hanning,
-                                      normalize_corr=normalize_corr,
-                                      plot=plot,
-                                      dtype=dtype)
-                        
-                        pcarray[i1,i2] = max_value, nshift
-                    del im2
-                    pbar.update(i2 + images_number*i1 + 1)
-                del im
+            if plot is True:
+                first = self._iterate_signal().next()
+                estimate_image_shift(first if ref is None else ref,
+                                     first,
+                                     roi=roi,
+                                     sobel=sobel,
+                                     medfilter=medfilter,
+                                     hanning=hanning,
+                                     plot=plot,
+                                     normalize_corr=normalize_corr,
+                                     dtype=dtype)
+            shifts = self._estimate_shifts_in_blocks(
+                ref,
+                roi=roi,
+                sobel=sobel,
+                medfilter=medfilter,
+                hanning=hanning,
+                normalize_corr=normalize_corr,
+                dtype=dtype,
+                upsample_factor=upsample_factor)
+            if reference == 'cascade':
+                shifts = np.cumsum(shifts, 0)
         if reference == 'stat':
             # Select the reference image as the one that has the
             # higher max_value in the row
@@ -237,9 +359,93 @@ def estimate_shift2D(self, reference='current',
                 
             shifts = shifts.mean(0)
         else:
-            shifts = np.array(shifts)
             del ref
         return shifts
+
+    def _estimate_shifts_in_blocks(self, ref, **kwargs):
+        """Estimate the shift of every image processing blocks of images 
+        at once with `estimate_image_shifts`.
+
+        Parameters
+        ----------
+        ref : {None, numpy array}
+            The reference image. If None, every image is compared with 
+            the previous one (the first with itself).
+
+        All extra keyword arguments are passed to `estimate_image_shifts`.
+
+        """
+        images_number = self.axes_manager._max_index + 1
+        fsize = fft_correlation_size(self.axes_manager._signal_shape_in_array)
+        # Number of images whose correlations are computed at once
+        block_size = max(chunked_array.BLOCK_BYTES // 
+                         (16 * int(np.prod(fsize))), 1)
+        images = self._iterate_signal()
+        previous = None
+        shifts = []
+        pbar = progressbar(maxval=images_number).start()
+        for start in xrange(0, images_number, block_size):
+            block = np.array(list(itertools.islice(images, block_size)))
+            if ref is None:
+                refs = np.concatenate(
+                    ([block[0] if previous is None else previous], 
+                     block[:-1]))
+                previous = block[-1].copy()
+            else:
+                refs = ref
+            shifts.append(estimate_image_shifts(refs, block, **kwargs)[0])
+            pbar.update(start + len(block))
+        pbar.finish()
+        return np.concatenate(shifts)
+
+    def _fill_correlation_array(self, pcarray, nrows, normalize_corr=False,
+                                upsample_factor=1, parallel=False, 
+                                **kwargs):
+        """Fill the upper triangle of the first `nrows` rows of pcarray 
+        with the maximum value of the correlation and the shift of every
+        pair of images.
+
+        Every image is preprocessed and Fourier transformed only once.
+        The correlations are computed from the stored transforms in 
+        blocks of images.
+
+        All extra keyword arguments are passed to `preprocess_image`.
+
+        """
+        images_number = pcarray.shape[1]
+        fsize = fft_correlation_size(
+            preprocess_image(self(), **kwargs).shape)
+        spectra = self.map(image_spectrum, fsize=fsize, parallel=parallel,
+                           **kwargs).data
+        spectra = spectra.reshape((images_number,) + fsize)
+        # Number of images whose correlations are computed at once
+        block_size = max(chunked_array.BLOCK_BYTES // 
+                         max(spectra[0].nbytes, 1), 1)
+
+        def correlate_row(i1):
+            spectrum = np.asarray(spectra[i1])
+            max_values = np.zeros(images_number)
+            shifts = np.zeros((images_number, 2))
+            for start in xrange(i1 + 1, images_number, block_size):
+                stop = min(start + block_size, images_number)
+                shifts[start:stop], max_values[start:stop] = \
+                    shifts_from_spectra(spectrum,
+                                        np.asarray(spectra[start:stop]),
+                                        normalize_corr=normalize_corr,
+                                        upsample_factor=upsample_factor)
+            return i1, max_values, shifts
+
+        parallel = _check_parallel(parallel)
+        if parallel is not False:
+            rows = _imap_unordered(correlate_row, range(nrows), parallel)
+        else:
+            rows = (correlate_row(i1) for i1 in xrange(nrows))
+        pbar = progressbar(maxval=nrows)
+        for i, (i1, max_values, shifts) in enumerate(rows):
+            pcarray['max_value'][i1, i1 + 1:] = max_values[i1 + 1:]
+            pcarray['shift'][i1, i1 + 1:] = shifts[i1 + 1:]
+            pbar.update(i + 1)
+        pbar.finish()
         
     def align2D(self, crop=True, fill_value=np.nan, shifts=None,
                 roi=None,
@@ -251,7 +457,9 @@ def align2D(self, crop=True, fill_value=np.nan, shifts=None,
                 reference='current',
                 dtype='float',
                 correlation_threshold=None, 
-                chunk_size=30):
+                chunk_size=30,
+                upsample_factor=1,
+                parallel=False):
         """Align the images in place using user provided shifts or by 
         estimating the shifts. 
         
@@ -270,6 +478,9 @@ def align2D(self, crop=True, fill_value=np.nan, shifts=None,
         shifts : None or list of tuples
             If None the shifts are estimated using 
             `estimate_shift2D`.
+        parallel : {False, True, 'processes', 'threads'}
+            Estimate (if `reference` is 'stat') and apply the shifts in 
+            parallel. See `map`.
             
         Returns
         -------
@@ -304,17 +515,27 @@ def align2D(self, crop=True, fill_value=np.nan, shifts=None,
                 dtype=dtype,
                 correlation_threshold=correlation_threshold,
                 normalize_corr=normalize_corr,
-                chunk_size=chunk_size)
+                chunk_size=chunk_size,
+                upsample_factor=upsample_factor,
+                parallel=parallel)
             return_shifts = True
         else:
             return_shifts = False
-        # Translate with sub-pixel precision if necesary 
-        for im, shift in zip(self._iterate_signal(),
-                              shifts):
+        shifts = np.asarray(shifts)
+        if self.axes_manager.navigation_size > 0:
+            shift = Signal(shifts.reshape(
+                tuple(self.axes_manager._navigation_shape_in_array) + 
+                (2,)))
+        else:
+            shift = shifts[0]
+
+        def translate(im, shift):
+            # Translate with sub-pixel precision if necesary 
             if np.any(shift):
                 shift_image(im, -shift,
                     fill_value=fill_value)
-                del im
+            return im
+        self.map(translate, shift=shift, inplace=True, parallel=parallel)
                     
         # Crop the image to the valid size
         if crop is True:
@@ -360,7 +581,8 @@ def shift1D(self,
                  shift_array,
                  interpolation_method='linear',
                  crop=True,
-                 fill_value=np.nan):
+                 fill_value=np.nan,
+                 parallel=False):
         """Shift the data in place over the signal axis by the amount specified
         by an array.
 
@@ -380,10 +602,21 @@ def shift1D(self,
         fill_value : float
             If crop is False fill the data outside of the original 
             interval with the given value where needed.
+        parallel : {False, True, 'processes', 'threads'}
+            Apply the shifts in parallel. See `map`.
             
         Raises
         ------
         SignalDimensionError if the signal dimension is not 1.
+
+        Notes
+        -----
+        The linear interpolation is vectorized (unless the data is a 
+        ChunkedArray): blocks of spectra are shifted at once with 
+        `spectrum_tools.shift_spectra`. The other 
+        interpolation methods interpolate every spectrum independently.
+        When the linear interpolation runs in parallel, the shifted 
+        blocks are gathered by `map` before writing them in the data.
             
         """
         
@@ -391,21 +624,44 @@ def shift1D(self,
         axis = self.axes_manager.signal_axes[0]
         offset = axis.offset
         original_axis = axis.axis.copy()
-        pbar = progressbar(
-            maxval=self.axes_manager.navigation_size)
-        for i, (dat, shift) in enumerate(zip(
-                self._iterate_signal(),
-                shift_array.ravel(()))):
-            si = sp.interpolate.interp1d(original_axis,
-                                         dat,
-                                         bounds_error=False,
-                                         fill_value=fill_value,
-                                         kind=interpolation_method)
-            axis.offset = float(offset - shift)
-            dat[:] = si(axis.axis)
-            pbar.update(i + 1)
-            
-        axis.offset = offset
+        # The vectorized path writes into the views of the data given by
+        # _iterate_signal, which are copies when the data is chunked
+        if (interpolation_method == 'linear' and 
+                not isinstance(self.data, ChunkedArray)):
+            shifts = np.asarray(shift_array, dtype='float').ravel()
+            if parallel is False:
+                for start, spectra in self._iterate_spectra_blocks():
+                    shifted = spectrum_tools.shift_spectra(
+                        np.array(spectra),
+                        shifts[start:start + len(spectra)] / axis.scale,
+                        fill_value=fill_value)
+                    for dat, new_dat in zip(spectra, shifted):
+                        dat[:] = new_dat
+            else:
+                def shift_block(start, spectra):
+                    return spectrum_tools.shift_spectra(
+                        spectra,
+                        shifts[start:start + len(spectra)] / axis.scale,
+                        fill_value=fill_value)
+                shifted = self._map_spectra_blocks(shift_block, 
+                                                   parallel=parallel)
+                for dat, new_dat in zip(self._iterate_signal(), shifted):
+                    dat[:] = new_dat
+        else:
+            shift = self._get_navigation_signal()
+            shift.data = np.asarray(shift_array, dtype='float').reshape(
+                shift.data.shape)
+            if self.axes_manager.navigation_size > 0:
+                shift.axes_manager.set_signal_dimension(0)
+
+            def shift1D(dat, shift):
+                si = sp.interpolate.interp1d(original_axis,
+                                             dat,
+                                             bounds_error=False,
+                                             fill_value=fill_value,
+                                             kind=interpolation_method)
+                return si(original_axis - shift)
+            self.map(shift1D, shift=shift, inplace=True, parallel=parallel)
 
         if crop is True:
             minimum, maximum = shift_array.min(), shift_array.max()
@@ -423,7 +679,79 @@ def shift1D(self,
                 self.crop(axis.index_in_axes_manager,
                           imaximum)
             
-    def interpolate_in_between(self, start, end, delta=3, **kwargs):
+    def _iterate_spectra_blocks(self):
+        """Iterate over the spectra in blocks of about 
+        `chunked_array.BLOCK_BYTES` bytes.
+
+        Yields
+        ------
+        start : int
+            The index of the first spectrum of the block in the 
+            `_iterate_signal` order.
+        spectra : list
+            The spectra of the block as given by `_iterate_signal`.
+
+        """
+        block_size = max(chunked_array.BLOCK_BYTES // 
+                         (8 * self.axes_manager.signal_axes[0].size), 1)
+        spectra = self._iterate_signal()
+        start = 0
+        while True:
+            block = list(itertools.islice(spectra, block_size))
+            if not block:
+                return
+            yield start, block
+            start += len(block)
+
+    def _map_spectra_blocks(self, function, parallel=False):
+        """Apply a function to blocks of spectra of about 
+        `chunked_array.BLOCK_BYTES` bytes using `map`, one call per 
+        block.
+
+        Parameters
+        ----------
+        function : function
+            It is called as ``function(start, spectra)`` where start is
+            the index of the first spectrum of the block in the 
+            `_iterate_signal` order and spectra a 2D array with a 
+            spectrum per row. It must return an array with the result 
+            of every spectrum in its first axis.
+        parallel : {False, True, 'processes', 'threads'}
+            See `map`.
+
+        Returns
+        -------
+        An array with the results of all the spectra in the 
+        `_iterate_signal` order.
+
+        """
+        am = self.axes_manager
+        if am.navigation_size > 0:
+            navigation_shape = tuple(am._navigation_shape_in_array)
+        else:
+            navigation_shape = (1,)
+        size = int(np.prod(navigation_shape))
+        indices_in_array = [axis.index_in_array for axis in 
+                            am.navigation_axes[::-1]]
+        block_size = max(chunked_array.BLOCK_BYTES // 
+                         (8 * am.signal_axes[0].size), 1)
+        starts = Signal(np.arange(0, size, block_size))
+        starts.axes_manager.set_signal_dimension(0)
+
+        def map_block(start):
+            start = int(start)
+            spectra = np.array([
+                _get_position_data(self.data, indices_in_array,
+                                   np.unravel_index(index, 
+                                                    navigation_shape))
+                for index in xrange(start, min(start + block_size, 
+                                               size))])
+            return function(start, spectra)
+        return np.concatenate(starts.map(map_block, ragged=True, 
+                                         parallel=parallel))
+
+    def interpolate_in_between(self, start, end, delta=3, parallel=False,
+                               **kwargs):
         """Replace the data in a given range by interpolation.
         
         The operation is performed in place.
@@ -433,6 +761,11 @@ def interpolate_in_between(self, start, end, delta=3, **kwargs):
         start, end : {int | float}
             The limits of the interval. If int they are taken as the 
             axis index. If float they are taken as the axis value.
+        delta : int
+            The number of channels at each side of the interval used 
+            to interpolate.
+        parallel : {False, True, 'processes', 'threads'}
+            Apply the interpolation in parallel. See `map`.
         
         All extra keyword arguments are passed to 
         scipy.interpolate.interp1d. See the function documentation 
@@ -449,15 +782,16 @@ def interpolate_in_between(self, start, end, delta=3, **kwargs):
         i2 = axis._get_index(end)
         i0 = int(np.clip(i1 - delta, 0, np.inf))
         i3 = int(np.clip(i2 + delta, 0, axis.size))
-        pbar = progressbar(
-            maxval=self.axes_manager.navigation_size)
-        for i, dat in enumerate(self._iterate_signal()):
+
+        def interpolate(dat):
             dat_int = sp.interpolate.interp1d(
                 range(i0,i1) + range(i2,i3),
                 dat[i0:i1].tolist() + dat[i2:i3].tolist(),
                 **kwargs)
+            dat = dat.copy()
             dat[i1:i2] = dat_int(range(i1,i2))
-            pbar.update(i + 1)
+            return dat
+        self.map(interpolate, inplace=True, parallel=parallel)
             
     def estimate_shift1D(self,
                           start=None,
@@ -465,7 +799,8 @@ def estimate_shift1D(self,
                           reference_indices=None,
                           max_shift=None,
                           interpolate=True,
-                          number_of_interpolation_points=5):
+                          number_of_interpolation_points=5,
+                          parallel=False):
         """Estimate the shifts in the current signal axis using
          cross-correlation.
 
@@ -494,6 +829,9 @@ def estimate_shift1D(self,
         number_of_interpolation_points : int
             Number of interpolation points. Warning: making this number 
             too big can saturate the memory
+        parallel : {False, True, 'processes', 'threads'}
+            Estimate the shifts of the blocks of spectra in parallel. 
+            See `map`.
 
         Return
         ------
@@ -511,27 +849,29 @@ def estimate_shift1D(self,
             reference_indices = self.axes_manager.indices
 
         i1, i2 = axis._get_index(start), axis._get_index(end) 
-        shift_array = np.zeros(self.axes_manager._navigation_shape_in_array)
         ref = self.inav[reference_indices].data[i1:i2]
         if interpolate is True:
             ref = spectrum_tools.interpolate1D(ip, ref)
-        pbar = progressbar(
-            maxval=self.axes_manager.navigation_size)
-        for i, (dat, indices) in enumerate(zip(
-                    self._iterate_signal(),
-                    self.axes_manager._array_indices_generator())):
-            dat = dat[i1:i2]
+
+        # The cross-correlations of every block of spectra are computed
+        # at once with the FFT
+        def estimate_shifts(start, spectra):
+            dat = spectra[:, i1:i2]
             if interpolate is True:
                 dat = spectrum_tools.interpolate1D(ip, dat)
-            shift_array[indices] = np.argmax(
-                np.correlate(ref, dat,'full')) - len(ref) + 1
-            pbar.update(i + 1)
-        pbar.finish()
+            return np.argmax(
+                spectrum_tools.correlate_spectra(ref, dat), axis=1) - \
+                len(ref) + 1
+        shift_array = self._map_spectra_blocks(
+            estimate_shifts, parallel=parallel).astype('float')
+        if self.axes_manager.navigation_size > 0:
+            shift_array = shift_array.reshape(
+                self.axes_manager._navigation_shape_in_array)
 
         if max_shift is not None:
             if interpolate is True:
                 max_shift *= ip
-            shift_array.clip(a_min=-max_shift, a_max=max_shift)
+            shift_array = shift_array.clip(-max_shift, max_shift)
         if interpolate is True:
             shift_array /= ip
         shift_array *= axis.scale
@@ -547,7 +887,8 @@ def align1D(self,
                  interpolation_method='linear',
                  crop=True,
                  fill_value=np.nan,
-                 also_align=None):
+                 also_align=None,
+                 parallel=False):
         """Estimate the shifts in the signal axis using 
         cross-correlation and use the estimation to align the data in place.
 
@@ -592,6 +933,8 @@ def align1D(self,
             dimensions
             as this one and that will be aligned using the shift map
             estimated using the this signal.
+        parallel : {False, True, 'processes', 'threads'}
+            Apply the estimation and the shifts in parallel. See `map`.
 
         Return
         ------
@@ -614,7 +957,8 @@ def align1D(self,
             max_shift=max_shift,
             interpolate=interpolate,
             number_of_interpolation_points=
-                number_of_interpolation_points)
+                number_of_interpolation_points,
+            parallel=parallel)
         if also_align is None:
             also_align = list()
         also_align.append(self)
@@ -622,7 +966,8 @@ def align1D(self,
             signal.shift1D(shift_array=shift_array,
                            interpolation_method=interpolation_method,
                            crop=crop,
-                           fill_value=fill_value)
+                           fill_value=fill_value,
+                           parallel=parallel)
                             
     @only_interactive
     def calibrate(self):
@@ -897,7 +1242,7 @@ def hanning_taper(self, side='both', channels=None, offset=0):
         
     def find_peaks1D_ohaver(self, xdim=None,slope_thresh=0, amp_thresh=None, 
                     subchannel=True, medfilt_radius=5, maxpeakn=30000, 
-                    peakgroup=10):
+                    peakgroup=10, parallel=False):
         """Find peaks along a 1D line (peaks in spectrum/spectra).
 
         Function to locate the positive peaks in a noisy x-y data set.
@@ -948,6 +1293,9 @@ def find_peaks1D_ohaver(self, xdim=None,slope_thresh=0, amp_thresh=None,
         subpix : bool (optional)
                  default is set to True
 
+        parallel : {False, True, 'processes', 'threads'}
+                   Find the peaks in parallel. See `map`.
+
         Returns
         -------
         peaks : structured array of shape _navigation_shape_in_array in which
@@ -963,22 +1311,16 @@ def find_peaks1D_ohaver(self, xdim=None,slope_thresh=0, amp_thresh=None,
         # TODO: add scipy.signal.find_peaks_cwt
         self._check_signal_dimension_equals_one()
         axis = self.axes_manager.signal_axes[0].axis
-        arr_shape = (self.axes_manager._navigation_shape_in_array
-                 if self.axes_manager.navigation_size > 0
-                 else [1,])
-        peaks = np.zeros(arr_shape, dtype=object)
-        for y, indices in zip(self._iterate_signal(),
-                              self.axes_manager._array_indices_generator()):
-            peaks[indices] = find_peaks_ohaver(
-                                                y,
-                                                axis,
-                                                slope_thresh=slope_thresh,
-                                                amp_thresh=amp_thresh,
-                                                medfilt_radius=medfilt_radius,
-                                                maxpeakn=maxpeakn,
-                                                peakgroup=peakgroup,
-                                                subchannel=subchannel)
-        return peaks
+        return self.map(find_peaks_ohaver,
+                        x=axis,
+                        slope_thresh=slope_thresh,
+                        amp_thresh=amp_thresh,
+                        medfilt_radius=medfilt_radius,
+                        maxpeakn=maxpeakn,
+                        peakgroup=peakgroup,
+                        subchannel=subchannel,
+                        ragged=True,
+                        parallel=parallel)
     
     def estimate_peak_width(self,
             factor=0.5,
@@ -2093,8 +2435,13 @@ def __init__(self, data, **kwds):
 
         Parameters:
         -----------
-        data : numpy array
+        data : numpy array or ChunkedArray
            The signal data. It can be an array of any dimensions.
+           For data that does not fit in memory use a ChunkedArray
+           (see `hyperspy.misc.chunked_array`), e.g. 
+           ``Signal(ChunkedArray(np.memmap(...)))``. The slicing,
+           reductions, `rebin`, `integrate_simpson` and arithmetic 
+           operators are then performed block by block.
         axes : dictionary (optional) 
             Dictionary to define the axes (see the 
             documentation of the AxesManager class for more details).
@@ -2866,8 +3213,11 @@ def rebin(self, new_shape):
                 new_shape[axis.index_in_axes_manager])
         factors = (np.array(self.data.shape) / 
                            np.array(new_shape_in_array))
-        s = self._deepcopy_with_new_data(
-            array_tools.rebin(self.data, new_shape_in_array))
+        if isinstance(self.data, ChunkedArray):
+            data = self.data.rebin(new_shape_in_array)
+        else:
+            data = array_tools.rebin(self.data, new_shape_in_array)
+        s = self._deepcopy_with_new_data(data)
         for axis in s.axes_manager._axes:
             axis.scale *= factors[axis.index_in_array]
         s.get_dimensions_from_data()
@@ -3077,6 +3427,9 @@ def fold(self):
             folding.unfolded = False
             
     def _make_sure_data_is_contiguous(self):
+        if isinstance(self.data, ChunkedArray):
+            # It is read block by block
+            return
         if self.data.flags['C_CONTIGUOUS'] is False:
             self.data = np.ascontiguousarray(self.data)
             
@@ -3107,6 +3460,190 @@ def _iterate_signal(self):
             getitem[unfolded_axis] = i
             yield(data[getitem])
 
+    def map(self, function, parallel=False, workers=None, inplace=False,
+            ragged=False, **kwargs):
+        """Apply a function to the signal at every navigation position.
+
+        The function is called as ``function(data, **kwargs)``, where
+        data is the numpy array of the signal at the given position. The
+        keyword arguments that are Signal instances with the same 
+        navigation shape as this one are iterated with it, i.e. the 
+        function receives their data at the same position. Signal 
+        keyword arguments without navigation axes (or all of them if 
+        this signal has no navigation axes) are replaced by their data. 
+        The other keyword arguments are passed unchanged.
+
+        Parameters
+        ----------
+        function : function
+            It can return a scalar or an array. All the results must have
+            the same shape unless `ragged` is True.
+        parallel : {False, True, 'processes', 'threads'}
+            If True or 'processes' the function is applied in a pool of 
+            worker processes. The signal and the function are not pickled 
+            but inherited by forking, what is not supported in all the 
+            platforms. If 'threads' a pool of threads is used instead, 
+            what is only faster if the function releases the GIL, e.g. 
+            most numpy and scipy functions operating on large arrays.
+        workers : {None, int}
+            The number of worker processes or threads when `parallel` is 
+            not False. If None, the number of CPUs is used.
+        inplace : bool
+            If True the results, that must have the shape of the signal, 
+            replace the data.
+        ragged : bool
+            If True the results can have different shapes and they are
+            returned in a numpy array of objects.
+
+        Returns
+        -------
+        If `inplace` is True, None. If `ragged` is True, a numpy array of 
+        objects with `axes_manager._navigation_shape_in_array` shape. 
+        Otherwise a Signal with the navigation axes of this signal whose 
+        signal axes are those of this signal if the results have the 
+        same shape as the signal and new axes otherwise. The results are 
+        written in a preallocated array that is stored in a temporary 
+        memory-mapped file if it is larger than 
+        `chunked_array.BLOCK_BYTES`.
+
+        Examples
+        --------
+        >>> s = signals.Spectrum(np.random.random((10, 20, 100)))
+        >>> s_max = s.map(np.max)
+        >>> s.map(scipy.ndimage.gaussian_filter1d, sigma=2, inplace=True)
+        >>> # The sigma can be different at every position
+        >>> sigma = s_max / s_max.data.max()
+        >>> sigma.axes_manager.set_signal_dimension(0)
+        >>> s.map(scipy.ndimage.gaussian_filter1d, sigma=sigma, 
+        ...       parallel=True)
+
+        """
+        parallel = _check_parallel(parallel)
+        am = self.axes_manager
+        navigation_axes = am.navigation_axes[::-1]
+        if am.navigation_size > 0:
+            navigation_shape = tuple(am._navigation_shape_in_array)
+        else:
+            navigation_shape = (1,)
+        size = int(np.prod(navigation_shape))
+        iterated = {}
+        for key, value in kwargs.items():
+            if not isinstance(value, Signal):
+                continue
+            if (am.navigation_size > 0 and 
+                    value.axes_manager.navigation_size > 0):
+                if (value.axes_manager._navigation_shape_in_array !=
+                        am._navigation_shape_in_array):
+                    raise ValueError(
+                        "The navigation shape of %s, %s, is different "
+                        "from the signal navigation shape, %s" % (
+                            key,
+                            value.axes_manager.navigation_shape,
+                            am.navigation_shape))
+                iterated[key] = (
+                    value.data,
+                    [axis.index_in_array for axis in 
+                     value.axes_manager.navigation_axes[::-1]])
+                del kwargs[key]
+            else:
+                kwargs[key] = value.data
+        arguments = (self.data,
+                     [axis.index_in_array for axis in navigation_axes],
+                     navigation_shape,
+                     function,
+                     iterated,
+                     kwargs)
+        signal_shape = tuple(am._signal_shape_in_array)
+
+        # The first result defines the output
+        first = _map_block([0], arguments)[1][0]
+        if ragged is True:
+            out = np.empty(navigation_shape, dtype=object)
+        else:
+            first = np.asarray(first)
+            if inplace is True:
+                if first.shape != signal_shape:
+                    raise ValueError(
+                        "The result shape, %s, must be the signal shape, "
+                        "%s, when inplace is True" % (first.shape, 
+                                                       signal_shape))
+                out = None
+            else:
+                out = chunked_array.create_output(
+                    navigation_shape + first.shape, first.dtype)
+                out = out.reshape((size,) + first.shape)
+
+        def store(block, results):
+            for index, result in zip(block, results):
+                if ragged is True:
+                    out.flat[index] = result
+                    continue
+                result = np.asarray(result)
+                if result.shape != first.shape:
+                    raise ValueError(
+                        "The function returned results of different "
+                        "shapes. Use ragged=True to store them.")
+                if out is None:
+                    position = np.unravel_index(index, navigation_shape)
+                    self.data[_get_position_index(
+                        len(self.data.shape), arguments[1], 
+                        position)] = result
+                else:
+                    out[index] = result
+
+        pbar = progressbar(maxval=size)
+        store([0], [first])
+        pbar.update(1)
+        indices = np.arange(1, size)
+        if parallel is not False and len(indices) > 1:
+            if workers is None:
+                workers = multiprocessing.cpu_count()
+            # Several blocks per worker to balance the load
+            blocks = np.array_split(indices, min(len(indices), 
+                                                 4 * workers))
+            i = 1
+            for block, results in _imap_unordered(
+                    lambda block: _map_block(block, arguments),
+                    blocks, parallel, workers):
+                store(block, results)
+                i += len(block)
+                pbar.update(i)
+        else:
+            for index in indices:
+                store(*_map_block([index], arguments))
+                pbar.update(index + 1)
+        pbar.finish()
+
+        if inplace is True:
+            return
+        if ragged is True:
+            return out
+        out = out.reshape(navigation_shape + first.shape)
+        if am.navigation_size == 0:
+            out = out[0]
+        out = chunked_array.wrap(out)
+        indices_in_array = arguments[1] + [axis.index_in_array for axis
+                                           in am.signal_axes[::-1]]
+        if (first.shape == signal_shape and 
+                indices_in_array == range(len(indices_in_array))):
+            s = self._deepcopy_with_new_data(out)
+        elif first.shape == ():
+            s = self._get_navigation_signal()
+            s.data = out.reshape(s.data.shape)
+            s.mapped_parameters.title = self.mapped_parameters.title
+        else:
+            axes = am._get_navigation_axes_dicts()
+            if first.shape == signal_shape:
+                axes += am._get_signal_axes_dicts()
+            else:
+                axes += [{'size': size_, 'navigate': False}
+                         for size_ in first.shape]
+            for i, axis in enumerate(axes):
+                axis['index_in_array'] = i
+            s = Signal(out, axes=axes)
+            s.mapped_parameters.title = self.mapped_parameters.title
+        return s
+
     def _remove_axis(self, axis):
         axis = self.axes_manager[axis]
         self.axes_manager.remove(axis.index_in_axes_manager)
@@ -3370,10 +3907,15 @@ def integrate_simpson(self, axis):
         
         """
         axis = self.axes_manager[axis]
-        s = self._deepcopy_with_new_data(
-            sp.integrate.simps(y=self.data,
-                               x=axis.axis,
-                               axis=axis.index_in_array))
+        if isinstance(self.data, ChunkedArray):
+            data = self.data.reduce(sp.integrate.simps,
+                                    x=axis.axis,
+                                    axis=axis.index_in_array)
+        else:
+            data = sp.integrate.simps(y=self.data,
+                                      x=axis.axis,
+                                      axis=axis.index_in_array)
+        s = self._deepcopy_with_new_data(data)
         s._remove_axis(axis.index_in_axes_manager)
         return s
         
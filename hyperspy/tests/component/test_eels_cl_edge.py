@@ -0,0 +1,193 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import scipy.integrate
+from nose.tools import assert_true, assert_equal
+
+from hyperspy.defaults_parser import preferences
+from hyperspy.components import EELSCLEdge
+from hyperspy.misc.eels import base_gos
+from hyperspy.misc.eels.base_gos import XSectionCache, xsection_cache
+from hyperspy.misc.eels import hartree_slater_gos
+from hyperspy.misc.eels.hartree_slater_gos import (HartreeSlaterGOS,
+                                                   read_gos_file)
+from hyperspy.misc.physical_constants import a0
+
+
+def write_gos_file(filename, ncol=64, nrow=50):
+    """Write a synthetic GOS table in the format distributed by Gatan."""
+    q = np.arange(ncol)[np.newaxis, :]
+    energy = np.arange(nrow)[:, np.newaxis]
+    gos = np.exp(-0.1 * q) * (1 + 0.05 * q) / (1 + 0.1 * energy)
+    with open(filename, 'w') as f:
+        f.write('Ti L3\n0.01 0.08 0 %i\n50 3 %i\n' % (ncol, nrow))
+        f.write('\n'.join('%.8e' % value for value in gos.ravel()))
+
+
+class TestHartreeSlaterGOS:
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'Ti.L3')
+        write_gos_file(self.filename)
+        self.gos_path = preferences.EELS.eels_gos_files_path
+        preferences.EELS.eels_gos_files_path = self.directory
+        self.gos_binary_path = hartree_slater_gos.gos_binary_path
+        hartree_slater_gos.gos_binary_path = os.path.join(self.directory,
+                                                          'binary')
+        hartree_slater_gos._gos_tables.clear()
+        xsection_cache.clear()
+        self.gos = HartreeSlaterGOS('Ti_L3')
+
+    def tearDown(self):
+        preferences.EELS.eels_gos_files_path = self.gos_path
+        hartree_slater_gos.gos_binary_path = self.gos_binary_path
+        hartree_slater_gos._gos_tables.clear()
+        shutil.rmtree(self.directory)
+        xsection_cache.clear()
+
+    def test_binary_table(self):
+        gos = self.gos
+        binary_filename = hartree_slater_gos._get_binary_filename(
+            self.filename)
+        assert_true(os.path.isfile(binary_filename))
+        assert_true(isinstance(gos.gos_array, np.memmap))
+        assert_equal(gos.gos_array.shape, (50, 64))
+        assert_true((gos.gos_array.ravel() ==
+                     read_gos_file(self.filename)[7:]).all())
+        # The table is shared
+        assert_true(HartreeSlaterGOS('Ti_L3').gos_array.base is
+                    gos.gos_array.base)
+        # and read from the binary file in new sessions
+        hartree_slater_gos._gos_tables.clear()
+        os.remove(self.filename)
+        write_gos_file(self.filename)
+        mtime = os.path.getmtime(binary_filename)
+        os.utime(self.filename, (mtime - 10, mtime - 10))
+        other = HartreeSlaterGOS('Ti_L3')
+        assert_true(isinstance(other.gos_array, np.memmap))
+        assert_equal(os.path.getmtime(binary_filename), mtime)
+        assert_true((other.gos_array == gos.gos_array).all())
+
+    def test_modified_gos_file(self):
+        write_gos_file(self.filename, ncol=32)
+        mtime = time.time() + 10
+        os.utime(self.filename, (mtime, mtime))
+        assert_equal(HartreeSlaterGOS('Ti_L3').gos_array.shape, (50, 32))
+
+    def test_binary_path_not_writable(self):
+        hartree_slater_gos._gos_tables.clear()
+        # A file where the directory should be
+        hartree_slater_gos.gos_binary_path = self.filename
+        gos = HartreeSlaterGOS('Ti_L3')
+        assert_true(not isinstance(gos.gos_array, np.memmap))
+        assert_true((gos.gos_array == self.gos.gos_array).all())
+
+    def test_integrate_gos(self):
+        gos = self.gos
+        n = gos.gos_array.shape[0]
+        qmin = np.linspace(1e9, 5e9, n)
+        # Some of the upper limits are beyond the tabulated q axis
+        qmax = np.logspace(10, 12.5, n)
+        qint = gos.integrate_gos(qmin, qmax)
+        for i in xrange(n):
+            qaxis, qgos = gos.get_qaxis_and_gos(i, qmin[i], qmax[i])
+            assert_true(np.allclose(
+                qint[i],
+                scipy.integrate.simps(qgos, np.log((a0 * qaxis) ** 2))))
+
+    def test_cache(self):
+        gos = self.gos
+        xsection = gos.integrateq(460., 0.02, 200.)
+        qint = gos.qint
+        assert_equal(len(xsection_cache), 1)
+        # Other instances share the cache
+        other = HartreeSlaterGOS('Ti_L3')
+        other_xsection = other.integrateq(460., 0.02, 200.)
+        assert_true(other.qint is qint)
+        assert_equal(xsection_cache.hits, 1)
+        E = np.linspace(460, 1000, 20)
+        assert_true(np.allclose(xsection(E), other_xsection(E)))
+        other.integrateq(461., 0.02, 200.)
+        assert_true(other.qint is not qint)
+        assert_equal(len(xsection_cache), 2)
+
+    def test_cache_gos_source(self):
+        qint = self.gos.integrateq(460., 0.02, 200.)(480.)
+        # A regenerated table
+        write_gos_file(self.filename, ncol=32)
+        mtime = time.time() + 10
+        os.utime(self.filename, (mtime, mtime))
+        other = HartreeSlaterGOS('Ti_L3')
+        assert_true(other.integrateq(460., 0.02, 200.)(480.) != qint)
+        assert_equal(len(xsection_cache), 2)
+        # The tables of another directory
+        directory = os.path.join(self.directory, 'other')
+        os.mkdir(directory)
+        write_gos_file(os.path.join(directory, 'Ti.L3'), nrow=40)
+        preferences.EELS.eels_gos_files_path = directory
+        other = HartreeSlaterGOS('Ti_L3')
+        other.integrateq(460., 0.02, 200.)
+        assert_equal(len(xsection_cache), 3)
+        assert_equal(other.qint.shape, (40,))
+
+    def test_energy_shift_tolerance(self):
+        gos = self.gos
+        gos.integrateq(460., 0.02, 200.)
+        qint = gos.qint
+        xsection = gos.integrateq(460.001, 0.02, 200.)
+        assert_true(gos.qint is qint)
+        assert_equal(gos.energy_shift, 460.001 - gos.onset_energy)
+        # The energy axis is shifted exactly
+        E = gos.energy_axis + gos.energy_shift
+        assert_true(np.allclose(xsection(E), qint))
+        tolerance = base_gos.ENERGY_SHIFT_TOLERANCE
+        base_gos.ENERGY_SHIFT_TOLERANCE = 0
+        try:
+            gos.integrateq(460.001, 0.02, 200.)
+        finally:
+            base_gos.ENERGY_SHIFT_TOLERANCE = tolerance
+        assert_true(gos.qint is not qint)
+
+    def test_edge_free_onset_energy(self):
+        edge = EELSCLEdge('Ti_L3', GOS='Hartree-Slater')
+        edge.set_microscope_parameters(200., 10., 20., 1.)
+        E = np.arange(400., 1500.)
+        reference = edge.function(E)
+        misses = xsection_cache.misses
+        edge.onset_energy.value = 458.
+        assert_equal(xsection_cache.misses, misses + 1)
+        edge.onset_energy.value = 456.
+        assert_equal(xsection_cache.misses, misses + 1)
+        assert_true(np.allclose(edge.function(E), reference))
+
+
+def test_xsection_cache_eviction():
+    cache = XSectionCache(size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert_equal(cache.get('a'), 1)
+    cache.set('c', 3)
+    assert_true(cache.get('b') is None)
+    assert_equal(cache.get('a'), 1)
+    assert_equal(cache.get('c'), 3)
+    assert_equal(len(cache), 2)
@@ -18,12 +18,15 @@
 
 
 import os
+from cStringIO import StringIO
 
 import numpy as np
 from generate_dm_testing_files import dm3_data_types
 
-from nose.tools import assert_true
+from nose.tools import assert_true, assert_equal
 from hyperspy.io import load
+from hyperspy.io_plugins.digital_micrograph import DigitalMicrographReader
+from hyperspy.misc.chunked_array import ChunkedArray
 
 my_path = os.path.dirname(__file__)
 
@@ -79,3 +82,24 @@ def check_dtype(d1, d2, i):
 def check_content(dat1, dat2, subfolder, key):   
     assert_true((dat1==dat2).all(), msg='content %s type % i: '
         '\n%s not equal to \n%s' % (subfolder, key, str(dat1), str(dat2)))
+
+def test_memmap():
+    filename = os.path.join(my_path, 'dm3_3D_data', 'test-2.dm3')
+    s = load(filename)
+    assert_true(isinstance(s.data, np.memmap))
+    data = np.array(s.data)
+    # The file is mapped copy-on-write
+    s.data += 1
+    assert_true((load(filename).data == data).all())
+    s = load(filename, lazy=True)
+    assert_true(isinstance(s.data, ChunkedArray))
+    assert_true((np.asarray(s.data) == data).all())
+
+def test_parse_from_buffer():
+    filename = os.path.join(my_path, 'dm3_3D_data', 'test-2.dm3')
+    with open(filename, 'rb') as f:
+        dm = DigitalMicrographReader(f)
+        dm.parse_file()
+        dm_buffer = DigitalMicrographReader(StringIO(f.read()))
+        dm_buffer.parse_file()
+    assert_equal(dm.tags_dict, dm_buffer.tags_dict)
@@ -0,0 +1,141 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import tempfile
+
+import numpy as np
+from nose.tools import assert_true, assert_equal
+
+from hyperspy.io import load, is_memory_mapped
+from hyperspy.io_plugins import fei
+from hyperspy.misc.chunked_array import ChunkedArray
+
+
+def write_ser(filename, spectra, scan_shape, interleaved=True, valid=None):
+    """Write a spectrum image in a minimal ser file.
+
+    Parameters
+    ----------
+    spectra : int32 numpy array of shape (n, channels)
+    scan_shape : tuple
+        The size of the scan dimensions in the ser order.
+    interleaved : bool
+        If True the tag of each element follows it, otherwise the tags
+        are stored after all the data.
+    valid : {None, int}
+        The number of valid elements.
+
+    """
+    n, channels = spectra.shape
+    total = int(np.prod(scan_shape))
+    valid = n if valid is None else valid
+    header = struct.pack('<HHHLLLLLL', 0x4949, 0x0197, 0x0210, 16672, 16706,
+                         total, valid, 0, len(scan_shape))
+    for size in scan_shape:
+        header += struct.pack('<LddLL', size, 0., 1e-9, 0, 0)
+        header += struct.pack('<L', 6) + 'meters'
+    offsets_offset = len(header)
+    data_start = offsets_offset + 8 * total
+    element_size = 26 + 4 * channels
+    tag_size = 24
+    if interleaved:
+        data_offsets = data_start + np.arange(total) * (element_size +
+                                                        tag_size)
+        tag_offsets = data_offsets + element_size
+    else:
+        data_offsets = data_start + np.arange(total) * element_size
+        tag_offsets = data_start + total * element_size + \
+            np.arange(total) * tag_size
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.write(data_offsets.astype('<u4').tostring())
+        f.write(tag_offsets.astype('<u4').tostring())
+        for i, spectrum in enumerate(spectra):
+            f.seek(data_offsets[i])
+            f.write(struct.pack('<ddLHL', 100., 0.5, 0, 6, channels))
+            f.write(spectrum.astype('<i4').tostring())
+            f.seek(tag_offsets[i])
+            f.write(struct.pack('<HHLdd', 16706, 0, 0, i % scan_shape[0],
+                                i // scan_shape[0]))
+
+
+class TestSer:
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.ser')
+        os.close(fd)
+        self.spectra = np.arange(12 * 7, dtype=np.int32).reshape(12, 7)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def check(self, s, spectra=None):
+        spectra = self.spectra if spectra is None else spectra
+        assert_equal(s.data.shape, (3, 4, 7))
+        assert_true((np.asarray(s.data) == spectra.reshape(3, 4, 7)).all())
+        assert_equal(s.axes_manager.signal_axes[0].scale, 0.5)
+        assert_equal(s.axes_manager.signal_axes[0].offset, 100.)
+
+    def test_interleaved(self):
+        write_ser(self.filename, self.spectra, (4, 3))
+        s = load(self.filename)
+        assert_true(is_memory_mapped(s.data))
+        self.check(s)
+
+    def test_tags_after_data(self):
+        write_ser(self.filename, self.spectra, (4, 3), interleaved=False)
+        s = load(self.filename)
+        assert_true(is_memory_mapped(s.data))
+        self.check(s)
+
+    def test_lazy(self):
+        write_ser(self.filename, self.spectra, (4, 3))
+        s = load(self.filename, lazy=True)
+        assert_true(isinstance(s.data, ChunkedArray))
+        self.check(s)
+
+    def test_incomplete(self):
+        write_ser(self.filename, self.spectra[:5], (4, 3))
+        s = load(self.filename)
+        spectra = np.zeros_like(self.spectra)
+        spectra[:5] = self.spectra[:5]
+        self.check(s, spectra)
+
+    def test_tags(self):
+        write_ser(self.filename, self.spectra, (4, 3), interleaved=False)
+        header, data, tags = fei.load_ser_file(self.filename)
+        assert_true((tags['PositionX'] == np.arange(12) % 4).all())
+        assert_true((data['Array'] == self.spectra).all())
+
+
+def test_map_elements_not_evenly_spaced():
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        values = np.arange(5, dtype='<f8')
+        offsets = np.array([0, 8, 24, 40, 48])
+        with open(filename, 'wb') as f:
+            for offset, value in zip(offsets, values):
+                f.seek(offset)
+                f.write(value.tostring())
+        with open(filename, 'rb') as f:
+            elements = fei.map_elements(f, [('value', '<f8')], offsets)
+        assert_true(not isinstance(elements, np.memmap))
+        assert_true((elements['value'] == values).all())
+    finally:
+        os.remove(filename)
@@ -0,0 +1,149 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+
+import numpy as np
+import h5py
+from nose.tools import assert_true, assert_equal, assert_raises, raises
+
+from hyperspy.io import load
+from hyperspy.signals import Spectrum, Image
+from hyperspy.io_plugins.hdf5 import get_signal_chunks, write_data
+from hyperspy.misc import chunked_array
+from hyperspy.misc.chunked_array import ChunkedArray
+
+
+def test_get_signal_chunks():
+    # Whole spectra and as many positions of the fastest axis as fit
+    assert_equal(get_signal_chunks((100, 200, 1024), np.float64,
+                                   target_size=2 ** 20),
+                 (1, 128, 1024))
+    assert_equal(get_signal_chunks((100, 20, 1024), np.float64,
+                                   target_size=2 ** 20),
+                 (6, 20, 1024))
+    # Images are kept whole
+    assert_equal(get_signal_chunks((50, 64, 64), np.float32, [1, 2],
+                                   target_size=2 ** 16),
+                 (4, 64, 64))
+    # Signals larger than the target are split
+    assert_equal(get_signal_chunks((10, 2048, 2048), np.float64, [1, 2],
+                                   target_size=2 ** 20),
+                 (1, 256, 512))
+
+
+class TestHDF5:
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.hdf5')
+        os.close(fd)
+        self.s = Spectrum(np.random.random((4, 6, 10)))
+        for i, axis in enumerate(self.s.axes_manager._axes):
+            axis.scale = 0.5 * (i + 1)
+            axis.offset = i + 1
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_compression(self):
+        for compression in ('gzip', 'lzf', None):
+            self.s.save(self.filename, overwrite=True, shuffle=True,
+                        compression=compression)
+            s = load(self.filename)
+            assert_true(np.all(s.data == self.s.data))
+        with h5py.File(self.filename, 'r') as f:
+            dataset = f['Experiments/__unnamed__/data']
+            assert_equal(dataset.chunks, (4, 6, 10))
+
+    def test_data_slice(self):
+        self.s.save(self.filename, overwrite=True)
+        s = load(self.filename, data_slice=(2, slice(1, None, 2)))
+        assert_true(np.all(s.data == self.s.data[2, 1::2]))
+        assert_equal(s.axes_manager.navigation_shape, (3,))
+        axis = s.axes_manager.navigation_axes[0]
+        assert_equal(axis.offset, 2 + 1 * 1.)
+        assert_equal(axis.scale, 2.)
+        assert_equal(s.axes_manager.signal_axes[0].offset, 3)
+
+    def test_data_slice_ellipsis(self):
+        self.s.save(self.filename, overwrite=True)
+        s = load(self.filename, data_slice=(Ellipsis, 2))
+        assert_true(np.all(s.data == self.s.data[..., 2]))
+        assert_equal(tuple(axis.size for axis in s.axes_manager._axes),
+                     (4, 6))
+        assert_equal(s.axes_manager._axes[1].offset, 2)
+        s = load(self.filename, data_slice=(1, Ellipsis, slice(2, 4)))
+        assert_true(np.all(s.data == self.s.data[1, ..., 2:4]))
+        assert_equal(s.axes_manager.signal_axes[0].size, 2)
+
+    def test_data_slice_invalid(self):
+        self.s.save(self.filename, overwrite=True)
+        for data_slice in ((np.newaxis, 1), (Ellipsis, Ellipsis),
+                           (1, 2, 3, 4), ([0, 1],)):
+            assert_raises(ValueError, load, self.filename,
+                          data_slice=data_slice)
+
+    def test_lazy_close(self):
+        self.s.save(self.filename, overwrite=True)
+        s = load(self.filename, lazy=True)
+        dataset = s.data._data
+        assert_true(bool(dataset.id.valid))
+        s.data.close()
+        assert_true(not dataset.id.valid)
+
+    def test_data_slice_lazy(self):
+        self.s.save(self.filename, overwrite=True)
+        block_bytes = chunked_array.BLOCK_BYTES
+        chunked_array.BLOCK_BYTES = 100
+        try:
+            s = load(self.filename, lazy=True,
+                     data_slice=(slice(1, 3), slice(None), slice(0, 5)))
+            assert_true(isinstance(s.data, ChunkedArray))
+            assert_true(np.all(np.asarray(s.data) ==
+                               self.s.data[1:3, :, :5]))
+            s.data.close()
+        finally:
+            chunked_array.BLOCK_BYTES = block_bytes
+
+    def test_write_lazy(self):
+        self.s.save(self.filename, overwrite=True)
+        s = load(self.filename, lazy=True)
+        fd, filename = tempfile.mkstemp(suffix='.hdf5')
+        os.close(fd)
+        block_bytes = chunked_array.BLOCK_BYTES
+        chunked_array.BLOCK_BYTES = 100
+        try:
+            s.save(filename, overwrite=True)
+            assert_true(np.all(load(filename).data == self.s.data))
+        finally:
+            chunked_array.BLOCK_BYTES = block_bytes
+            s.data.close()
+            os.remove(filename)
+
+    def test_write_data_from_generator(self):
+        images = Image(np.random.random((5, 8, 9)))
+        with h5py.File(self.filename, 'w') as f:
+            write_data(f, 'data', (image for image in images.data),
+                       shape=(5, 8, 9), dtype=np.float64,
+                       chunks=(1, 8, 9), compression='lzf')
+            assert_true(np.all(f['data'][:] == images.data))
+
+    @raises(ValueError)
+    def test_write_data_too_short(self):
+        with h5py.File(self.filename, 'w') as f:
+            write_data(f, 'data', iter(np.ones((3, 4))), shape=(4, 4),
+                       dtype=np.float64)
@@ -6,6 +6,10 @@
 from nose.tools import assert_equal, assert_true
 
 from hyperspy.io import load
+from hyperspy.io_plugins.msa import parse_msa_string
+from hyperspy.signals import Spectrum
+import numpy as np
+import tempfile
 
 my_path = os.path.dirname(__file__)
 
@@ -212,3 +216,54 @@ def test_parameters(self):
                 example2_parameters,
                 self.s.original_parameters.as_dictionary())
 
+
+
+def test_parse_data_section():
+    s = parse_msa_string(
+        u"#FORMAT      : EMSA/MAS Spectral Data File\r\n"
+        u"#DATATYPE    : Y\r\n"
+        u"#SPECTRUM    : Spectral Data Starts Here\r\n"
+        u"1.5, 2.5, 3,\r\n"
+        u"# A comment\r\n"
+        u"4e1 5 ,6\r\n"
+        u"\r\n"
+        u"7\r\n"
+        u"#ENDOFDATA   : End Of Data and File\r\n")
+    assert_equal(s['data'].tolist(), [1.5, 2.5, 3, 40, 5, 6, 7])
+    s = parse_msa_string(
+        u"#DATATYPE    : XY\n"
+        u"#SPECTRUM    : Spectral Data Starts Here\n"
+        u"1, 2, 9\n"
+        u"3, 4, 9\n"
+        u"#ENDOFDATA   :\n")
+    assert_equal(s['data'].tolist(), [2, 4])
+
+def test_crlf_spectrum_keyword_without_value():
+    fd, filename = tempfile.mkstemp(suffix='.msa')
+    try:
+        os.write(fd, "#FORMAT      : EMSA/MAS Spectral Data File\r\n"
+                     "#DATATYPE    : Y\r\n"
+                     "#SPECTRUM\r\n"
+                     "1, 2, 3\r\n"
+                     "#ENDOFDATA   : End Of Data and File\r\n")
+        os.close(fd)
+        s = load(filename)
+        assert_equal(s.data.tolist(), [1, 2, 3])
+    finally:
+        os.remove(filename)
+
+def test_write_read():
+    fd, filename = tempfile.mkstemp(suffix='.msa')
+    os.close(fd)
+    try:
+        s = Spectrum(np.arange(20.) * 1.5)
+        s.axes_manager[0].scale = 0.5
+        s.axes_manager[0].offset = 10
+        for format in ('Y', 'XY'):
+            s.save(filename, format=format, overwrite=True)
+            s2 = load(filename)
+            assert_equal(s2.data.tolist(), s.data.tolist())
+            assert_equal(s2.axes_manager[0].scale, 0.5)
+            assert_equal(s2.axes_manager[0].offset, 10)
+    finally:
+        os.remove(filename)
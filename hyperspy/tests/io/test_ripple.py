@@ -0,0 +1,111 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from nose.tools import assert_true, assert_equal, raises
+
+from hyperspy.io import load, is_memory_mapped
+from hyperspy.signals import Spectrum, Image
+from hyperspy.misc import chunked_array
+from hyperspy.misc.chunked_array import ChunkedArray
+
+
+class TestRipple:
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'test.rpl')
+        self.block_bytes = chunked_array.BLOCK_BYTES
+        # Several blocks per file
+        chunked_array.BLOCK_BYTES = 2 ** 8
+
+    def tearDown(self):
+        chunked_array.BLOCK_BYTES = self.block_bytes
+        shutil.rmtree(self.directory)
+
+    def read_raw(self, dtype):
+        return np.fromfile(self.filename[:-3] + 'raw', dtype=dtype)
+
+    def test_spectrum(self):
+        data = np.arange(4 * 6 * 10, dtype='uint16').reshape((4, 6, 10))
+        Spectrum(data).save(self.filename)
+        assert_true((self.read_raw('uint16') == data.ravel()).all())
+        s = load(self.filename)
+        assert_equal(s.data.shape, (4, 6, 10))
+        assert_true((s.data == data).all())
+
+    def test_image_stack(self):
+        data = np.arange(3 * 5 * 7, dtype='float32').reshape((3, 5, 7))
+        Image(data).save(self.filename)
+        assert_true((self.read_raw('float32') == data.ravel()).all())
+        s = load(self.filename)
+        assert_true(isinstance(s, Image))
+        assert_true((s.data == data).all())
+
+    def test_reordered(self):
+        # The signal axis is not the last one in the array
+        data = np.arange(4 * 6 * 10, dtype='int32').reshape((4, 6, 10))
+        s = Spectrum(data).rollaxis(-1, 0)
+        assert_equal(s.data.shape, (4, 10, 6))
+        s.save(self.filename)
+        assert_true((self.read_raw('int32') == data.ravel()).all())
+        s = Image(data).rollaxis(-1, 0)
+        assert_equal(s.data.shape, (6, 4, 10))
+        s.save(self.filename, overwrite=True)
+        assert_true((self.read_raw('int32') == data.ravel()).all())
+
+    def test_byte_order(self):
+        data = np.arange(4 * 10, dtype='<u2').reshape((4, 10))
+        Spectrum(data).save(self.filename, byte_order='big-endian')
+        assert_true((self.read_raw('>u2') == data.ravel()).all())
+        s = load(self.filename)
+        assert_equal(s.data.dtype.byteorder, '>')
+        assert_true((s.data == data).all())
+
+    def test_chunked_array(self):
+        data = np.random.random((4, 6, 10))
+        fd, mmap_filename = tempfile.mkstemp(dir=self.directory)
+        os.close(fd)
+        mmap = np.memmap(mmap_filename, dtype='float64', mode='w+',
+                         shape=(4, 6, 10))
+        mmap[:] = data
+        s = Spectrum(mmap)
+        s.data = ChunkedArray(mmap)
+        s.save(self.filename)
+        assert_true(np.all(self.read_raw('float64') == data.ravel()))
+
+    def test_mmap_mode(self):
+        data = np.arange(4 * 10, dtype='uint16').reshape((4, 10))
+        Spectrum(data).save(self.filename)
+        s = load(self.filename, mmap_mode='r')
+        assert_true(is_memory_mapped(s.data))
+        assert_true(not s.data.flags.writeable)
+        s = load(self.filename, mmap_mode=None)
+        assert_true(not is_memory_mapped(s.data))
+        assert_true((s.data == data).all())
+        # Copy-on-write by default
+        s = load(self.filename)
+        s.data[:] = 0
+        assert_true((self.read_raw('uint16') == data.ravel()).all())
+
+    @raises(ValueError)
+    def test_wrong_byte_order(self):
+        Spectrum(np.arange(10, dtype='uint16')).save(self.filename,
+                                                     byte_order='middle')
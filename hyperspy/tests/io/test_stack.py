@@ -0,0 +1,155 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from nose.tools import assert_true, assert_equal, raises
+
+from hyperspy import io
+from hyperspy.io import load
+from hyperspy.signals import Spectrum
+from hyperspy import utils
+
+
+class TestLoadStack:
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data = np.random.randint(0, 100, (5, 16)).astype(float)
+        for i, spectrum in enumerate(self.data):
+            Spectrum(spectrum).save(
+                os.path.join(self.folder, "spectrum%i.msa" % i))
+        self.pattern = os.path.join(self.folder, "spectrum*.msa")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_stack(self):
+        s = load(self.pattern, stack=True)
+        assert_equal(s.data.shape, (5, 16))
+        assert_true(np.allclose(s.data, self.data))
+        assert_equal(s.mapped_parameters.title,
+                     os.path.split(self.folder)[1])
+
+    def test_stack_reader(self):
+        # The msa files are stacked by msa.stack_reader
+        s = load(self.pattern, stack=True)
+        signals = load(self.pattern)
+        stacked = utils.stack(signals)
+        assert_equal(type(s), type(stacked))
+        assert_equal(s.axes_manager._get_axes_dicts(),
+                     stacked.axes_manager._get_axes_dicts())
+        for i in xrange(5):
+            element = 'element%i' % i
+            assert_equal(
+                s.original_parameters.stack_elements[
+                    element].original_parameters.as_dictionary(),
+                stacked.original_parameters.stack_elements[
+                    element].original_parameters.as_dictionary())
+        assert_true(np.all(s.data == stacked.data))
+
+    def test_stack_workers(self):
+        s = load(self.pattern, stack=True, workers=3)
+        assert_true(np.allclose(s.data, self.data))
+
+    def test_stack_mmap(self):
+        s = load(self.pattern, stack=True, mmap=True)
+        assert_true(isinstance(s.data, np.memmap))
+        assert_true(np.allclose(s.data, self.data))
+
+    def test_workers(self):
+        for workers in (None, 2, 8):
+            signals = load(self.pattern, workers=workers)
+            assert_equal(len(signals), 5)
+            for s, data in zip(signals, self.data):
+                assert_true(np.allclose(s.data, data))
+
+    def test_workers_threads(self):
+        filenames = sorted(os.listdir(self.folder))
+        assert_true(io._use_processes(filenames))
+        assert_true(io._use_processes(filenames + ["image.dm3"]))
+        assert_true(not io._use_processes(filenames + ["spectra.rpl"]))
+
+    @raises(IOError)
+    def test_workers_error(self):
+        filename = os.path.join(self.folder, "spectrum2.msa")
+        with open(filename, "w") as f:
+            f.write("Not a msa file")
+        load(self.pattern, workers=2)
+
+    def test_stack_axis(self):
+        s = load(self.pattern, stack=True, stack_axis=0)
+        assert_equal(s.data.shape, (80,))
+        assert_true(np.allclose(s.data, self.data.ravel()))
+
+
+def test_workers_memmap():
+    # The files that are not packed (complex or RGB) are memory mapped
+    filenames = [os.path.join(os.path.dirname(__file__), "dm3_2D_data",
+                              "test-%i.dm3" % i) for i in (1, 2, 7, 12)]
+    signals = load(filenames)
+    for filename, s1, s2 in zip(filenames, signals,
+                                load(filenames, workers=2)):
+        # The data is mapped from the file, not copied from the workers
+        base = s2.data
+        while getattr(base, 'filename', None) is None:
+            base = base.base
+        assert_equal(base.filename, os.path.abspath(filename))
+        assert_equal(s1.data.shape, s2.data.shape)
+        assert_true(np.all(s1.data == s2.data))
+
+
+def test_memmap_descriptor():
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        data = np.arange(60.).reshape((3, 4, 5))
+        data.tofile(filename)
+        mapped = np.memmap(filename, dtype=data.dtype, mode='r',
+                           offset=8 * 5, shape=(55,))
+        view = mapped[5:].reshape((2, 5, 5))[:, ::-1, 1::2].T
+        reopened = io.MemmapDescriptor(view).open()
+        assert_true(io.is_memory_mapped(reopened))
+        assert_equal(reopened.shape, view.shape)
+        assert_true(np.all(reopened == view))
+        del mapped, view, reopened
+    finally:
+        os.remove(filename)
+
+
+class TestStackIterable:
+    def setUp(self):
+        self.data = np.arange(20.).reshape((4, 5))
+
+    def spectra(self):
+        for spectrum in self.data:
+            yield Spectrum(spectrum)
+
+    def test_generator(self):
+        s = utils.stack(self.spectra(), length=4)
+        assert_true(np.allclose(s.data, self.data))
+        assert_equal(len(s.original_parameters.stack_elements), 4)
+
+    @raises(ValueError)
+    def test_too_few(self):
+        utils.stack(self.spectra(), length=5)
+
+    @raises(ValueError)
+    def test_too_many(self):
+        utils.stack(self.spectra(), length=3)
@@ -0,0 +1,92 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+
+import os
+import tempfile
+
+import numpy as np
+
+from nose.tools import assert_true
+from hyperspy._signals.spectrum import Spectrum
+
+
+def _compare_factors(f1, f2):
+    # The sign of the components is arbitrary
+    return np.allclose(np.abs(f1), np.abs(f2), atol=1e-6)
+
+
+class TestIncrementalPCA:
+    def setUp(self):
+        np.random.seed(1)
+        factors = np.random.random((3, 64))
+        loadings = np.random.random((10, 12, 3)) * 100
+        data = np.dot(loadings, factors)
+        self.data = np.random.poisson(data).astype('float64')
+        self.s = Spectrum(self.data.copy())
+
+    def _decompose(self, **kwargs):
+        svd = Spectrum(self.data.copy())
+        svd.decomposition(algorithm='svd', output_dimension=3, **kwargs)
+        self.s.decomposition(algorithm='incremental_pca', output_dimension=3,
+                             block_size=7, **kwargs)
+        return svd.learning_results, self.s.learning_results
+
+    def test_equals_svd(self):
+        svd, ipca = self._decompose(centre='trials')
+        assert_true(_compare_factors(svd.factors, ipca.factors))
+        assert_true(_compare_factors(svd.loadings, ipca.loadings))
+        assert_true(np.allclose(svd.explained_variance,
+                                ipca.explained_variance))
+
+    def test_poissonian_normalization(self):
+        svd, ipca = self._decompose(normalize_poissonian_noise=True)
+        assert_true(_compare_factors(svd.factors, ipca.factors))
+        assert_true(_compare_factors(svd.loadings, ipca.loadings))
+        assert_true(np.all(self.s.data == self.data))
+
+    def test_masks(self):
+        navigation_mask = np.zeros((10, 12), dtype='bool')
+        navigation_mask[2:4, 5:] = True
+        signal_mask = np.zeros(64, dtype='bool')
+        signal_mask[:10] = True
+        svd, ipca = self._decompose(navigation_mask=navigation_mask,
+                                    signal_mask=signal_mask)
+        assert_true(np.all(np.isnan(ipca.factors[:10])))
+        assert_true(np.all(np.isnan(ipca.loadings[navigation_mask.ravel()])))
+        valid = ~np.isnan(svd.factors)
+        assert_true(_compare_factors(svd.factors[valid],
+                                     ipca.factors[valid]))
+
+    def test_memmap(self):
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            data = np.memmap(filename, dtype='float64', mode='w+',
+                             shape=self.data.shape)
+            data[:] = self.data
+            s = Spectrum(data)
+            s.decomposition(algorithm='incremental_pca',
+                            output_dimension=3, block_size=7)
+            assert_true(np.may_share_memory(s.data, data))
+            svd, ipca = self._decompose()
+            assert_true(_compare_factors(s.learning_results.factors,
+                                         svd.factors))
+            del s, data
+        finally:
+            os.remove(filename)
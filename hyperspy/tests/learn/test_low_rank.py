@@ -0,0 +1,114 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_equal, assert_raises
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.learn.low_rank import LowRankArray
+from hyperspy.misc import chunked_array
+from hyperspy.misc.chunked_array import ChunkedArray
+
+
+class TestLowRankArray:
+    def setUp(self):
+        np.random.seed(1)
+        self.factors = np.random.random((16, 3))
+        self.loadings = np.random.random((20, 3))
+        self.mean = np.random.random((1, 16))
+        self.array = LowRankArray.from_decomposition(
+            self.factors, self.loadings, (4, 5), (16,), mean=self.mean,
+            centre='trials')
+        self.data = (np.dot(self.loadings, self.factors.T) +
+                     self.mean).reshape((4, 5, 16))
+
+    def test_centre_variables(self):
+        # With a single navigation position the shape of the mean does
+        # not tell the centre
+        loadings = self.loadings[:1]
+        for mean, centre in ((np.ones((1, 1)), 'variables'),
+                             (np.ones((1, 16)), 'trials')):
+            array = LowRankArray.from_decomposition(
+                self.factors, loadings, (1,), (16,), mean=mean,
+                centre=centre)
+            assert_true(np.allclose(
+                np.asarray(array),
+                np.dot(loadings, self.factors.T) + mean))
+        assert_raises(ValueError, LowRankArray.from_decomposition,
+                      self.factors, loadings, (1,), (16,),
+                      mean=np.ones((1, 1)))
+
+    def test_shape(self):
+        assert_equal(self.array.shape, (4, 5, 16))
+
+    def test_asarray(self):
+        assert_true(np.allclose(np.asarray(self.array), self.data))
+
+    def test_getitem(self):
+        for key in ((1, 2), (Ellipsis, 3), (slice(1, 3), 0, slice(2, 8)),
+                    (2,), (-1, Ellipsis, 4)):
+            assert_true(np.allclose(self.array[key], self.data[key]))
+
+    def test_sum(self):
+        for axis in (0, 1, 2, -1):
+            result = np.sum(self.array, axis=axis)
+            assert_true(np.allclose(np.asarray(result),
+                                    self.data.sum(axis)))
+        assert_true(np.allclose(self.array.sum(-1).sum(-1),
+                                self.data.sum(-1).sum(-1)))
+
+
+class TestLazyDecompositionModel:
+    def setUp(self):
+        np.random.seed(1)
+        s = Spectrum(np.random.random((4, 5, 16)))
+        s.decomposition(centre='trials')
+        self.s = s
+
+    def test_equals_dense(self):
+        s = self.s
+        dense = s.get_decomposition_model(3)
+        lazy = s.get_decomposition_model(3, lazy=True)
+        assert_true(isinstance(lazy.data, LowRankArray))
+        assert_equal(lazy.data.shape, dense.data.shape)
+        assert_true(np.allclose(np.asarray(lazy.data), dense.data))
+        s.axes_manager.indices = (2, 1)
+        lazy.axes_manager.indices = (2, 1)
+        assert_true(np.allclose(lazy(), dense.data[1, 2]))
+        assert_true(np.allclose(lazy[1:3].isig[2:5].data,
+                                dense.data[:, 1:3, 2:5]))
+        assert_true(np.allclose(lazy.sum(-1).data, dense.sum(-1).data))
+
+    def test_residual(self):
+        s = self.s
+        dense = s.get_decomposition_model(3)
+        block_bytes = chunked_array.BLOCK_BYTES
+        chunked_array.BLOCK_BYTES = 256
+        try:
+            lazy = s.get_decomposition_model(3, lazy=True)
+            assert_true(isinstance(lazy.residual.data, ChunkedArray))
+            assert_true(np.allclose(np.asarray(lazy.residual.data),
+                                    dense.residual.data))
+        finally:
+            chunked_array.BLOCK_BYTES = block_bytes
+
+    def test_all_components(self):
+        rec = self.s.get_decomposition_model()
+        assert_true(np.allclose(rec.data, self.s.data))
+        assert_true(np.allclose(rec.residual.data, 0))
@@ -0,0 +1,114 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_false
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.learn.svd_pca import svd_pca
+
+
+class TestPoissonianNormalization:
+    def setUp(self):
+        np.random.seed(1)
+        self.data = np.random.poisson(
+            np.random.random((4, 5, 32)) * 10).astype('float64')
+        self.s = Spectrum(self.data.copy())
+
+    def _expected(self, navigation_mask, signal_mask):
+        dc = self.data.reshape((-1, 32))
+        dc = dc[~navigation_mask.ravel()][:, ~signal_mask]
+        aG = dc.sum(1)[:, np.newaxis]
+        bH = dc.sum(0)[np.newaxis, :]
+        return np.nan_to_num(dc / np.sqrt(aG * bH))
+
+    def test_normalize_and_undo(self):
+        s = self.s
+        s.normalize_poissonian_noise()
+        expected = self._expected(np.zeros((4, 5), dtype='bool'),
+                                  np.zeros(32, dtype='bool'))
+        assert_true(np.allclose(s.data.reshape((-1, 32)), expected))
+        s.undo_treatments()
+        assert_true(np.allclose(s.data, self.data))
+
+    def test_normalize_masked(self):
+        s = self.s
+        navigation_mask = np.zeros((4, 5), dtype='bool')
+        navigation_mask[1, 2:] = True
+        signal_mask = np.zeros(32, dtype='bool')
+        signal_mask[:4] = True
+        s.normalize_poissonian_noise(navigation_mask=navigation_mask,
+                                     signal_mask=signal_mask)
+        dc = s.data.reshape((-1, 32))
+        assert_true(np.allclose(
+            dc[~navigation_mask.ravel()][:, ~signal_mask],
+            self._expected(navigation_mask, signal_mask)))
+        # The masked data is not modified
+        assert_true(np.all(dc[:, signal_mask] ==
+                           self.data.reshape((-1, 32))[:, signal_mask]))
+        s.undo_treatments()
+        assert_true(np.allclose(s.data, self.data))
+
+    def test_decomposition_does_not_copy(self):
+        s = self.s
+        data = s.data
+        s.decomposition(normalize_poissonian_noise=True, centre='trials')
+        assert_false(hasattr(s, '_data_before_treatments'))
+        # The data is not modified, not even by a round trip
+        assert_true(np.may_share_memory(s.data, data))
+        assert_true(np.all(s.data == self.data))
+
+    def test_decomposition_masked(self):
+        s = self.s
+        navigation_mask = np.zeros((4, 5), dtype='bool')
+        navigation_mask[1, 2:] = True
+        signal_mask = np.zeros(32, dtype='bool')
+        signal_mask[:4] = True
+        s.decomposition(normalize_poissonian_noise=True,
+                        navigation_mask=navigation_mask,
+                        signal_mask=signal_mask)
+        assert_true(np.all(s.data == self.data))
+        expected = self._expected(navigation_mask, signal_mask)
+        factors, loadings, _, _ = svd_pca(expected)
+        target = s.learning_results
+        rows = ~navigation_mask.ravel()
+        # The results are rescaled by the weights
+        dc = self.data.reshape((-1, 32))[rows][:, ~signal_mask]
+        root_aG = np.sqrt(dc.sum(1))[:, np.newaxis]
+        root_bH = np.sqrt(dc.sum(0))[np.newaxis, :]
+        assert_true(np.allclose(
+            np.abs(target.factors[~signal_mask]),
+            np.abs(factors * root_bH.T)))
+        assert_true(np.allclose(
+            np.abs(target.loadings[rows]),
+            np.abs(loadings * root_aG)))
+
+    def test_svd_pca_weights(self):
+        dc = self.data.reshape((-1, 32))
+        root_aG = np.sqrt(dc.sum(1))[:, np.newaxis]
+        root_bH = np.sqrt(dc.sum(0))[np.newaxis, :]
+        factors, loadings, _, mean = svd_pca(dc, centre='trials',
+                                             root_aG=root_aG,
+                                             root_bH=root_bH)
+        assert_true(np.all(dc == self.data.reshape((-1, 32))))
+        expected = self._expected(np.zeros((4, 5), dtype='bool'),
+                                  np.zeros(32, dtype='bool'))
+        assert_true(np.allclose(mean, expected.mean(0)))
+        assert_true(np.allclose(np.dot(loadings, factors.T),
+                                expected - expected.mean(0)))
@@ -0,0 +1,64 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_equal
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.learn.svd_pca import randomized_svd
+
+
+class TestRandomizedSVD:
+    def setUp(self):
+        np.random.seed(1)
+        factors = np.random.random((3, 64))
+        loadings = np.random.random((200, 3)) * 100
+        self.data = np.dot(loadings, factors) + np.random.normal(
+            size=(200, 64))
+
+    def test_singular_values(self):
+        U, S, V, mean = randomized_svd(self.data, 3, block_size=33,
+                                       random_state=0)
+        S_ = np.linalg.svd(self.data, compute_uv=False)
+        assert_equal(U.shape, (200, 3))
+        assert_equal(V.shape, (3, 64))
+        assert_true(mean is None)
+        assert_true(np.allclose(S, S_[:3]))
+        assert_true(np.allclose(np.dot(U * S, V),
+                                np.dot(np.dot(self.data, V.T), V)))
+
+    def test_centre(self):
+        U, S, V, mean = randomized_svd(self.data, 3, centre='trials',
+                                       random_state=0)
+        centred = self.data - self.data.mean(0)
+        S_ = np.linalg.svd(centred, compute_uv=False)
+        assert_true(np.allclose(mean, self.data.mean(0)))
+        assert_true(np.allclose(S, S_[:3]))
+
+    def test_decomposition(self):
+        s = Spectrum(self.data.reshape((10, 20, 64)))
+        s2 = s.deepcopy()
+        s.decomposition(algorithm='randomized_svd', output_dimension=3,
+                        block_size=7, random_state=0)
+        s2.decomposition(algorithm='svd', output_dimension=3)
+        assert_true(np.allclose(s.learning_results.explained_variance,
+                                s2.learning_results.explained_variance))
+        assert_true(np.allclose(
+            np.abs(s.learning_results.factors),
+            np.abs(s2.learning_results.factors)))
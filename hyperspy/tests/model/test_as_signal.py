@@ -0,0 +1,124 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_raises
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.hspy import create_model
+from hyperspy.components import Gaussian, Polynomial
+
+
+class TestAsSignal:
+    def setUp(self):
+        s = Spectrum(np.zeros((2, 3, 50)))
+        m = create_model(s)
+        g = Gaussian()
+        p = Polynomial(order=1)
+        m.extend((g, p))
+        g.A.map['values'] = np.arange(6).reshape((2, 3)) + 1.
+        g.A.map['is_set'] = True
+        g.centre.map['values'] = 20.
+        g.centre.map['is_set'] = True
+        g.sigma.map['values'] = np.arange(6).reshape((2, 3)) + 2.
+        g.sigma.map['is_set'] = True
+        p.coefficients.map['values'][..., 0] = 0.1
+        p.coefficients.map['values'][..., 1] = np.arange(6).reshape(
+            (2, 3))
+        p.coefficients.map['is_set'] = True
+        self.model = m
+        self.g = g
+        self.p = p
+
+    def _iterative_as_signal(self, components):
+        m = self.model
+        data = np.zeros(m.spectrum.data.shape)
+        for index in m.axes_manager:
+            m.fetch_stored_values()
+            for component in components:
+                data[index[::-1]] += component.function(m.axis.axis)
+        return data
+
+    def test_vectorized_component(self):
+        m = self.model
+        s = m.as_signal(component_list=[self.g])
+        assert_true(np.allclose(s.data,
+                                self._iterative_as_signal([self.g])))
+
+    def test_mixed_components(self):
+        m = self.model
+        s = m.as_signal()
+        assert_true(np.allclose(
+            s.data, self._iterative_as_signal([self.g, self.p])))
+
+    def test_function_nd_not_vectorized(self):
+        assert_true(self.g.supports_function_nd)
+        assert_true(not self.p.supports_function_nd)
+        assert_raises(NotImplementedError, self.p.function_nd,
+                      self.model.axis.axis)
+
+    def test_function_nd_twin(self):
+        g2 = Gaussian()
+        self.model.append(g2)
+        g2.A.twin = self.g.A
+        g2.A.twin_function = lambda x: 2 * x
+        assert_true(np.allclose(g2.A._get_nd_value(),
+                                2 * self.g.A.map['values']))
+
+    def test_function_nd_internal_twin(self):
+        g = self.g
+        g.centre.twin = g.A
+        g.centre.twin_function = lambda x: x + 20
+        result = g.function_nd(self.model.axis.axis)
+        assert_true(result.shape == (2, 3, 50))
+        assert_true(np.allclose(result, self._iterative_as_signal([g])))
+
+    def test_function_nd_does_not_modify_parameters(self):
+        g = self.g
+        g.A.value = 7.
+        g.centre.twin = g.A
+        calls = []
+        g.A.connect(lambda: calls.append(g.A.value))
+        values = []
+
+        def function(x, A, sigma, centre):
+            values.append((g.A.value, g.centre.twin))
+            return Gaussian._function(g, x, A, sigma, centre)
+        g._function = function
+        g.function_nd(self.model.axis.axis)
+        assert_true(values == [(7., g.A)])
+        assert_true(not calls)
+
+    def test_not_stored_values(self):
+        m = self.model
+        g = self.g
+        g.A.value = 10.
+        g.A.map['is_set'][0, 1] = False
+        g.A.map['is_set'][1, 0] = False
+        g.sigma.map['is_set'][0, 0] = False
+        g.sigma.value = 3.
+        # The previous position in C order or the current value
+        A = np.array([[1., 1., 3.], [3., 5., 6.]])
+        sigma = np.array([[3., 3., 4.], [5., 6., 7.]])
+        assert_true(np.all(g.A._get_nd_value() == A))
+        assert_true(np.all(g.sigma._get_nd_value() == sigma))
+        s = m.as_signal(component_list=[g])
+        expected = Gaussian._function(
+            g, m.axis.axis, A[..., np.newaxis], sigma[..., np.newaxis],
+            20.)
+        assert_true(np.allclose(s.data, expected))
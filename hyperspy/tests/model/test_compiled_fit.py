@@ -0,0 +1,129 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_equal, raises
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.model import Model, _EvaluationPlan
+from hyperspy.components import Gaussian, Offset
+
+
+class TestCompiledFit:
+    def setUp(self):
+        g = Gaussian()
+        g.A.value = 1000.
+        g.centre.value = 40.
+        g.sigma.value = 5.
+        axis = np.arange(100.)
+        data = g.function(axis) + 3 + np.sin(axis)
+        self.models = []
+        for i in xrange(2):
+            m = Model(Spectrum(data.copy()))
+            g1 = Gaussian()
+            g2 = Gaussian()
+            o = Offset()
+            m.extend((g1, g2, o))
+            self.models.append(m)
+        self.reset()
+
+    def reset(self):
+        for m in self.models:
+            g1, g2, o = m
+            g1.A.value = 800.
+            g1.centre.value = 45.
+            g1.sigma.value = 6.
+            g2.A.value = 10.
+            g2.centre.value = 70.
+            g2.sigma.value = 3.
+            o.offset.value = 0.
+
+    def check_equal(self, **kwargs):
+        slow, fast = self.models
+        slow.fit(compiled=False, **kwargs)
+        fast.fit(compiled=True, **kwargs)
+        for c1, c2 in zip(slow, fast):
+            for p1, p2 in zip(c1.parameters, c2.parameters):
+                assert_true(np.allclose(p1.value, p2.value))
+        assert_true(fast._plan is None)
+
+    def test_leastsq(self):
+        self.check_equal()
+        self.reset()
+        self.check_equal(grad=True)
+
+    def test_fmin(self):
+        self.check_equal(fitter='fmin')
+
+    def test_twin_and_inactive(self):
+        for m in self.models:
+            g1, g2, o = m
+            g2.sigma.twin = g1.sigma
+            o.active = False
+        self.check_equal()
+        g1, g2, o = self.models[1]
+        assert_equal(g2.sigma.value, g1.sigma.value)
+        assert_equal(len(_EvaluationPlan(self.models[1]).components), 2)
+
+    def test_ext_bounding(self):
+        for m in self.models:
+            m[0].centre.bmin = 41.
+            m[0].centre.bmax = 50.
+        self.check_equal(ext_bounding=True)
+        assert_true(self.models[1][0].centre.value >= 41.)
+
+    def test_connected_function(self):
+        calls = []
+        g1 = self.models[1][0]
+        g1.A.connect(lambda: calls.append(g1.A.value))
+        plan = _EvaluationPlan(self.models[1])
+        self.models[1]._set_p0()
+        plan.set_values(np.arange(plan.size, dtype='float'))
+        assert_equal(len(calls), 1)
+        self.reset()
+        self.check_equal()
+        assert_true(len(calls) > 1)
+
+    def test_plan_order(self):
+        m = self.models[1]
+        m._set_p0()
+        plan = _EvaluationPlan(m)
+        assert_equal(plan.size, len(m.p0))
+        p = np.arange(plan.size, dtype='float') + 1
+        plan.set_values(p)
+        m._set_p0()
+        assert_true(np.all(np.array(m.p0) == p))
+
+    def test_model_is_not_overwritten(self):
+        m = self.models[1]
+        m._set_p0()
+        m._plan = _EvaluationPlan(m)
+        p0 = np.array(m.p0)
+        model1 = m._model_function(p0)
+        expected = model1.copy()
+        model2 = m._model_function(p0 * 2)
+        assert_true(not np.may_share_memory(model1, model2))
+        assert_true(np.all(model1 == expected))
+
+    @raises(TypeError)
+    def test_plan_cleared_on_error(self):
+        m = self.models[1]
+        try:
+            m.fit(fitter='leastsq', maxfev='wrong')
+        finally:
+            assert_true(m._plan is None)
@@ -0,0 +1,87 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_equal
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.model import Model
+from hyperspy.components import Gaussian
+from hyperspy.misc.spectrum_tools import (fft_convolve_valid,
+                                          convolution_fft_size,
+                                          fft_size)
+
+
+def check_fft_convolve_valid(signal_size, kernel_size, size):
+    a = np.random.random((3, signal_size))
+    kernel = np.random.random(kernel_size)
+    result = fft_convolve_valid(a, np.fft.rfft(kernel, size),
+                                kernel_size, size)
+    expected = np.array([np.convolve(row, kernel, mode="valid")
+                         for row in a])
+    assert_true(np.allclose(result, expected))
+
+
+def test_fft_convolve_valid():
+    for signal_size, kernel_size in ((100, 10), (4095, 2048),
+                                     (1000, 3), (64, 64)):
+        # Single block
+        yield (check_fft_convolve_valid, signal_size, kernel_size,
+               fft_size(signal_size))
+        # Overlap-save
+        yield (check_fft_convolve_valid, signal_size, kernel_size,
+               fft_size(2 * kernel_size))
+
+
+def test_convolution_fft_size():
+    assert_equal(convolution_fft_size(4095, 2048), 4096)
+    assert_equal(convolution_fft_size(1000, 3), None)
+
+
+class TestConvolvedModel:
+    def setUp(self):
+        s = Spectrum(np.zeros((2, 1024)))
+        ll = Spectrum(np.random.random((2, 512)))
+        ll.axes_manager[-1].offset = -100
+        m = Model(s)
+        m.low_loss = ll
+        g = Gaussian()
+        g.centre.value = 500
+        g.sigma.value = 30
+        g.A.value = 1000
+        m.append(g)
+        self.model = m
+        self.ll = ll
+        self.g = g
+
+    def test_call(self):
+        m = self.model
+        m.axes_manager.indices = (1,)
+        expected = np.convolve(self.ll.data[1],
+                               self.g.function(m.convolution_axis),
+                               mode="valid")
+        assert_true(np.allclose(m(), expected))
+
+    def test_low_loss_cache_invalidated(self):
+        m = self.model
+        m.axes_manager.indices = (0,)
+        kernel = m._get_low_loss_kernel()[0]
+        assert_true(np.all(kernel == self.ll.data[0]))
+        m.axes_manager.indices = (1,)
+        kernel = m._get_low_loss_kernel()[0]
+        assert_true(np.all(kernel == self.ll.data[1]))
@@ -0,0 +1,83 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+from nose.tools import assert_true
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.model import Model
+from hyperspy.components import Gaussian, Offset
+
+
+class TestJacobian:
+    def setUp(self):
+        s = Spectrum(np.zeros(100))
+        m = Model(s)
+        g = Gaussian()
+        g.A.value = 100.
+        g.centre.value = 40.
+        g.sigma.value = 5.
+        o = Offset()
+        o.offset.value = 3.
+        m.extend((g, o))
+        m._set_p0()
+        self.model = m
+        self.g = g
+        self.o = o
+
+    def _numerical_jacobian(self, p0):
+        m = self.model
+        p0 = np.array(p0, dtype='float')
+        delta = 1e-6
+        grad = []
+        for i in xrange(len(p0)):
+            p1 = p0.copy()
+            p2 = p0.copy()
+            p1[i] -= delta
+            p2[i] += delta
+            grad.append((m._model_function(p2) -
+                         m._model_function(p1)) / (2 * delta))
+        m._fetch_values_from_p0()
+        return np.array(grad)
+
+    def test_jacobian(self):
+        m = self.model
+        m.channel_switches[:10] = False
+        jacobian = m._jacobian(m.p0, None).copy()
+        assert_true(np.allclose(jacobian,
+                                self._numerical_jacobian(m.p0),
+                                atol=1e-5))
+
+    def test_jacobian_convolved(self):
+        m = self.model
+        ll = Spectrum(np.random.random(30))
+        ll.axes_manager[-1].offset = -10
+        m.low_loss = ll
+        self.o.convolved = False
+        m.channel_switches[-5:] = False
+        jacobian = m._jacobian(m.p0, None).copy()
+        assert_true(np.allclose(jacobian,
+                                self._numerical_jacobian(m.p0),
+                                atol=1e-5))
+
+    def test_jacobian_is_not_overwritten(self):
+        m = self.model
+        j1 = m._jacobian(m.p0, None)
+        expected = j1.copy()
+        m._jacobian(np.array(m.p0) * 2, None)
+        assert_true(np.all(j1 == expected))
@@ -0,0 +1,275 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+from nose.tools import assert_true, assert_equal, raises
+from hyperspy._signals.spectrum import Spectrum
+from hyperspy.hspy import create_model
+from hyperspy.components import Gaussian
+from hyperspy.model import _get_coarse_signal
+
+
+class TestParallelMultifit:
+    def setUp(self):
+        g = Gaussian()
+        axis = np.arange(100)
+        data = np.zeros((3, 4, 100))
+        for i in xrange(3):
+            for j in xrange(4):
+                g.A.value = 1000. * (1 + i)
+                g.centre.value = 40. + 3 * j
+                g.sigma.value = 5. + i
+                data[i, j] = g.function(axis)
+        s = Spectrum(data)
+        self.models = []
+        for s_ in (s, s.deepcopy()):
+            m = create_model(s_)
+            g1 = Gaussian()
+            g1.A.value = 1500.
+            g1.centre.value = 45.
+            g1.sigma.value = 6.
+            m.append(g1)
+            for parameter in g1.parameters:
+                parameter.assign_current_value_to_all()
+            self.models.append(m)
+
+    def test_parallel_equals_serial(self):
+        serial, parallel = self.models
+        serial.multifit()
+        parallel.multifit(parallel=True, workers=2)
+        for c1, c2 in zip(serial, parallel):
+            for p1, p2 in zip(c1.parameters, c2.parameters):
+                assert_true(np.all(p1.map['values'] == p2.map['values']))
+                assert_true(np.all(p2.map['is_set']))
+
+    def test_parallel_equals_serial_without_stored_values(self):
+        serial, parallel = self.models
+        for m in self.models:
+            for parameter in m[0].parameters:
+                parameter.map['is_set'] = False
+        serial.multifit()
+        parallel.multifit(parallel=True, workers=2)
+        for p1, p2 in zip(serial[0].parameters, parallel[0].parameters):
+            assert_true(np.all(p1.map['values'] == p2.map['values']))
+
+    def test_parallel_equals_serial_stored_rows(self):
+        serial, parallel = self.models
+        for m in self.models:
+            for parameter in m[0].parameters:
+                parameter.map['is_set'][:, 1:] = False
+        assert_equal(parallel._get_multifit_blocks(None, 8),
+                     [(0, 4), (4, 8), (8, 12)])
+        serial.multifit()
+        parallel.multifit(parallel=True, workers=2)
+        for p1, p2 in zip(serial[0].parameters, parallel[0].parameters):
+            assert_true(np.all(p1.map['values'] == p2.map['values']))
+
+    def test_blocks(self):
+        m = self.models[0]
+        assert_equal(m._get_multifit_blocks(None, 4),
+                     [(0, 3), (3, 6), (6, 9), (9, 12)])
+        mask = np.zeros((3, 4), dtype='bool')
+        mask[0] = True
+        assert_equal(m._get_multifit_blocks(mask, 2),
+                     [(0, 8), (8, 12)])
+
+    def test_parallel_mask(self):
+        m = self.models[1]
+        mask = np.zeros((3, 4), dtype='bool')
+        mask[1, 2] = True
+        m.multifit(mask=mask, parallel=True, workers=2)
+        g1 = m[0]
+        assert_true(np.allclose(g1.centre.map['values'][0, 3], 49.))
+        assert_true(np.allclose(g1.centre.map['values'][1, 2], 45.))
+
+
+class TestMultifitSeed:
+    def setUp(self):
+        g = Gaussian()
+        axis = np.arange(100)
+        data = np.zeros((4, 6, 100))
+        for i in xrange(4):
+            for j in xrange(6):
+                g.A.value = 1000. * (1 + 0.2 * i)
+                g.centre.value = 30. + 4 * j
+                g.sigma.value = 5. + 0.5 * i
+                data[i, j] = g.function(axis)
+        self.data = data
+        self.s = Spectrum(data)
+        self.m = create_model(self.s)
+        g1 = Gaussian()
+        g1.A.value = 1500.
+        g1.centre.value = 45.
+        g1.sigma.value = 6.
+        self.m.append(g1)
+        for parameter in g1.parameters:
+            parameter.assign_current_value_to_all()
+
+    def check_fit(self):
+        g1 = self.m[0]
+        centres = 30. + 4 * np.arange(6)
+        assert_true(np.allclose(g1.centre.map['values'],
+                                centres[np.newaxis, :]))
+        assert_true(np.allclose(
+            g1.A.map['values'],
+            1000. * (1 + 0.2 * np.arange(4))[:, np.newaxis]))
+        assert_true(np.all(g1.centre.map['is_set']))
+
+    def test_neighbours(self):
+        for parameter in self.m[0].parameters:
+            parameter.map['is_set'] = False
+        self.m.multifit(seed='neighbours')
+        self.check_fit()
+
+    def test_neighbours_keep_stored_values(self):
+        m = self.m
+        g1 = m[0]
+        g1.centre.map['values'][0, 1] = 33.
+        starting_values = []
+        fit = m.fit
+
+        def recording_fit(**kwargs):
+            starting_values.append(g1.centre.value)
+            fit(**kwargs)
+        m.fit = recording_fit
+        m.multifit(seed='neighbours')
+        assert_equal(starting_values[1], 33.)
+        assert_true(np.all(np.array(starting_values[2:6]) == 45.))
+
+    def test_coarse(self):
+        m = self.m
+        for parameter in m[0].parameters:
+            parameter.map['is_set'] = False
+        m.multifit(seed='coarse', seed_factor=2)
+        self.check_fit()
+        assert_true(m.spectrum is self.s)
+        assert_true(m.axes_manager is self.s.axes_manager)
+        assert_true(m[0]._axes_manager is self.s.axes_manager)
+        assert_equal(m[0].A.map.shape, (4, 6))
+
+    def test_coarse_keep_stored_values(self):
+        m = self.m
+        g1 = m[0]
+        for parameter in g1.parameters:
+            parameter.map['is_set'] = False
+        g1.centre.map['values'][0, 3] = 49.
+        g1.centre.map['is_set'][0, 3] = True
+        starting_values = []
+        fit = m.fit
+
+        def recording_fit(**kwargs):
+            if m.spectrum is self.s:
+                starting_values.append(g1.centre.value)
+            fit(**kwargs)
+        m.fit = recording_fit
+        m.multifit(seed='coarse', seed_factor=2)
+        assert_equal(starting_values[3], 49.)
+        assert_true(starting_values[2] != 45.)
+        self.check_fit()
+
+    def test_coarse_mask(self):
+        m = self.m
+        mask = np.zeros((4, 6), dtype='bool')
+        mask[0, 0] = True
+        m.multifit(seed='coarse', mask=mask)
+        assert_true(np.allclose(m[0].A.map['values'][0, 0], 1500.))
+        assert_true(np.allclose(m[0].centre.map['values'][1:, 0], 30.))
+
+    def test_coarse_signal(self):
+        s = Spectrum(self.data[:3, :5])
+        coarse, factors = _get_coarse_signal(s, 2)
+        assert_equal(factors, [2, 2, 1])
+        assert_equal(coarse.data.shape, (1, 2, 100))
+        assert_true(np.allclose(
+            coarse.data[0, 1],
+            self.data[:2, 2:4].mean(0).mean(0)))
+
+    @raises(ValueError)
+    def test_wrong_seed(self):
+        self.m.multifit(seed='random')
+
+
+class TestFitStatistics:
+    def setUp(self):
+        g = Gaussian()
+        axis = np.arange(100)
+        data = np.zeros((2, 3, 100))
+        for i in xrange(2):
+            for j in xrange(3):
+                g.A.value = 1000. * (1 + i)
+                g.centre.value = 40. + 3 * j
+                g.sigma.value = 5.
+                data[i, j] = g.function(axis)
+        self.m = create_model(Spectrum(data))
+        g1 = Gaussian()
+        g1.A.value = 1500.
+        g1.centre.value = 45.
+        g1.sigma.value = 6.
+        self.m.append(g1)
+        for parameter in g1.parameters:
+            parameter.assign_current_value_to_all()
+
+    def test_fit(self):
+        m = self.m
+        m.fit(fitter='leastsq', grad=True)
+        statistics = m.fit_statistics
+        assert_true(statistics['nfev'] > 0)
+        assert_true(statistics['njev'] > 0)
+        assert_true(statistics['status'] in (1, 2, 3, 4))
+        assert_true(statistics['red_chisq'] < 1e-10)
+        assert_true(np.allclose(statistics['red_chisq'],
+                                statistics['chisq'] / 97.))
+        assert_equal(sorted(m.fit_timing.keys()),
+                     ['convolution', 'fitter', 'jacobian', 'model'])
+        assert_true(np.allclose(sum(m.fit_timing.values()),
+                                statistics['time']))
+        assert_equal(m.fit_map['nfev'][0, 0], statistics['nfev'])
+        assert_true(m.fit_map['is_set'][0, 0])
+        assert_true(not m.fit_map['is_set'][1, 2])
+
+    def test_multifit(self):
+        m = self.m
+        mask = np.zeros((2, 3), dtype='bool')
+        mask[1, 2] = True
+        m.multifit(mask=mask, fitter='mpfit')
+        assert_true(np.all(m.fit_map['is_set'] == ~mask))
+        assert_true(np.all(m.fit_map['nfev'][~mask] > 0))
+        assert_true(np.all(m.fit_map['status'][~mask] > 0))
+        assert_true(np.isnan(m.fit_map['chisq'][1, 2]))
+        s = m.fit_statistics_as_signal('time')
+        assert_equal(s.data.shape, (2, 3))
+        assert_true(np.all(s.data[~mask] > 0))
+        timing = m.multifit_timing
+        assert_true(np.allclose(
+            sum(timing[key] for key in
+                ('model', 'jacobian', 'convolution', 'fitter')),
+            m.fit_map['time'][~mask].sum()))
+        assert_true(timing['total'] >= m.fit_map['time'][~mask].sum())
+
+    def test_parallel(self):
+        m = self.m
+        m.multifit(parallel=True, workers=2)
+        assert_true(np.all(m.fit_map['is_set']))
+        assert_true(np.all(m.fit_map['nfev'] > 0))
+        assert_true(m.multifit_timing['model'] > 0)
+
+    @raises(ValueError)
+    def test_wrong_field(self):
+        self.m.multifit()
+        self.m.fit_statistics_as_signal('iterations')
@@ -19,9 +19,13 @@
 import os
 
 import numpy as np
+import scipy as sp
+import scipy.interpolate
 
 from nose.tools import assert_true, assert_equal, assert_not_equal
 from hyperspy._signals.spectrum import Spectrum
+from hyperspy.misc import spectrum_tools
+from hyperspy.misc import chunked_array
 from hyperspy.hspy import *
 
 class TestAlignTools:
@@ -89,6 +93,69 @@ def test_align_axis0(self):
         assert_equal(s.axes_manager._axes[1].offset, self.new_offset)
         assert_equal(s.axes_manager._axes[1].scale, self.scale)
 
+    def test_parallel_blocks(self):
+        s = self.spectrum
+        block_bytes = chunked_array.BLOCK_BYTES
+        # Blocks of three spectra
+        chunked_array.BLOCK_BYTES = 8 * 100 * 3
+        try:
+            for parallel in (True, 'threads'):
+                eshifts = -1 * s.estimate_shift1D(parallel=parallel)
+                assert_true(np.allclose(eshifts, 
+                                        self.ishifts * self.scale))
+            s.align1D(parallel=True)
+        finally:
+            chunked_array.BLOCK_BYTES = block_bytes
+        i_zlp = s.axes_manager.signal_axes[0].value2index(0)
+        assert_true(np.allclose(s.data[:, i_zlp], 12))
+        assert_true((s.data[:,-1] == 2).all())
+        assert_true((s.data[:,0] == 2).all())
+        assert_equal(s.axes_manager._axes[1].offset, self.new_offset)
+
+    def test_estimate_shift_max_shift(self):
+        s = self.spectrum
+        eshifts = -1 * s.estimate_shift1D(max_shift=5)
+        assert_true(np.allclose(eshifts,
+                                np.clip(self.ishifts, -5, 5) * self.scale))
+
+    def test_shift1D_cubic(self):
+        s = self.spectrum
+        s.shift1D(-1 * self.ishifts * self.scale,
+                  interpolation_method='cubic')
+        i_zlp = s.axes_manager.signal_axes[0].value2index(0)
+        assert_true(np.allclose(s.data[:, i_zlp], 12))
+
+
+class TestVectorized1D:
+    def setUp(self):
+        self.data = np.random.random((4, 30))
+        self.x = np.arange(30.)
+
+    def test_shift_spectra(self):
+        shifts = np.array([0, 1.5, -2.25, 40])
+        result = spectrum_tools.shift_spectra(self.data, shifts)
+        expected = np.array([
+            sp.interpolate.interp1d(self.x, row, bounds_error=False,
+                                    fill_value=np.nan)(self.x - shift)
+            for row, shift in zip(self.data, shifts)])
+        assert_true(np.allclose(result, expected, equal_nan=True))
+
+    def test_correlate_spectra(self):
+        reference = np.random.random(30)
+        expected = [np.correlate(reference, row, 'full')
+                    for row in self.data]
+        assert_true(np.allclose(
+            spectrum_tools.correlate_spectra(reference, self.data),
+            expected))
+
+    def test_interpolate1D(self):
+        result = spectrum_tools.interpolate1D(3, self.data)
+        for row, expected in zip(result, self.data):
+            assert_true(np.allclose(
+                row, spectrum_tools.interpolate1D(3, expected)))
+        assert_true(np.allclose(result[:, ::3], self.data))
+
+
 class TestShift1D():
     def setUp(self):
         self.s = Spectrum(np.arange(10))
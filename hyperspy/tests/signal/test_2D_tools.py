@@ -0,0 +1,125 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import numpy.ma as ma
+
+from nose.tools import assert_true, assert_equal
+from hyperspy.signals import Image
+from hyperspy.misc.image_tools import (estimate_image_shift,
+                                       estimate_image_shifts,
+                                       fft_correlation_size,
+                                       image_spectrum,
+                                       correlation_from_spectra,
+                                       shifts_from_correlation,
+                                       shifts_from_spectra,
+                                       refine_shifts)
+from hyperspy.misc import chunked_array
+
+
+def test_shifts_from_spectra():
+    ref = np.random.random((20, 30))
+    images = np.random.random((3, 20, 30))
+    fsize = fft_correlation_size(ref.shape)
+    assert_equal(fsize, (64, 64))
+    spectra = np.array([image_spectrum(im, fsize) for im in images])
+    shifts, max_values = shifts_from_correlation(correlation_from_spectra(
+        image_spectrum(ref, fsize), spectra))
+    for image, shift, max_value in zip(images, shifts, max_values):
+        eshift, emax_value = estimate_image_shift(ref, image)
+        assert_true((shift == eshift).all())
+        assert_true(np.allclose(max_value, emax_value))
+
+
+def test_estimate_image_shifts():
+    ref = np.random.random((20, 30))
+    images = np.random.random((3, 20, 30))
+    shifts, max_values = estimate_image_shifts(ref, images)
+    cshifts, cmax_values = estimate_image_shifts(
+        np.array([ref, images[0], images[1]]), images)
+    for i, image in enumerate(images):
+        eshift, emax_value = estimate_image_shift(ref, image)
+        assert_true((shifts[i] == eshift).all())
+        assert_true(np.allclose(max_values[i], emax_value))
+        cref = ref if i == 0 else images[i - 1]
+        eshift, emax_value = estimate_image_shift(cref, image)
+        assert_true((cshifts[i] == eshift).all())
+        assert_true(np.allclose(cmax_values[i], emax_value))
+
+
+def test_refine_shifts():
+    # Cross power spectrum of a correlation whose maximum is at a
+    # sub-pixel position
+    positions = np.array([[3.3, -5.75], [-0.45, 0.1]])
+    k0 = np.fft.fftfreq(32)[:, np.newaxis]
+    k1 = np.fft.fftfreq(64)
+    cross_power = np.array([np.exp(-2j * np.pi * (k0 * p0 + k1 * p1))
+                            for p0, p1 in positions])
+    shifts, max_values = shifts_from_spectra(cross_power, 1)
+    assert_true((shifts == -np.round(positions)).all())
+    shifts = refine_shifts(cross_power, shifts, upsample_factor=20)
+    assert_true(np.allclose(shifts, -positions))
+    shifts, max_values = shifts_from_spectra(cross_power, 1,
+                                             upsample_factor=20)
+    assert_true(np.allclose(shifts, -positions))
+
+
+def test_estimate_shift2D_upsampled():
+    s = Image(np.random.random((4, 20, 24)))
+    shifts = s.estimate_shift2D()
+    ushifts = s.estimate_shift2D(upsample_factor=10)
+    assert_true(np.all(np.abs(ushifts - shifts) <= 0.75))
+
+
+class TestCorrelationArray:
+    def setUp(self):
+        self.s = Image(np.random.random((5, 20, 24)))
+        self.pcarray = ma.zeros((3, 5), dtype=np.dtype(
+            [('max_value', np.float), ('shift', np.int32, (2,))]))
+
+    def check_pairs(self):
+        images = self.s.data
+        for i1 in xrange(3):
+            for i2 in xrange(i1 + 1, 5):
+                shift, max_value = estimate_image_shift(
+                    images[i1], images[i2], normalize_corr=True)
+                assert_true(np.allclose(
+                    self.pcarray['max_value'][i1, i2], max_value))
+                assert_true((self.pcarray['shift'][i1, i2] ==
+                             shift).all())
+
+    def test_serial(self):
+        self.s._fill_correlation_array(self.pcarray, 3,
+                                       normalize_corr=True)
+        self.check_pairs()
+
+    def test_parallel(self):
+        self.s._fill_correlation_array(self.pcarray, 3,
+                                       normalize_corr=True,
+                                       parallel='threads')
+        self.check_pairs()
+
+    def test_memmap(self):
+        block_bytes = chunked_array.BLOCK_BYTES
+        chunked_array.BLOCK_BYTES = 2 ** 15
+        try:
+            self.s._fill_correlation_array(self.pcarray, 3,
+                                           normalize_corr=True)
+        finally:
+            chunked_array.BLOCK_BYTES = block_bytes
+        self.check_pairs()
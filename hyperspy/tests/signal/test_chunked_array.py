@@ -0,0 +1,126 @@
+import os
+import tempfile
+
+import numpy as np
+import h5py
+from nose.tools import assert_true, assert_equal, assert_raises
+
+from hyperspy.signal import Signal
+from hyperspy.io import load
+from hyperspy.misc import chunked_array
+from hyperspy.misc.chunked_array import ChunkedArray
+
+
+class TestChunkedArray:
+    def setUp(self):
+        # Small blocks to test the block by block operations
+        self.block_bytes = chunked_array.BLOCK_BYTES
+        chunked_array.BLOCK_BYTES = 256
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+        self.data = np.arange(6 * 5 * 8, dtype='float64').reshape((6, 5, 8))
+        mm = np.memmap(self.filename, dtype='float64', mode='w+',
+                       shape=self.data.shape)
+        mm[:] = self.data
+        self.array = ChunkedArray(mm)
+        self.s = Signal(self.array)
+        self.s.axes_manager.set_signal_dimension(1)
+
+    def tearDown(self):
+        chunked_array.BLOCK_BYTES = self.block_bytes
+        del self.s, self.array
+        os.remove(self.filename)
+
+    def test_getitem(self):
+        for key in ((1, 2), (Ellipsis, 3), (slice(1, 5, 2), 0),
+                    (slice(None), slice(1, 4), slice(2, 8, 3)), (-1,)):
+            assert_true(np.all(np.asarray(self.array[key]) ==
+                               self.data[key]))
+
+    def test_setitem(self):
+        self.array[1, 2:4] = -1
+        self.data[1, 2:4] = -1
+        self.array[2:] = ChunkedArray(self.data[::-1].copy())[2:]
+        self.data[2:] = self.data[::-1].copy()[2:]
+        assert_true(np.all(self.array.read() == self.data))
+        assert_raises(IndexError, self.array.__setitem__,
+                      slice(None, None, -1), 0)
+
+    def test_map_inplace(self):
+        self.s.map(np.cumsum, inplace=True)
+        assert_true(isinstance(self.s.data, ChunkedArray))
+        assert_true(np.all(np.asarray(self.s.data) ==
+                           np.cumsum(self.data, -1)))
+
+    def test_shift1D(self):
+        shifts = np.linspace(-1, 1, 30).reshape((6, 5))
+        sd = Signal(self.data.copy())
+        sd.axes_manager.set_signal_dimension(1)
+        sd.shift1D(shifts, crop=False)
+        self.s.shift1D(shifts, crop=False)
+        assert_true(np.allclose(np.asarray(self.s.data), sd.data,
+                                equal_nan=True))
+
+    def test_large_view_is_lazy(self):
+        view = self.array[1:]
+        assert_true(isinstance(view, ChunkedArray))
+        assert_true(np.all(np.asarray(view[2:4, 1:3]) ==
+                           self.data[1:][2:4, 1:3]))
+
+    def test_signal_slicing(self):
+        s = self.s.inav[1:3, 2:].isig[3:6]
+        assert_true(np.all(np.asarray(s.data) ==
+                           self.data[2:, 1:3, 3:6]))
+
+    def test_reductions(self):
+        for method in ('sum', 'mean', 'max', 'min', 'std', 'var'):
+            for axis in (0, 1, 2):
+                result = getattr(self.s, method)(axis)
+                expected = getattr(np, method)(
+                    self.data,
+                    axis=self.s.axes_manager[axis].index_in_array)
+                assert_true(np.allclose(np.asarray(result.data), expected))
+        assert_true(np.allclose(self.array.std(), self.data.std()))
+
+    def test_integrate_simpson(self):
+        s = self.s.integrate_simpson(-1)
+        sd = Signal(self.data)
+        sd.axes_manager.set_signal_dimension(1)
+        assert_true(np.allclose(np.asarray(s.data),
+                                sd.integrate_simpson(-1).data))
+
+    def test_rebin(self):
+        s = self.s.rebin((5, 3, 4))
+        assert_equal(s.data.shape, (3, 5, 4))
+        assert_true(np.allclose(
+            np.asarray(s.data),
+            self.data.reshape((3, 2, 5, 1, 4, 2)).sum(5).sum(3).sum(1)))
+
+    def test_arithmetic(self):
+        s = self.s * 2 + self.s
+        assert_true(isinstance(s.data, ChunkedArray))
+        assert_true(np.allclose(np.asarray(s.data), self.data * 3))
+        s = -(self.s - np.arange(8))
+        assert_true(np.allclose(np.asarray(s.data),
+                                np.arange(8) - self.data))
+
+    def test_deepcopy(self):
+        s = self.s.deepcopy()
+        assert_true(np.all(np.asarray(s.data) == self.data))
+
+
+def test_load_hdf5_lazy():
+    fd, filename = tempfile.mkstemp(suffix='.hdf5')
+    os.close(fd)
+    try:
+        data = np.random.random((4, 3, 10))
+        Signal(data).save(filename, overwrite=True)
+        s = load(filename, lazy=True)
+        assert_true(isinstance(s.data, ChunkedArray))
+        assert_true(isinstance(s.data._data, h5py.Dataset))
+        assert_true(np.allclose(s.data[1, 2], data[1, 2]))
+        assert_true(np.allclose(np.asarray(s.sum(-1).data),
+                                data.sum(-1)))
+        s.data._data.file.close()
+    finally:
+        os.remove(filename)
@@ -0,0 +1,134 @@
+# Copyright 2007-2012 The Hyperspy developers
+#
+# This file is part of Hyperspy.
+#
+# Hyperspy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hyperspy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hyperspy. If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+
+import numpy as np
+
+from nose.tools import assert_true, assert_equal, raises
+from hyperspy.signal import Signal
+from hyperspy.signals import Spectrum, Image
+
+
+class TestMap:
+    def setUp(self):
+        self.s = Spectrum(np.random.random((3, 4, 20)))
+        self.s.axes_manager[0].scale = 0.5
+        self.s.axes_manager[-1].offset = 10
+
+    def test_scalar(self):
+        s = self.s
+        m = s.map(np.sum)
+        assert_true(isinstance(m, Image))
+        assert_true(np.allclose(m.data, s.data.sum(-1)))
+        assert_equal(m.axes_manager[0].scale, 0.5)
+
+    def test_same_shape(self):
+        s = self.s
+        m = s.map(lambda data, factor: data * factor, factor=2)
+        assert_true(isinstance(m, Spectrum))
+        assert_true(np.allclose(m.data, 2 * s.data))
+        assert_equal(m.axes_manager[-1].offset, 10)
+
+    def test_different_shape(self):
+        s = self.s
+        m = s.map(lambda data: data[:5])
+        assert_equal(m.axes_manager.navigation_shape, (4, 3))
+        assert_equal(m.axes_manager.signal_shape, (5,))
+        assert_true(np.allclose(m.data, s.data[..., :5]))
+
+    def test_ragged(self):
+        s = self.s
+        m = s.map(lambda data: np.arange(int(data[0] * 10)), ragged=True)
+        assert_equal(m.shape, (3, 4))
+        assert_equal(len(m[1, 2]), int(s.data[1, 2, 0] * 10))
+
+    @raises(ValueError)
+    def test_different_shapes_not_ragged(self):
+        self.s.map(lambda data: np.arange(int(data[0] * 10)))
+
+    def test_inplace(self):
+        s = self.s
+        data = s.data.copy()
+        assert_true(s.map(np.sort, inplace=True) is None)
+        assert_true(np.allclose(s.data, np.sort(data)))
+
+    def test_iterated_signal(self):
+        s = self.s
+        maximum = s.map(np.max)
+        maximum.axes_manager.set_signal_dimension(0)
+        m = s.map(lambda data, maximum: data / maximum, maximum=maximum)
+        assert_true(np.allclose(m.data.max(-1), 1))
+
+    def test_navigation_axes_not_first(self):
+        s = self.s.rollaxis(-1, 0)
+        assert_equal(s.data.shape, (3, 20, 4))
+        m = s.map(lambda data: data + 1)
+        assert_true(np.allclose(m.data, self.s.data + 1))
+
+    def test_no_navigation(self):
+        s = Spectrum(np.arange(10.))
+        assert_equal(s.map(np.sum).data[0], 45)
+        s.map(lambda data: data * 2, inplace=True)
+        assert_true(np.allclose(s.data, 2 * np.arange(10.)))
+
+    def test_parallel(self):
+        s = self.s
+        for parallel in (True, 'threads'):
+            m = s.map(np.cumsum, parallel=parallel, workers=2)
+            assert_true(np.allclose(m.data, np.cumsum(s.data, -1)))
+            m = s.map(np.sum, parallel=parallel, workers=2)
+            assert_true(np.allclose(m.data, s.data.sum(-1)))
+
+    def test_parallel_inplace(self):
+        s = self.s
+        data = s.data.copy()
+        s.map(np.sort, parallel=True, workers=2, inplace=True)
+        assert_true(np.allclose(s.data, np.sort(data)))
+
+    def test_parallel_nested(self):
+        s = self.s
+
+        def inner_sum(dat):
+            inner = Spectrum(dat.reshape((4, 5)))
+            return inner.map(np.sum, parallel='threads', workers=2).data.sum()
+        for parallel in (True, 'threads'):
+            m = s.map(inner_sum, parallel=parallel, workers=2)
+            assert_true(np.allclose(m.data, s.data.sum(-1)))
+
+    def test_parallel_concurrent(self):
+        s = self.s
+        results = {}
+
+        def run(name, function):
+            results[name] = s.map(function, parallel=True, workers=2).data
+        threads = [threading.Thread(target=run, args=('sum', np.sum)),
+                   threading.Thread(target=run, args=('max', np.max))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert_true(np.allclose(results['sum'], s.data.sum(-1)))
+        assert_true(np.allclose(results['max'], s.data.max(-1)))
+
+    def test_image(self):
+        s = Image(np.random.random((2, 5, 6)))
+        m = s.map(np.transpose)
+        assert_true(isinstance(m, Signal))
+        assert_equal(m.axes_manager.signal_shape, (5, 6))
+        assert_true(np.allclose(m.data, s.data.transpose(0, 2, 1)))
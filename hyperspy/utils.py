@@ -5,14 +5,18 @@
 from hyperspy.misc.utils import DictionaryBrowser
 
 def stack(signal_list, axis=None, new_axis_name='stack_element', 
-          mmap=False, mmap_dir=None,):
+          mmap=False, mmap_dir=None, length=None):
     """Concatenate the signals in the list over a given axis or a new axis.
     
     The title is set to that of the first signal in the list.
     
     Parameters
     ----------
-    signal_list : list of Signal instances
+    signal_list : list of Signal instances or iterable
+        If an iterable (e.g. a generator) and `axis` is None, the signals
+        are copied into the output as they are produced so that only one
+        of them needs to be in memory at any time. In this case the
+        number of signals must be given by `length`.
     axis : {None, int, str}
         If None, the signals are stacked over a new axis. The data must 
         have the same dimensions. Otherwise the 
@@ -35,6 +39,9 @@ def stack(signal_list, axis=None, new_axis_name='stack_element',
         If mmap_dir is not None, and stack and mmap are True, the memory
         mapped file will be created in the given directory,
         otherwise the default directory is used.
+    length : {None, int}
+        The number of signals. Only required if `signal_list` is an
+        iterable without length.
     
     Returns
     -------
@@ -52,12 +59,17 @@ def stack(signal_list, axis=None, new_axis_name='stack_element',
            [10, 11, 12, 13, 14, 15, 16, 17, 18, 19]])
     
     """
+    if axis is not None:
+        # The signals must be in memory to concatenate them
+        signal_list = list(signal_list)
+    if length is None:
+        length = len(signal_list)
 
     for i, obj in enumerate(signal_list):    
         if i == 0:
             if axis is None:
                 original_shape = obj.data.shape
-                stack_shape = tuple([len(signal_list),]) + original_shape
+                stack_shape = tuple([length,]) + original_shape
                 tempf = None
                 if mmap is False:
                     data = np.empty(stack_shape,
@@ -107,8 +119,14 @@ def stack(signal_list, axis=None, new_axis_name='stack_element',
             if obj.data.shape != original_shape:
                 raise IOError(
               "Only files with data of the same shape can be stacked")
+            if i >= length:
+                raise ValueError(
+                    "The number of signals is larger than `length`")
             signal.data[i,...] = obj.data
             del obj
+    if axis is None and i + 1 != length:
+        raise ValueError(
+            "The number of signals is smaller than `length`")
     if axis is not None:
         signal.data = np.concatenate([signal_.data for signal_ in signal_list],
                                      axis=axis.index_in_array)